@@ -0,0 +1,97 @@
+"""
+This module defines the on-disk cache of analysis results.
+Results are keyed by the git blob SHA of the analysed content and the version of the analyser,
+so identical files (starter code, files which didn't change between runs) are analysed once
+across all repositories and all runs
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Optional
+
+from disk_cache import DiskCache
+
+CACHE_FILE_NAME = 'analysis.sqlite'
+DEFAULT_CACHE_SIZE_MB = 64
+
+
+def content_sha(contents: str) -> str:
+    """
+    Computes the git blob SHA of some contents, the same way 'git hash-object' does.
+    Local files get the same keys as GitHub files with the same contents
+
+    :param contents: The decoded contents of a file
+    :return: The SHA as a hex string
+    """
+    data = contents.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class AnalysisCache:
+    """Cache of analysis results. Results must be JSON serialisable"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.store = DiskCache(os.path.join(cache_dir, CACHE_FILE_NAME), max_bytes)
+
+    @staticmethod
+    def key(analyser: str, version: int, sha: str) -> str:
+        """
+        :param analyser: The name of the analysis (for example 'java_stats')
+        :param version: The version of the analyser. Bumping it invalidates its old results
+        :param sha: The git blob SHA of the analysed content
+        :return: The key of the result
+        """
+        return f"{analyser}/{version}/{sha}"
+
+    def get(self, analyser: str, version: int, sha: str) -> Optional[Any]:
+        """
+        :return: The cached result or None if there isn't one
+        """
+        value = self.store.get(self.key(analyser, version, sha))
+        return None if value is None else json.loads(value)
+
+    def put(self, analyser: str, version: int, sha: str, result: Any) -> None:
+        """
+        Caches a result
+        """
+        self.store.put(self.key(analyser, version, sha), json.dumps(result).encode())
+
+
+analysis_cache = None
+
+
+def configure(cache_dir: str, max_megabytes: int = DEFAULT_CACHE_SIZE_MB) -> None:
+    """
+    Enables the analysis cache for the rest of the run
+
+    :param cache_dir: The directory the cache is stored in
+    :param max_megabytes: The size cap of the cache in megabytes
+    """
+    global analysis_cache
+    analysis_cache = AnalysisCache(cache_dir, max_megabytes * 1024 * 1024)
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Return the analysis cache, or None if it isn't enabled."""
+    return analysis_cache
+
+
+def cached_analysis(analyser: str, version: int, contents: str, analyse: Callable[[], Any]) -> Any:
+    """
+    Returns the cached result of an analysis or runs it and caches its result
+
+    :param analyser: The name of the analysis
+    :param version: The version of the analyser
+    :param contents: The analysed content
+    :param analyse: Runs the analysis when there is no cached result
+    :return: The result of the analysis
+    """
+    cache = get_analysis_cache()
+    if cache is None:
+        return analyse()
+    sha = content_sha(contents)
+    result = cache.get(analyser, version, sha)
+    if result is None:
+        result = analyse()
+        cache.put(analyser, version, sha, result)
+    return result
@@ -1,15 +1,204 @@
-"""Provide a shared GitHub object instance to all modules."""
+"""
+Provide a shared GitHub object instance to all modules.
+This module also owns the transport every GitHub request goes through, PyGithub's as well as the raw ones
+"""
 
 import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
 from github import Github, Auth
+from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+from http_cache import get_response_cache
+from ratelimit import get_scheduler, resource_of
+
+
+class SchedulingAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter which sends every request through the rate limit scheduler.
+    Requests wait for their slot, and responses failing because of rate limits or server errors are retried.
+    When the response cache is enabled GET requests are revalidated against it
+    """
+
+    def send(self, request, *args, **kwargs):
+        scheduler = get_scheduler()
+        resource = resource_of(request.url)
+        cache = get_response_cache()
+        cache_key = cached = None
+        if cache is not None and request.method == 'GET':
+            cache_key = cache.key(request.url, request.headers)
+            cached = cache.lookup(cache_key)
+            if cached is not None:
+                request.headers.update(cached.conditional_headers())
+        response = self.send_scheduled(request, scheduler, resource, *args, **kwargs)
+        if cached is not None and response.status_code == 304:
+            # nothing changed, so we answer with the cached response (keeping the fresh rate limit headers)
+            headers = requests.structures.CaseInsensitiveDict(cached.headers)
+            headers.update((name, value) for name, value in response.headers.items()
+                           if name.lower().startswith('x-ratelimit'))
+            response.status_code = 200
+            response.reason = 'OK'
+            response.headers = headers
+            response._content = cached.body
+            # The encoding was read from the headers of the 304, which usually have no charset
+            response.encoding = requests.utils.get_encoding_from_headers(headers)
+        elif cache_key is not None and response.status_code == 200:
+            cache.save(cache_key, response.headers, response.content)
+        return response
+
+    def send_scheduled(self, request, scheduler, resource, *args, **kwargs):
+        """
+        Sends a request when the scheduler allows it and retries it as long as the scheduler says so
+
+        :return: The last response
+        """
+        attempt = 0
+        while True:
+            time.sleep(scheduler.reserve(resource))
+            response = super().send(request, *args, **kwargs)
+            scheduler.update(response.status_code, response.headers)
+            # The body is only decoded when the status and headers can't tell (response.text guesses the charset)
+            delay = scheduler.retry_delay(response.status_code, response.headers, lambda: response.text, attempt)
+            if delay is None:
+                return response
+            print(f"[WARNING] GitHub answered {response.status_code}. Retrying in {round(delay, 1)} seconds")
+            time.sleep(delay)
+            attempt += 1
+
+
+# Root of the GitHub RESTful API, for the requests which don't go through PyGithub
+API_URL = 'https://api.github.com'
+
+# Connections kept alive per thread. Requests are sent one at a time by each thread, so a few are plenty
+POOL_CONNECTIONS = 4
+
+# Seconds to wait for GitHub to answer a raw request
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Using an access token. Without one only local repositories can be evaluated
+# (or public ones with a very low API limit)
+token = os.environ.get('GITHUB_ACCESS_TOKEN')
+auth = Auth.Token(token) if token else None
+
+thread_data = threading.local()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the requests session of the current thread. Each thread keeps its own session,
+    so its connections (and TLS handshakes) are reused for every request it sends.
+    The session sends everything through the rate limit scheduler and the response cache
+
+    :return: The session
+    """
+    session = getattr(thread_data, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", SchedulingAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_CONNECTIONS))
+        session.headers.update({'Accept': 'application/vnd.github+json', 'X-GitHub-Api-Version': '2022-11-28'})
+        # Any auth other than None keeps requests from reading ~/.netrc, which would replace the token
+        session.auth = Requester.noopAuth
+        if token:
+            session.headers['Authorization'] = 'Bearer ' + token
+        thread_data.session = session
+    return session
+
 
+def rest_get(path: str, params: Optional[dict] = None) -> requests.Response:
+    """
+    Makes a GET request to an endpoint of the GitHub RESTful API which PyGithub doesn't wrap
 
-# Using an access token
-auth = Auth.Token(os.environ['GITHUB_ACCESS_TOKEN'])
+    :param path: The path of the endpoint (for example '/repos/author/name/actions/runs')
+    :param params: The query parameters
+    :return: The response
+    """
+    return get_session().get(API_URL + path, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
 
 
-github_instance = Github(auth=auth)
+class ThreadSafeConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub keeps a single connection object per Github instance, which breaks when repositories are evaluated
+    by multiple threads. Once this class is injected a connection object is created for every request,
+    but it uses the session of its thread, so connections are still kept alive and shared with the raw requests.
+    The parent constructor isn't called, it would build a session and a connection pool for every request
+    """
+
+    def __init__(self, host: str, port: Optional[int] = None, strict: bool = False, timeout: Optional[int] = None,
+                 retry=None, pool_size: Optional[int] = None, **kwargs):
+        # The fields PyGithub reads. Retries and pooling belong to the adapter of the session
+        self.host = host
+        self.port = port if port else 443
+        self.protocol = 'https'
+        self.timeout = timeout
+        self.verify = kwargs.get('verify', True)
+        self.retry = retry
+        self.pool_size = pool_size
+        self.session = get_session()
+
+    def close(self):
+        # the session belongs to the thread, not to this connection
+        pass
+
+
+Requester.injectConnectionClasses(HTTPRequestsConnectionClass, ThreadSafeConnection)
+
+
+# The scheduler paces and retries every request (SchedulingAdapter), so PyGithub's own pause between requests
+# and its retries are turned off. Otherwise every PyGithub call of the process waits for the one before it
+github_instance = Github(auth=auth, seconds_between_requests=None, seconds_between_writes=None, retry=None)
+
 
 def get_github_instance():
     """Return the shared GitHub instance object."""
     return github_instance
+
+
+def last_page_number(link_header: Optional[str]) -> Optional[int]:
+    """
+    Reads the number of the last page from the Link header of a paginated GitHub response.
+    When a list is requested with per_page=1 this is the number of items in the list
+
+    :param link_header: The value of the Link header (or None if the response didn't have one)
+    :return: The page number of rel="last" or None if there is no such link (the list has a single page)
+    """
+    if not link_header:
+        return None
+    for link in link_header.split(','):
+        url, *parameters = link.split(';')
+        if any(parameter.strip() == 'rel="last"' for parameter in parameters):
+            return int(parse_qs(urlparse(url.strip()[1:-1]).query)['page'][0])
+    return None
+
+
+def count_from_first_page(link_header: Optional[str], first_page: Optional[list]) -> int:
+    """
+    Counts the items of a paginated list from its first page, requested with per_page=1
+
+    :param link_header: The value of the Link header of the first page
+    :param first_page: The items of the first page
+    :return: The number of items in the list
+    """
+    last_page = last_page_number(link_header)
+    if last_page is not None:
+        return last_page
+    return len(first_page) if first_page else 0
+
+
+def count_items(path: str, params: Optional[dict] = None) -> int:
+    """
+    Counts the items of a paginated list of the GitHub API with a single request, no matter how long the list is.
+    One item is requested per page, so the number of the last page is the number of items
+
+    :param path: The path of the list endpoint (for example '/repos/author/name/branches')
+    :param params: Extra query parameters
+    :return: The number of items. Empty repositories have no commits, contributors or branches
+    """
+    response = rest_get(path, {**(params or {}), 'per_page': 1})
+    if response.status_code in (204, 409):  # the repository is empty
+        return 0
+    response.raise_for_status()
+    return count_from_first_page(response.headers.get('Link'), response.json())
@@ -0,0 +1,221 @@
+"""
+This module defines an asyncio transport for the read-only GitHub endpoints the scrapers use.
+It prefetches the data of many repositories at the same time and stores it in the run cache,
+so the scrapers find everything there instead of making blocking requests one by one.
+aiohttp is needed for this module (poetry install -E async)
+"""
+import asyncio
+import base64
+import json
+from typing import Any, Optional
+from urllib.parse import quote, urlencode
+
+from github.Repository import Repository
+
+from api import API_URL, count_from_first_page, get_github_instance, token
+from feature_probes import PROBES, probe_answer, probe_parameters
+from http_cache import get_response_cache
+from ratelimit import get_scheduler, resource_of
+from run_cache import RunCache, get_run_cache
+from source import RepositoryFile
+
+g = get_github_instance()
+
+# Default number of requests in flight at the same time
+DEFAULT_CONCURRENCY = 100
+
+
+class AsyncGitHubClient:
+    """
+    Makes GET requests to the GitHub API with aiohttp.
+    A semaphore bounds how many requests are in flight at the same time
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    async def __aenter__(self):
+        # Imports happen here in order to not require aiohttp if this never runs!
+        import aiohttp
+
+        headers = {'Accept': 'application/vnd.github+json', 'X-GitHub-Api-Version': '2022-11-28'}
+        if token:
+            headers['Authorization'] = 'Bearer ' + token
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(headers=headers, connector=connector)
+        return self
+
+    async def __aexit__(self, *exception_info):
+        await self.session.close()
+
+    async def get(self, path: str, params: Optional[dict] = None) -> tuple[int, dict, Any]:
+        """
+        Makes a GET request
+
+        :param path: The path of the endpoint (for example '/repos/author/name/readme')
+        :param params: The query parameters
+        :return: Tuple of (status, headers, json_body). The body is None if it isn't JSON
+        """
+        scheduler = get_scheduler()
+        url = API_URL + path
+        cache = get_response_cache()
+        cache_key = cached = None
+        request_headers = {}
+        if cache is not None:
+            cache_key = cache.key(url + ('?' + urlencode(params) if params else ''), self.session.headers)
+            cached = cache.lookup(cache_key)
+            if cached is not None:
+                request_headers = cached.conditional_headers()
+        attempt = 0
+        while True:
+            await asyncio.sleep(scheduler.reserve(resource_of(url)))
+            async with self.semaphore:
+                async with self.session.get(url, params=params, headers=request_headers) as response:
+                    body = await response.read()
+                    status, headers = response.status, dict(response.headers)
+            scheduler.update(status, headers)
+            delay = scheduler.retry_delay(status, headers, lambda: body.decode('utf-8', errors='replace'), attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        if cached is not None and status == 304:  # nothing changed
+            status, body = 200, cached.body
+            headers = {**cached.headers, **{name: value for name, value in headers.items()
+                                            if name.lower().startswith('x-ratelimit')}}
+        elif cache_key is not None and status == 200:
+            cache.save(cache_key, headers, body)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        return status, headers, data
+
+    async def count(self, path: str, params: Optional[dict] = None) -> Optional[int]:
+        """
+        Counts the items of a paginated list with one request by asking for one item per page
+
+        :param path: The path of the list endpoint (for example '/repos/author/name/commits')
+        :param params: Extra query parameters
+        :return: The number of items or None if the request failed
+        """
+        status, headers, data = await self.get(path, {**(params or {}), 'per_page': 1})
+        if status != 200:
+            return None
+        return count_from_first_page(headers.get('Link'), data)
+
+
+def decode_content(data: dict) -> str:
+    """
+    Decodes the base64 content of a contents API response
+
+    :param data: The JSON body of the response
+    :return: The contents decoded to utf-8
+    """
+    return base64.b64decode(data['content']).decode('utf-8')
+
+
+async def prefetch_head_sha(client: AsyncGitHubClient, address: str, branch: str, cache: RunCache) -> Optional[str]:
+    """
+    Prefetches the SHA of the head commit of the default branch. Everything else is prefetched at this commit
+
+    :return: The SHA or None if the repository is empty or the request failed
+    """
+    status, _, data = await client.get(f'/repos/{address}/branches/{quote(branch)}')
+    if status == 404:  # the repository is empty
+        cache.put((address, 'head_sha'), None)
+        cache.put((address, 'index'), {})
+    elif status == 200:
+        cache.put((address, 'head_sha'), data['commit']['sha'])
+        return data['commit']['sha']
+    return None
+
+
+async def prefetch_index(client: AsyncGitHubClient, address: str, head_sha: str, cache: RunCache) -> None:
+    """Prefetches the path index of a repository with one recursive Git Trees request"""
+    status, _, data = await client.get(f'/repos/{address}/git/trees/{head_sha}', {'recursive': 1})
+    if status == 200 and not data.get('truncated'):  # truncated trees are walked by the source
+        cache.put((address, 'index'), {element['path']: RepositoryFile(element['path'], element.get('size') or 0,
+                                                                       element['sha'])
+                                       for element in data['tree'] if element['type'] == 'blob'})
+
+
+async def prefetch_file(client: AsyncGitHubClient, address: str, endpoint: str, resource: str, head_sha: str,
+                        cache: RunCache) -> None:
+    """Prefetches the README or the licence of a repository"""
+    status, _, data = await client.get(f'/repos/{address}/{endpoint}', {'ref': head_sha})
+    if status == 404:
+        cache.put((address, resource), None)
+    elif status == 200:
+        cache.put((address, resource), decode_content(data))
+
+
+async def prefetch_count(client: AsyncGitHubClient, address: str, endpoint: str, resource: str,
+                         cache: RunCache, params: Optional[dict] = None) -> None:
+    """Prefetches the number of commits, contributors or branches of a repository"""
+    count = await client.count(f'/repos/{address}/{endpoint}', params)
+    if count is not None:
+        cache.put((address, resource), count)
+
+
+async def prefetch_feature_probe(client: AsyncGitHubClient, address: str, feature: str, cache: RunCache) -> None:
+    """Prefetches the answer of a GitHub feature probe (Issues, Projects or Actions) of a repository"""
+    endpoint, params = probe_parameters(feature)
+    status, headers, data = await client.get(f'/repos/{address}/{endpoint}', params)
+    # Unknown answers (a pull request first in the issues) are left to the probe, which asks for a page of them
+    answer = probe_answer(status, data, 'rel="next"' in headers.get('Link', ''))
+    if answer is not None:
+        cache.put((address, feature), answer)
+
+
+async def prefetch_repository(client: AsyncGitHubClient, address: str, cache: RunCache) -> None:
+    """
+    Prefetches everything the scrapers need from one repository and stores it in the run cache.
+    Anything that fails is left out of the cache, so the scrapers request it again and handle the error as usual
+
+    :param client: The client to make the requests with
+    :param address: repository address in format 'author/name'
+    :param cache: The cache of the run
+    """
+    status, headers, data = await client.get(f'/repos/{address}')
+    if status != 200:
+        return
+    cache.put((address, 'repo'), g.create_from_raw_data(Repository, data, headers))
+    head_sha = await prefetch_head_sha(client, address, data['default_branch'], cache)
+    if head_sha is None:
+        return
+    await asyncio.gather(
+        prefetch_index(client, address, head_sha, cache),
+        prefetch_file(client, address, 'readme', 'readme', head_sha, cache),
+        prefetch_file(client, address, 'license', 'licence', head_sha, cache),
+        prefetch_count(client, address, 'commits', 'commit_count', cache, {'sha': head_sha}),
+        prefetch_count(client, address, 'contributors', 'contributor_count', cache),
+        prefetch_count(client, address, 'branches', 'branch_count', cache),
+        *(prefetch_feature_probe(client, address, feature, cache) for feature in PROBES),
+        return_exceptions=True)
+
+
+async def prefetch_all(repo_addresses: list[str], concurrency: int) -> None:
+    """
+    Prefetches every repository at the same time
+
+    :param repo_addresses: Repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
+    :param concurrency: The maximum number of requests in flight
+    """
+    cache = get_run_cache()
+    async with AsyncGitHubClient(concurrency) as client:
+        await asyncio.gather(*(prefetch_repository(client, address, cache) for address in repo_addresses),
+                             return_exceptions=True)
+
+
+def prefetch_repositories(repo_addresses: list[str], concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    """
+    Prefetches the GitHub data of multiple repositories to the run cache using asyncio
+
+    :param repo_addresses: Repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
+    :param concurrency: The maximum number of requests in flight
+    :return: None
+    """
+    asyncio.run(prefetch_all(repo_addresses, concurrency))
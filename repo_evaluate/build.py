@@ -2,62 +2,62 @@
 This module defines all methods which deal with BUILDS
 """
 import os
-import subprocess
 import re
+import threading
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
-from github import Github
-from github.GithubException import UnknownObjectException, GithubException
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 
+from analysis_cache import cached_analysis, content_sha, get_analysis_cache
+from gradle_engine import GradleResult, get_gradle_engine
+from grades import repository_results_directory
 from search import search_name_matches
+from source import get_source, results_directory_name
 
-from api import get_github_instance
+MAVEN_XSD_PATH = "repo_evaluate/resources/maven-4.0.0.xsd"
 
-g = get_github_instance()
+# Versions of the cached analyses. Changing how an analysis works must bump its version
+MAVEN_VALIDATION_VERSION = 2
+GRADLE_VALIDATION_VERSION = 1
 
 
 def get_a_build_file(repo_address):
     """
     Gets the build file and packaging_type for a repository
-    :param repo_address: repository address in format 'author/name'
+    :param repo_address: repository address in format 'author/name' (or a local path)
     :type repo_address: str
-    :return: Tuple of (packaging_file, packaging_type)
+    :return: Tuple of (packaging_file, packaging_type). The packaging file is decoded to utf-8
     """
     # Get a repo
-    repo = g.get_repo(repo_address)
+    source = get_source(repo_address)
 
     # look for build file in head of git
-    try:
-        # If the build is Maven this will not throw an exception
-        packaging_file = repo.get_contents("pom.xml")
-        packaging_type = "Maven"
-        return (packaging_file, packaging_type)
-    except (UnknownObjectException, GithubException):  # build is not Maven
-        try:
-            # If the build is Gradle /w Groovy this will not throw an exception
-            packaging_file = repo.get_contents("build.gradle")
-            packaging_type = "Gradle - Groovy"
-            return (packaging_file, packaging_type)
-        except (UnknownObjectException, GithubException):  # build is not Gradle /w Groovy or Maven
-            # If the build is Gradle /w Kotlin this will not throw an exception
-            try:
-                packaging_file = repo.get_contents("build.gradle.kts")
-                packaging_type = "Gradle - Kotlin"
-                return (packaging_file, packaging_type)
-            except (UnknownObjectException, GithubException):  # build is not Gradle or Maven
-                pass  # We now move on to look for the file everywhere in the repository
+    # If the build is Maven this will return a file
+    packaging_file = source.read_file("pom.xml")
+    if packaging_file is not None:
+        return (packaging_file, "Maven")
+    # If the build is Gradle /w Groovy this will return a file
+    packaging_file = source.read_file("build.gradle")
+    if packaging_file is not None:
+        return (packaging_file, "Gradle - Groovy")
+    # If the build is Gradle /w Kotlin this will return a file
+    packaging_file = source.read_file("build.gradle.kts")
+    if packaging_file is not None:
+        return (packaging_file, "Gradle - Kotlin")
+    # We now move on to look for the file everywhere in the repository
 
     # If the build is Maven this will return a file
-    packaging_file = search_name_matches("pom.xml", repo)
+    packaging_file = search_name_matches("pom.xml", source)
     if packaging_file is not None:
         packaging_type = "Maven"
     else:  # build is not Maven
-        packaging_file = search_name_matches("build.gradle", repo)
+        packaging_file = search_name_matches("build.gradle", source)
         if packaging_file is not None:
             packaging_type = "Gradle - Groovy"
         else:  # build is not Gradle /w Groovy or Maven
-            packaging_file = search_name_matches("build.gradle.kts", repo)
+            packaging_file = search_name_matches("build.gradle.kts", source)
             if packaging_file is not None:
                 packaging_type = "Gradle - Kotlin"
             else:  # build is not Gradle or Maven
@@ -80,16 +80,66 @@ def get_build_files(repo_addresses):
     build_files = {}
     build_tools = {}
     for address in repo_addresses:
-        contents, tool = get_a_build_file(address)
-        build_tools[address] = tool
-        if (contents is None):
-            build_files[address] = None
-        else:
-            build_files[address] = contents.decoded_content.decode(
-                'utf-8')  # We decode the content to bytes and then the bytes to UTF-8
+        build_files[address], build_tools[address] = get_a_build_file(address)
     return build_files, build_tools
 
 
+class PomError(NamedTuple):
+    """A syntax or schema error of a POM"""
+    line: Optional[int]  # None when lxml doesn't know the line
+    message: str
+
+    def __str__(self):
+        return self.message if self.line is None else f"line {self.line}: {self.message}"
+
+
+class MavenValidator:
+    """
+    Validates POMs against the Maven XSD. The XSD is compiled once, when the validator is created,
+    because compiling it costs far more than validating a POM
+    """
+
+    def __init__(self, maven_xsd_path: str):
+        """
+        :param maven_xsd_path: the path to the maven xsd
+        """
+        self.schema = etree.XMLSchema(etree.parse(maven_xsd_path))
+        # The error log belongs to the schema, so validations in different threads must not overlap
+        self.lock = threading.Lock()
+
+    def errors(self, xml_string: str) -> list[PomError]:
+        """
+        Validates a POM
+
+        :param xml_string: the xml data
+        :return: The syntax or schema errors of the POM. An empty list means it's valid
+        """
+        try:
+            xml_doc = etree.fromstring(xml_string.encode())
+        except XMLSyntaxError as e:
+            return [PomError(e.lineno, e.msg)]
+        with self.lock:
+            if self.schema.validate(xml_doc):
+                return []
+            return [PomError(error.line, error.message) for error in self.schema.error_log]
+
+    def is_valid(self, xml_string: str) -> bool:
+        """
+        :param xml_string: the xml data
+        :return: Weather It's valid or not
+        """
+        return not self.errors(xml_string)
+
+
+@lru_cache(maxsize=None)
+def get_maven_validator(maven_xsd_path: str = MAVEN_XSD_PATH) -> MavenValidator:
+    """
+    :param maven_xsd_path: the path to the maven xsd
+    :return: The validator of the XSD. It's created once and kept for the life of the process
+    """
+    return MavenValidator(maven_xsd_path)
+
+
 def validate_maven_pom(xml_string: str, maven_xsd_path: str) -> bool:
     """
     Validates if a given xml follows the Maven XSD.
@@ -101,14 +151,40 @@ def validate_maven_pom(xml_string: str, maven_xsd_path: str) -> bool:
     :return: Weather It's valid or not
     :rtype: bool
     """
-    xmlschema_doc = etree.parse(maven_xsd_path)
-    xmlschema = etree.XMLSchema(xmlschema_doc)
-    try:
-        xml_doc = etree.fromstring(xml_string.encode())
-        result = xmlschema.validate(xml_doc)
-    except XMLSyntaxError:
-        result = False
-    return result
+    return get_maven_validator(maven_xsd_path).is_valid(xml_string)
+
+
+def maven_pom_errors(xml_string: str, maven_xsd_path: str = MAVEN_XSD_PATH) -> list[PomError]:
+    """
+    Validates a POM against the Maven XSD. POMs which were validated before are looked up in the analysis cache
+
+    :param xml_string: the xml data
+    :param maven_xsd_path: the path to the maven xsd
+    :return: The syntax or schema errors of the POM. An empty list means it's valid
+    """
+    # The analysis cache keeps the errors as JSON lists, so they are turned back to PomError
+    errors = cached_analysis(f"maven/{os.path.basename(maven_xsd_path)}", MAVEN_VALIDATION_VERSION, xml_string,
+                             lambda: get_maven_validator(maven_xsd_path).errors(xml_string))
+    return [PomError(*error) for error in errors]
+
+
+def maven_validation_failure(repo: str, errors: list[PomError]) -> None:
+    """
+    Saves the errors of an invalid POM to a repository path in results
+
+    :param repo: Repository address in format 'author/name'
+    :param errors: The errors of the POM
+    :return: None
+    """
+    print(f"[WARNING] {repo} POM IS NOT VALID. More info in results")
+    path = repository_results_directory(repo)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    with open(f"{path}/maven_validation_failure_info.txt", 'w+') as fp:
+        fp.write(repo)
+        fp.write("\n\n[WARNING] The POM doesn't follow the Maven XSD:")
+        fp.write("\n")
+        fp.write("\n".join(str(error) for error in errors))
 
 
 def save_string_to_file(text: str, file_path: str):
@@ -144,20 +220,16 @@ def get_current_path():
 
 
 #
-def run_gradle_task(task: str, gradle_project_path: str):
+def run_gradle_task(task: str, gradle_project_path: str) -> GradleResult:
     """
-    Runs a gradle task in the specified path. The task is parsed via the task argument
+    Runs a gradle task in the specified path. The task is parsed via the task argument.
+    It runs through the Gradle engine, so it may wait for other builds to finish first
 
     :param task: A gradle tast (Such as build)
     :param gradle_project_path: the path to the gradle project
-    :return: CompletedProcess
+    :return: GradleResult
     """
-    # We structure the command
-    gradle_command = f"gradle {task} -p '{gradle_project_path}'"
-    # We send it to run via powershell and wait for an answer
-    result = subprocess.run(["powershell.exe", "-Command", gradle_command], stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE)
-    return result
+    return get_gradle_engine().run(task, gradle_project_path)
 
 
 def gradle_build_failure(repo: str, standard_error: str) -> None:
@@ -169,16 +241,61 @@ def gradle_build_failure(repo: str, standard_error: str) -> None:
     :return: None
     """
     print(f"[WARNING] {repo} BUILD FAILED. More info in results")
-    path = f"./repo_evaluate/results/{repo}"
+    path = repository_results_directory(repo)
     if not os.path.exists(path):
         os.makedirs(path)
-    with open(f"./repo_evaluate/results/{repo}/gradle_build_failure_info.txt", 'w+') as fp:
+    with open(f"{path}/gradle_build_failure_info.txt", 'w+') as fp:
         fp.write(repo)
         fp.write("\n\n[WARNING] Build failed:")
         fp.write("\n")
         fp.write(standard_error)
 
 
+def build_gradle_project(build_file_string: str, repo: str, build_file_name: str) -> GradleResult:
+    """
+    Builds a Gradle build file in its own project directory.
+    Build files which were built before are looked up in the analysis cache
+
+    :param build_file_string: The Gradle build file
+    :param repo: Repository address in format 'author/name'
+    :param build_file_name: 'build.gradle' or 'build.gradle.kts'
+    :return: GradleResult
+    """
+    cache = get_analysis_cache()
+    analyser = f"gradle/{build_file_name}"
+    sha = content_sha(build_file_string)
+    if cache is not None:
+        cached_result = cache.get(analyser, GRADLE_VALIDATION_VERSION, sha)
+        if cached_result is not None:
+            return GradleResult(*cached_result)
+    working_dir = get_current_path()
+    # We save the Gradle file to a folder in our resources. Every repository gets its own folder
+    project_directory = f"{working_dir}/resources/Gradle Builds/{results_directory_name(repo)}"
+    save_string_to_file(build_file_string, f"{project_directory}/{build_file_name}")
+    # We then try to run a gradle task with that build
+    result = run_gradle_task("build", f"{project_directory}/")
+    # Timeouts and a missing Gradle have nothing to do with the build file, so they are tried again next time
+    if cache is not None and result.depends_only_on_build:
+        cache.put(analyser, GRADLE_VALIDATION_VERSION, sha, list(result))
+    return result
+
+
+def validate_gradle_build(build_file_string: str, repo: str, build_file_name: str) -> bool:
+    """
+    Validates a Gradle build by building it in its own project directory
+    :param build_file_string: The Gradle build file
+    :param repo: Repository address in format 'author/name'
+    :param build_file_name: 'build.gradle' or 'build.gradle.kts'
+    :return: Weather the build failed or not
+    :rtype: bool
+    """
+    result = build_gradle_project(build_file_string, repo, build_file_name)
+    # The only thing we care about is if the gradle task succeeded
+    if not result.succeeded:
+        gradle_build_failure(repo, result.error)
+    return result.succeeded
+
+
 # Returns true if a groovy build is valid
 def validate_groovy_build(build_file_string: str, repo: str) -> bool:
     """
@@ -188,15 +305,7 @@ def validate_groovy_build(build_file_string: str, repo: str) -> bool:
     :return: Weather the build failed or not
     :rtype: bool
     """
-    working_dir = get_current_path()
-    # We save the Gradle file to a folder in our resources
-    save_string_to_file(build_file_string, f"{working_dir}/resources/Gradle Builds/{repo}/build.gradle")
-    # We then try to run a gradle task with that build
-    result = run_gradle_task("build", f"{working_dir}/resources/Gradle Builds/{repo}/")
-    # The only thing we care about is if the gradle task succeeded
-    if result.returncode != 0:
-        gradle_build_failure(repo, result.stderr.decode("utf-8"))
-    return result.returncode == 0
+    return validate_gradle_build(build_file_string, repo, "build.gradle")
 
 
 # Returns true if a kotlin build is valid
@@ -208,15 +317,7 @@ def validate_kotlin_build(build_file_string: str, repo: str) -> bool:
     :return: Weather the build failed or not
     :rtype: bool
     """
-    working_dir = get_current_path()
-    # We save the Gradle file to a folder in our resources
-    save_string_to_file(build_file_string, f"{working_dir}/resources/Gradle Builds/{repo}/build.gradle.kts")
-    # We then try to run a gradle task with that build
-    result = run_gradle_task("build", f"{working_dir}/resources/Gradle Builds/{repo}/")
-    # The only thing we care about is if the gradle task succeeded
-    if result.returncode != 0:
-        gradle_build_failure(repo, result.stderr.decode("utf-8"))
-    return result.returncode == 0
+    return validate_gradle_build(build_file_string, repo, "build.gradle.kts")
 
 
 def checkstyle_exists(build_file_string: str) -> bool:
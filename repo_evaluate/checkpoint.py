@@ -0,0 +1,94 @@
+"""
+This module deals with the checkpoint of a run.
+The CSV row of every evaluated repository is appended to a JSON lines file as soon as the repository is done,
+so a run which crashed or was interrupted can be resumed without evaluating those repositories again.
+It's kept outside the results directory, so it isn't copied to the destination with the results
+"""
+import json
+import os
+import threading
+from typing import Optional
+
+CHECKPOINT_FILE = './repo_evaluate/checkpoint.jsonl'
+
+
+class Checkpoint:
+    """
+    Thread safe append-only record of the repositories a run has completed.
+    The file is opened with the first record and kept open until the checkpoint is closed
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def load(self, row_length: Optional[int] = None) -> dict[str, list]:
+        """
+        Reads the repositories completed so far. A line cut short by a crash is ignored
+
+        :param row_length: The expected length of the rows. Rows of a different length
+        (written by a version with other CSV headers) are ignored
+        :return: A dictionary from repository address to its CSV row
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path) as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if row_length is None or len(entry['row']) == row_length:
+                    completed[entry['repository']] = entry['row']
+        return completed
+
+    def record(self, repo: str, csv_row: list) -> None:
+        """
+        Appends a completed repository to the checkpoint and makes sure it reaches the disk
+
+        :param repo: repository address in format 'author/name' (or a local path)
+        :param csv_row: The CSV row of the repository
+        """
+        line = json.dumps({'repository': repo, 'row': csv_row}) + '\n'
+        with self.lock:
+            if self.file is None:
+                self.file = self.open()
+            self.file.write(line)
+            os.fsync(self.file.fileno())
+
+    def open(self):
+        """
+        Opens the checkpoint file for appending. A line cut short by a crash is removed first,
+        otherwise the next record would be appended to it and both would be lost
+
+        :return: The file, line buffered so every record is written as soon as its line is complete
+        """
+        if os.path.exists(self.path):
+            with open(self.path, 'rb+') as fp:
+                fp.truncate(fp.read().rfind(b'\n') + 1)
+        return open(self.path, 'a', buffering=1)
+
+    def clear(self) -> None:
+        """
+        Deletes the checkpoint of an earlier run
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self) -> None:
+        """
+        Closes the checkpoint file. Recording again opens it again
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
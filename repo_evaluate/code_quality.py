@@ -1,11 +1,61 @@
 """
 This module defines all methods which deal with grading code quality
 """
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import NamedTuple, Optional
 
 import javalang
 
+from analysis_cache import content_sha, get_analysis_cache
 from constants import *
 
+# Version of the Java file stats in the analysis cache. Changing how the stats are computed must bump it
+JAVA_STATS_VERSION = 3
+
+# Repositories with fewer Java files than this are parsed serially, starting the work costs more than it saves
+MIN_FILES_FOR_PROCESS_POOL = 8
+
+# The files are sent to the pool in chunks, each process gets about this many chunks
+CHUNKS_PER_PROCESS = 4
+
+# The tokens which decide what the rest of the file is. Everything between them is code.
+# Text blocks come before strings, so '"""' isn't read as an empty string followed by a quote
+JAVA_LEXER_PATTERN = re.compile(r'''
+    (?P<string>"""(?:\\.|[^\\])*?"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    |(?P<line_comment>//[^\n]*)
+    |(?P<block_comment>/\*.*?(?:\*/|\Z))
+''', re.DOTALL | re.VERBOSE)
+
+
+# Tokens of the fast method counter. Literals and comments are removed before, with the lexer above
+JAVA_TOKEN_PATTERN = re.compile(r'[\w$]+|\S')
+
+# Reserved words which can't end the return type of a method (modifiers, statements, operators...).
+# Contextual keywords ('record', 'var', 'yield', 'sealed', 'permits'...) are valid names, so they aren't here
+JAVA_KEYWORDS = {
+    'abstract', 'assert', 'break', 'case', 'catch', 'class', 'const', 'continue', 'default', 'do', 'else', 'enum',
+    'extends', 'final', 'finally', 'for', 'goto', 'if', 'implements', 'import', 'instanceof', 'interface', 'native',
+    'new', 'package', 'private', 'protected', 'public', 'return', 'static', 'strictfp', 'super', 'switch',
+    'synchronized', 'this', 'throw', 'throws', 'transient', 'try', 'volatile', 'while', 'true', 'false', 'null',
+}
+
+# Keywords after which the next '{' opens the body of a type. 'record' only is one in front of a declaration
+JAVA_TYPE_KEYWORDS = {'class', 'interface', 'enum', 'record'}
+
+
+class LineCounts(NamedTuple):
+    """What the lines of a Java file contain"""
+    lines: int
+    comments: int  # comment blocks and line comments
+    comment_lines: int  # lines with (part of) a comment
+    code_lines: int  # lines with code. A line with code and a trailing comment counts as both
+    blank_lines: int
+
 
 def count_methods(contents: str) -> int:
     """
@@ -19,7 +69,8 @@ def count_methods(contents: str) -> int:
     try:
         tree = javalang.parse.parse(contents)
     except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError):
-        return 0
+        # javalang doesn't know newer syntax such as records or switch expressions
+        return count_methods_fast(contents)
     method_count = 0
     for path, node in tree:
         if isinstance(node, javalang.tree.MethodDeclaration):
@@ -28,51 +79,173 @@ def count_methods(contents: str) -> int:
     return method_count
 
 
-# Counts how many comments a java file passed as a string contains
-def count_comments(contents: str) -> int:
+def is_name(token: str) -> bool:
+    """
+    :param token: A token of a Java file
+    :return: If the token is a name or a primitive type (not a keyword, a number or a symbol)
+    """
+    return (token[0].isalpha() or token[0] in '_$') and token not in JAVA_KEYWORDS
+
+
+def ends_return_type(tokens: list[str], index: int) -> bool:
     """
-    Counts how many comments a java file passes as a string contains
+    :param tokens: The tokens of a Java file
+    :param index: The index of the token before a method name
+    :return: If the token is the last token of a return type ('int', 'String', 'List<T>', 'int[]'...)
+    """
+    if tokens[index] == ']':
+        return True
+    if tokens[index] == '>':
+        # 'List<T> name(' is a method but '<T> Name(' is a generic constructor
+        depth = 0
+        while index >= 0:
+            depth += {'>': 1, '<': -1}.get(tokens[index], 0)
+            if depth == 0:
+                return index > 0 and is_name(tokens[index - 1])
+            index -= 1
+        return False
+    return is_name(tokens[index]) and (index == 0 or tokens[index - 1] != '@')
+
+
+def starts_type(tokens: list[str], index: int) -> bool:
+    """
+    :param tokens: The tokens of a Java file
+    :param index: The index of a token of JAVA_TYPE_KEYWORDS
+    :return: If the token starts a type declaration. 'record' does only when it's followed by a name and '(' or '<'
+    """
+    if index > 0 and tokens[index - 1] == '.':  # A.class
+        return False
+    if tokens[index] != 'record':
+        return True
+    return index + 2 < len(tokens) and is_name(tokens[index + 1]) and tokens[index + 2] in ('(', '<')
+
+
+def count_methods_fast(contents: str) -> int:
+    """
+    Counts how many methods a java source code file contains without parsing it.
+    It goes through the tokens once and keeps track of the braces. A method is a name followed by '('
+    directly inside the body of a type, with a return type right before the name.
+    Constructors (no return type), calls and initialisers aren't methods, same as for count_methods
 
     :param contents: The contents of the Java file
     :type contents: str
-    :return: The comment count
+    :return: The method count
     :rtype: int
     """
-    lines = contents.splitlines()
-    comment_count = 0
-    currently_in_block_comment = False
-    for line in lines:
-        line = line.strip()
-        if not line:  # line is empty after strip
+    code = JAVA_LEXER_PATTERN.sub(lambda token: ' 0 ' if token.lastgroup == 'string' else ' ', contents)
+    tokens = JAVA_TOKEN_PATTERN.findall(code)
+    # Each scope is [is_type_body, parentheses open when it started, in_field_initialiser, in_enum_constants]
+    scopes = [[True, 0, False, False]]
+    parentheses = 0
+    new_calls = []  # for each open '(', if it's the arguments of 'new Type(...)'
+    after_new = False
+    closed_new_call = False
+    next_body = None  # the kind of type whose body the next '{' opens
+    method_count = 0
+    for index, token in enumerate(tokens):
+        scope = scopes[-1]
+        previous = tokens[index - 1] if index > 0 else ''
+        at_member_level = parentheses == scope[1]
+        if token == '(':
+            # 'record Name(' is the header of a record, not a method
+            if (scope[0] and at_member_level and not scope[2] and next_body is None and index > 1
+                    and is_name(previous) and ends_return_type(tokens, index - 2)):
+                method_count += 1
+            new_calls.append(after_new)
+            after_new = False
+            parentheses += 1
+        elif token == ')':
+            closed_new_call = new_calls.pop() if new_calls else False
+            parentheses = max(parentheses - 1, 0)
             continue
-        if currently_in_block_comment:
-            if "*/" in line:  # block comment finished
-                currently_in_block_comment = False
-                comment_count += line.count("*/")
+        elif token == '{':
+            if next_body == 'annotation':  # the elements of annotation types aren't methods
+                scopes.append([False, parentheses, False, False])
+            elif next_body is not None:
+                scopes.append([True, parentheses, False, next_body == 'enum'])
             else:
-                comment_count += 1
-        elif line.startswith("/*"):  # block comment starts
-            currently_in_block_comment = True
-            comment_count += line.count("/*")
-        elif "//" in line:  # an inline comment
-            comment_count += 1
-    return comment_count
+                anonymous_class = previous == ')' and closed_new_call
+                enum_constant_body = scope[3] and at_member_level
+                scopes.append([anonymous_class or enum_constant_body, parentheses, False, False])
+            next_body = None
+            after_new = False
+        elif token == '}':
+            if len(scopes) > 1:
+                scopes.pop()
+            scopes[-1][2] = False
+        elif token == ';':
+            if at_member_level:
+                scope[2] = scope[3] = False
+            after_new = False
+        elif token == '=' and scope[0] and at_member_level:
+            scope[2] = True
+        elif token == 'new':
+            after_new = True
+        elif token in JAVA_TYPE_KEYWORDS and starts_type(tokens, index):
+            next_body = 'annotation' if previous == '@' else 'enum' if token == 'enum' else 'type'
+        elif token == '[':
+            after_new = False
+        closed_new_call = False
+    return method_count
+
+
+def mark_lines(contents: str, start: int, end: int, line: int, marked: set[int]) -> int:
+    """
+    Marks the lines where a part of the file has something other than whitespace
+
+    :param contents: The contents of the Java file
+    :param start: Where the part starts
+    :param end: Where the part ends
+    :param line: The line the part starts on
+    :param marked: The marked lines. It's updated
+    :return: The line the part ends on
+    """
+    for offset, text in enumerate(contents[start:end].split('\n')):
+        if not text.isspace() and text:
+            marked.add(line + offset)
+    return line + contents.count('\n', start, end)
+
+
+def count_line_kinds(contents: str) -> LineCounts:
+    """
+    Goes through a Java file once and counts its comments and its comment, code and blank lines.
+    Comment markers inside string literals are not comments and comments after code on the same line are
+
+    :param contents: The contents of the Java file
+    :return: LineCounts
+    """
+    code_lines = set()
+    comment_lines = set()
+    comments = 0
+    line = 0
+    position = 0
+    for token in JAVA_LEXER_PATTERN.finditer(contents):
+        line = mark_lines(contents, position, token.start(), line, code_lines)
+        if token.lastgroup == 'string':
+            line = mark_lines(contents, token.start(), token.end(), line, code_lines)
+        else:
+            comments += 1
+            line = mark_lines(contents, token.start(), token.end(), line, comment_lines)
+        position = token.end()
+    mark_lines(contents, position, len(contents), line, code_lines)
+    lines = contents.count('\n') + (1 if contents and not contents.endswith('\n') else 0)
+    return LineCounts(lines, comments, len(comment_lines), len(code_lines), lines - len(code_lines | comment_lines))
 
 
-def count_lines(contents: str) -> int:
+# Counts how many comments a java file passed as a string contains
+def count_comments(contents: str) -> int:
     """
-    Counts how many lines a java file passes as a string contains.
+    Counts how many lines of a java file passed as a string contain comments
 
     :param contents: The contents of the Java file
     :type contents: str
-    :return: The line count
+    :return: The comment count
     :rtype: int
     """
-    lines = contents.splitlines()
-    return len(lines)
+    return count_line_kinds(contents).comment_lines
 
 
-def get_java_file_stats(contents: str, main_class: str) -> dict[str, int]:
+def get_java_file_stats(contents: str, main_class: str, fast_methods: bool = False) -> dict[str, int]:
     """
     Takes a java file and the name of its public class and returns a dictionary with statistics about it
 
@@ -80,20 +253,94 @@ def get_java_file_stats(contents: str, main_class: str) -> dict[str, int]:
     :type contents: str
     :param main_class: The name of the public class in the java file
     :type main_class: str
+    :param fast_methods: Count the methods from the tokens instead of parsing the file
     :return: Dict with the following keys
-        'NUMBER_OF_METHODS', 'NUMBER_OF_COMMENTS', 'NUMBER_OF_LINES', 'CHECKSTYLE_ERRORS'
+        'NUMBER_OF_METHODS', 'NUMBER_OF_COMMENTS', 'NUMBER_OF_LINES', 'NUMBER_OF_CODE_LINES', 'NUMBER_OF_BLANK_LINES',
+        'NUMBER_OF_COMMENT_BLOCKS'
+        | NUMBER_OF_COMMENTS counts the lines with comments and NUMBER_OF_LINES the lines without them
     """
-    results = {
-        'NUMBER_OF_METHODS': count_methods(contents),
-        'NUMBER_OF_COMMENTS': count_comments(contents),
+    line_counts = count_line_kinds(contents)
+    return {
+        'NUMBER_OF_METHODS': count_methods_fast(contents) if fast_methods else count_methods(contents),
+        'NUMBER_OF_COMMENTS': line_counts.comment_lines,
+        'NUMBER_OF_LINES': line_counts.lines - line_counts.comment_lines,
+        'NUMBER_OF_CODE_LINES': line_counts.code_lines,
+        'NUMBER_OF_BLANK_LINES': line_counts.blank_lines,
+        'NUMBER_OF_COMMENT_BLOCKS': line_counts.comments,
     }
-    results['NUMBER_OF_LINES'] = count_lines(contents) - results['NUMBER_OF_COMMENTS']
-    return results
+
+
+class ParsingPool:
+    """
+    Process pool the Java files are parsed in. javalang is pure Python, so parsing in threads would use one core.
+    The pool is started the first time it's needed and shared by every repository of the run
+    """
+
+    def __init__(self, processes: Optional[int] = None, serial: bool = False, fast_methods: bool = False):
+        """
+        :param processes: The number of processes (default: the number of cores)
+        :param serial: Parse in the current process instead (for debugging)
+        :param fast_methods: Count the methods from the tokens instead of parsing the files
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.serial = serial or self.processes == 1
+        self.fast_methods = fast_methods
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """
+        :return: The process pool. It's created the first time
+        """
+        with self.lock:
+            if self.executor is None:
+                # Workers are spawned rather than forked, forking a process which runs other threads isn't safe
+                self.executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+    def map_stats(self, files_dict: dict[str, str]) -> list[dict[str, int]]:
+        """
+        Computes the stats of every file
+
+        :param files_dict: a dictionairy from the file name to the file contents
+        :return: The stats of the files in the order of the dictionary
+        """
+        if self.serial or len(files_dict) < MIN_FILES_FOR_PROCESS_POOL:
+            return [get_java_file_stats(contents, file, self.fast_methods) for file, contents in files_dict.items()]
+        chunk_size = max(1, len(files_dict) // (self.processes * CHUNKS_PER_PROCESS))
+        return list(self.get_executor().map(get_java_file_stats, files_dict.values(), files_dict.keys(),
+                                            repeat(self.fast_methods), chunksize=chunk_size))
+
+    def shutdown(self) -> None:
+        """Stops the processes of the pool"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+parsing_pool = ParsingPool()
+
+
+def configure(processes: Optional[int] = None, serial: bool = False, fast_methods: bool = False) -> None:
+    """
+    Sets how Java files are parsed for the rest of the run
+
+    :param processes: The number of processes parsing Java files (default: the number of cores)
+    :param serial: Parse every file in the main process instead (for debugging)
+    :param fast_methods: Count the methods from the tokens instead of parsing the files
+    """
+    global parsing_pool
+    parsing_pool.shutdown()
+    parsing_pool = ParsingPool(processes, serial, fast_methods)
 
 
 def get_repository_java_files_stats(files_dict: dict[str, str]) -> dict[str, dict[str, int]]:
     """
-    Takes a dictionairy of java files and returns a dictionairy which contains Stats about them
+    Takes a dictionairy of java files and returns a dictionairy which contains Stats about them.
+    Files whose contents were analysed before are looked up in the analysis cache,
+    the rest are parsed across a pool of processes unless serial parsing is configured
 
     :param files_dict: a dictionairy from the file name to the file contents
     :return: A dictionairy of dictionaries. First order of dictionaries connect a java file name (string)
@@ -101,31 +348,58 @@ def get_repository_java_files_stats(files_dict: dict[str, str]) -> dict[str, dic
         The sub-dictionaries contain statistics about each file and connect one of the following keys
         'NUMBER_OF_METHODS', 'NUMBER_OF_COMMENTS', 'NUMBER_OF_LINES', 'CHECKSTYLE_ERRORS' to their count
     """
-    result_dict = {}
-    for file in files_dict:
-        result_dict[file] = get_java_file_stats(files_dict[file], file)
+    cache = get_analysis_cache()
+    if cache is None:
+        return dict(zip(files_dict, parsing_pool.map_stats(files_dict)))
+    analyser = 'java_stats_fast' if parsing_pool.fast_methods else 'java_stats'
+    shas = {file: content_sha(contents) for file, contents in files_dict.items()}
+    result_dict = {file: cache.get(analyser, JAVA_STATS_VERSION, sha) for file, sha in shas.items()}
+    # Identical files (copies of the same class) are parsed once
+    missing = {shas[file]: files_dict[file] for file, stats in result_dict.items() if stats is None}
+    computed = dict(zip(missing, parsing_pool.map_stats(missing)))
+    for sha, stats in computed.items():
+        cache.put(analyser, JAVA_STATS_VERSION, sha, stats)
+    for file, stats in result_dict.items():
+        if stats is None:
+            result_dict[file] = computed[shas[file]]
     return result_dict
 
 
 # Returns in a tuple of 2 boolean values
 # If comments per method and comments per line are enough
 # True means they are ok!
-def commenting_ok(stats_dict: dict[str, int]) -> (bool, bool):
+def commenting_ok(stats_dict: dict[str, int], methods_per_comment: float = METHODS_PER_COMMENT,
+                  lines_per_comment: float = LINES_PER_COMMENT) -> (bool, bool):
     """
     Checks if a java file has the required comment coverage
 
     :param stats_dict: Dictionairy of a java files statistics
+    :param methods_per_comment: The most methods there may be per comment line
+    :param lines_per_comment: The most lines there may be per comment line
     :return: Boolean tuple (method_coverage, line_coverage). True where criteria met, else False
     """
     try:
         comments_per_method_ok = stats_dict['NUMBER_OF_COMMENTS'] / stats_dict[
-            'NUMBER_OF_METHODS'] > 1 / METHODS_PER_COMMENT
+            'NUMBER_OF_METHODS'] > 1 / methods_per_comment
     except ZeroDivisionError:  # This means the class doesn't have any methods. Most likely deals with graphics
         comments_per_method_ok = True
 
     try:
-        comments_per_line_ok = stats_dict['NUMBER_OF_COMMENTS'] / stats_dict['NUMBER_OF_LINES'] > 1 / LINES_PER_COMMENT
+        comments_per_line_ok = stats_dict['NUMBER_OF_COMMENTS'] / stats_dict['NUMBER_OF_LINES'] > 1 / lines_per_comment
     except ZeroDivisionError:  # This means the class doesn't have any methods. Most likely deals with graphics
         comments_per_line_ok = True
 
     return comments_per_method_ok, comments_per_line_ok
+
+
+def modularity_ok(line_count, method_count, max_average_method_size: float = MODULARITY_AVG_METHOD_SIZE):
+    """
+    Checks if the methods of a repository are small enough on average. The counts can be the ints of one repository
+    or NumPy arrays with the counts of many (regrade.py), the check is the same for both
+
+    :param line_count: The number of lines of the non test java files
+    :param method_count: The number of methods of the non test java files
+    :param max_average_method_size: The average method size (in lines) methods must stay under
+    :return: True where the criterion is met. Without methods there is no average method size, so it isn't met
+    """
+    return (method_count > 0) & (line_count < max_average_method_size * method_count)
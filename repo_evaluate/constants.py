@@ -17,7 +17,7 @@ CSV_HEADERS = ['REPOSITORY ADDRESS', 'README EXISTS', 'README IS BIG', 'README U
                'CONTRIBUTING FILE EXISTS', 'BUILD FILE EXISTS', 'BUILD FILE IS OK', 'TEST FILES EXIST',
                'NUMBER OF TEST CLASSES', 'NUMBER OF NON TEST CLASSES', 'USES GITHUB FEATURES', 'NUMBER OF COMMENTS',
                'NUMBER OF LINES', 'NUMBER OF METHODS', 'USES CHECKSTYLE', 'USES SPOTBUGS', 'USES CI',
-               'NUMBER OF COMMITS', 'NUMBER OF CONTRIBUTORS', 'NUMBER OF BRANCHES ']
+               'NUMBER OF COMMITS', 'NUMBER OF CONTRIBUTORS', 'NUMBER OF BRANCHES ', 'HEAD COMMIT SHA']
 
 # Top marks (what is the highest grade possible)
 TOP_MARK = 10
@@ -54,6 +54,7 @@ METHODS_PER_COMMENT = 1
 
 # Testing #
 TEST_CLASS_PER_NORMAL_CLASS = 0.5
+MINIMUM_TEST_RATIO = 0.25  # test classes per non test class needed for the test coverage grade
 
 # Modularity #
 MODULARITY_AVG_METHOD_SIZE = 20
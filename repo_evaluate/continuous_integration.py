@@ -1,16 +1,27 @@
 """
 This module deals with evaluating CI usage
 """
-import os
-
-from github import Github
-from github.GithubException import UnknownObjectException, GithubException
-
-import search
-
-from api import get_github_instance
-
-g = get_github_instance()
+import feature_probes
+from source import get_source, is_local_address
+
+# Configuration files of CI services, at the places the services look for them
+CI_FILE_PATHS = {
+    '.travis.yml',  # Travis CI
+    '.circleci/config.yml', 'circleci/config.yml',  # Circle CI
+    '.gitlab-ci.yml',  # GitLab CI
+    'Jenkinsfile',  # Jenkins
+    'azure-pipelines.yml', 'azure-pipelines.yaml',  # Azure Pipelines
+    'bitbucket-pipelines.yml',  # Bitbucket Pipelines
+    'appveyor.yml', '.appveyor.yml',  # AppVeyor
+    '.drone.yml',  # Drone
+    '.woodpecker.yml',  # Woodpecker
+    '.semaphore/semaphore.yml',  # Semaphore
+    'cloudbuild.yaml', 'cloudbuild.yml',  # Google Cloud Build
+    'buildspec.yml',  # AWS CodeBuild
+}
+
+# Directories where every YAML file is a CI configuration
+CI_DIRECTORIES = ('.github/workflows/', '.buildkite/', '.woodpecker/')
 
 
 def repos_use_ci(repo_addresses: list[str]) -> dict[str, bool]:
@@ -29,31 +40,33 @@ def repos_use_ci(repo_addresses: list[str]) -> dict[str, bool]:
     return ci_usage
 
 
+def get_ci_files(repo_address: str) -> list[str]:
+    """
+    Finds the configuration files of CI services in a repository. Only the paths are looked at,
+    so this costs nothing more than the file listing of the repository (one request at most)
+
+    :param repo_address: The address of the repository in the format 'username/repo_name'
+    :return: The paths of the CI configuration files
+    """
+    return [file.path for file in get_source(repo_address).list_files()
+            if file.path in CI_FILE_PATHS
+            or (file.path.startswith(CI_DIRECTORIES) and file.path.endswith(('.yml', '.yaml')))]
+
+
 def repo_uses_ci(repo_address: str) -> bool:
     """
     Checks if a repository uses a continuous integration (CI) service.
+    No file contents are downloaded, we look for the configuration files of known CI services
+    and then, if there aren't any, for runs of GitHub Actions
 
     :param repo_address: The address of the repository in the format 'username/repo_name'
     :type repo_address: str
     :return: True if the repository uses a CI service, False otherwise
     :rtype: bool
     """
-    repo = g.get_repo(repo_address)
-    try:
-        repo.get_contents('.travis.yml')  # we check for Travis CI file
+    if get_ci_files(repo_address):
         return True
-    except (UnknownObjectException, GithubException):
-        try:
-            repo.get_contents('circleci/config.yml')  # we check for a Circle CI file
-            return True
-        except (UnknownObjectException, GithubException):
-            if repo_uses_actions(repo_address):  # we look for use of GitHub Actions
-                return True
-            elif bool(search.search_name_contains_return_file('.yml', '',
-                                                              repo_address)):  # is there any yml file?
-                return True
-            else:
-                return False
+    return repo_uses_actions(repo_address)  # runs can exist even if the workflows were deleted
 
 
 def repo_uses_actions(repo_address: str) -> bool:
@@ -65,18 +78,7 @@ def repo_uses_actions(repo_address: str) -> bool:
     :rtype: bool
     """
 
-    # Actions are not available as a part of the python wrapper for
-    # GitHub RESTful API, so we need to directly request them using HTTP requests
-
-    # Imports happen here in order to not strain the whole module if this never runs!
-    import requests
-    import json
-
-    # Set the GitHub API endpoint
-    restful_endpoint = f'https://api.github.com/repos/{repo_address}/actions/runs'
-    response = requests.get(restful_endpoint, headers={'Authorization': 'Bearer ' + os.environ["GITHUB_ACCESS_TOKEN"]})
-    try:
-        total_actions_count = json.loads(response.text)['total_count']
-    except KeyError:
+    if is_local_address(repo_address):  # Actions only exist on GitHub
         return False
-    return total_actions_count > 0
+    # GitHub feature detection asks for this as well, so the probe is shared with it
+    return feature_probes.probe(repo_address, 'uses_actions')
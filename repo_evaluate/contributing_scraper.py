@@ -3,13 +3,19 @@ This module defines all methods which deal with the contributing files
 """
 import os
 
-from github import Github
-from github.GithubException import UnknownObjectException, GithubException
+from source import get_source
 
-from api import get_github_instance
 
-g = get_github_instance()
 
+def get_contributing_file(repo_address: str) -> str:
+    """Method gets the contributing file of a repository from git and decodes it in utf-8 form.
+
+    :param repo_address: repository address in format 'author/name'
+    :type repo_address: str
+    :return: The contributing file or None if the repository doesn't have one
+    :rtype str
+    """
+    return get_source(repo_address).read_file("CONTRIBUTING.md")  # decoded to utf-8
 
 
 def get_contributing_files(repo_addresses: list[str]) -> dict[str, str]:
@@ -23,11 +29,5 @@ def get_contributing_files(repo_addresses: list[str]) -> dict[str, str]:
     """
     contributing_files = {}
     for address in repo_addresses:
-        repo = g.get_repo(address)
-        try:
-            contributing_contents = repo.get_contents("CONTRIBUTING.md").decoded_content.decode(
-                'utf-8')  # decode to utf-8
-        except (UnknownObjectException, GithubException):
-            contributing_contents = None
-        contributing_files[address] = contributing_contents
+        contributing_files[address] = get_contributing_file(address)
     return contributing_files
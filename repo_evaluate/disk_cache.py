@@ -0,0 +1,85 @@
+"""
+This module defines a persistent key-value cache stored in a SQLite file.
+The cache has a size cap and when it grows over it the least recently used entries are evicted
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# When the cap is exceeded entries are evicted until the cache is this fraction of the cap
+EVICTION_TARGET = 0.9
+
+
+class DiskCache:
+    """
+    Thread safe key-value cache on disk with least recently used eviction.
+    Keys are strings and values are bytes
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        :param path: The path of the SQLite file. Its directory is created if it doesn't exist
+        :param max_bytes: The maximum total size of the values
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                                "last_used REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        :param key: The key of the entry
+        :return: The value of the entry or None if there is no such entry
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Stores an entry, replacing any previous entry with the same key.
+        Values bigger than the whole cache are not stored
+
+        :param key: The key of the entry
+        :param value: The value of the entry
+        """
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            row = self.connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+            self.connection.execute("INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                                    (key, value, len(value), time.time()))
+            self.total_bytes += len(value)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+            self.connection.commit()
+
+    def evict(self) -> None:
+        """Deletes the least recently used entries until the cache is under its cap. The lock must be held"""
+        rows = self.connection.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes * EVICTION_TARGET:
+                break
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.total_bytes -= size
+
+    def close(self) -> None:
+        """Closes the SQLite file"""
+        with self.lock:
+            self.connection.close()
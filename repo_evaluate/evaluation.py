@@ -0,0 +1,146 @@
+"""
+This module defines the evaluation record of a repository.
+Everything the CSV file and the grade file need is scraped once into the record,
+so neither of them goes back to the repository. The records are kept in the feature store (feature_store.py)
+"""
+from typing import Optional
+
+from constants import CSV_HEADERS
+from readme_scraper import readme_is_big, readme_uses_markdown
+
+# The attribute of the record every CSV header is read from
+CSV_COLUMNS = {
+    'REPOSITORY ADDRESS': 'address',
+    'README EXISTS': 'readme_exists',
+    'README IS BIG': 'readme_is_big',
+    'README USES MARKDOWN': 'readme_uses_markdown',
+    'LICENCE FILE EXISTS': 'licence_exists',
+    'CONTRIBUTING FILE EXISTS': 'contributing_exists',
+    'BUILD FILE EXISTS': 'build_exists',
+    'BUILD FILE IS OK': 'build_file_ok',
+    'TEST FILES EXIST': 'test_files_exist',
+    'NUMBER OF TEST CLASSES': 'test_count',
+    'NUMBER OF NON TEST CLASSES': 'non_test_count',
+    'USES GITHUB FEATURES': 'uses_github_features',
+    'NUMBER OF COMMENTS': 'comment_count',
+    'NUMBER OF LINES': 'line_count',
+    'NUMBER OF METHODS': 'method_count',
+    'USES CHECKSTYLE': 'uses_checkstyle',
+    'USES SPOTBUGS': 'uses_spotbugs',
+    'USES CI': 'uses_ci',
+    'NUMBER OF COMMITS': 'commit_count',
+    'NUMBER OF CONTRIBUTORS': 'contributor_count',
+    'NUMBER OF BRANCHES ': 'branch_count',
+    'HEAD COMMIT SHA': 'head_sha',
+}
+
+# The columns which hold text. The rest hold counts, or flags written as 1 or 0
+TEXT_COLUMNS = {'REPOSITORY ADDRESS', 'HEAD COMMIT SHA'}
+
+
+def parse_csv_row(row: list[str]) -> list:
+    """
+    Converts a row read back from a result CSV file to the values csv_row() gives
+
+    :param row: The values of CSV_HEADERS as strings
+    :return: The values with counts and flags as integers and empty cells as None
+    """
+    return [None if value == '' else value if header in TEXT_COLUMNS else int(value)
+            for header, value in zip(CSV_HEADERS, row)]
+
+
+class Evaluation:
+    """
+    The scraped facts of one repository. Nothing is graded here, the grades are computed from the record,
+    so it can be stored and graded again under another rubric
+    """
+    __slots__ = ('address', 'readme_size', 'readme_raw_size', 'licence_exists', 'contributing_exists', 'build_tool',
+                 'build_file_ok', 'test_count', 'non_test_count', 'uses_github_features', 'java_files_stats',
+                 'uses_checkstyle', 'uses_spotbugs', 'uses_ci', 'commit_count', 'contributor_count', 'branch_count',
+                 'head_sha')
+
+    def __init__(self, address: str):
+        """
+        :param address: repository address in format 'author/name' (or a local path)
+        """
+        self.address = address
+        self.readme_size: Optional[int] = None  # None when there is no README
+        self.readme_raw_size: Optional[int] = None  # The size of the README without Markdown elements
+        self.licence_exists = False
+        self.contributing_exists = False
+        self.build_tool: Optional[str] = None  # 'Maven', 'Gradle - Groovy', 'Gradle - Kotlin' or None
+        self.build_file_ok = False
+        self.test_count = 0
+        self.non_test_count = 0
+        self.uses_github_features = False
+        # The stats of every non test java file, as given by code_quality.get_repository_java_files_stats
+        self.java_files_stats: dict[str, dict[str, int]] = {}
+        self.uses_checkstyle = False
+        self.uses_spotbugs = False
+        self.uses_ci = False
+        self.commit_count = 0
+        self.contributor_count = 0
+        self.branch_count = 0
+        self.head_sha: Optional[str] = None
+
+    @property
+    def readme_exists(self) -> bool:
+        return self.readme_size is not None
+
+    @property
+    def readme_is_big(self) -> bool:
+        return self.readme_exists and readme_is_big(self.readme_size)
+
+    @property
+    def readme_uses_markdown(self) -> bool:
+        return self.readme_exists and readme_uses_markdown(self.readme_size, self.readme_raw_size)
+
+    @property
+    def build_exists(self) -> bool:
+        return self.build_tool is not None
+
+    @property
+    def test_files_exist(self) -> bool:
+        return self.test_count > 0
+
+    @property
+    def java_files_exist(self) -> bool:
+        """
+        :return: If the repository has non test java files. Without them the code isn't graded
+        """
+        return self.non_test_count > 0
+
+    @property
+    def comment_count(self) -> int:
+        return sum(stats['NUMBER_OF_COMMENTS'] for stats in self.java_files_stats.values())
+
+    @property
+    def line_count(self) -> int:
+        return sum(stats['NUMBER_OF_LINES'] for stats in self.java_files_stats.values())
+
+    @property
+    def method_count(self) -> int:
+        return sum(stats['NUMBER_OF_METHODS'] for stats in self.java_files_stats.values())
+
+    def csv_row(self) -> list:
+        """
+        :return: The values of CSV_HEADERS for the repository. Booleans are written as 1 or 0
+        """
+        row = []
+        for header in CSV_HEADERS:
+            value = getattr(self, CSV_COLUMNS[header])
+            row.append(int(value) if isinstance(value, bool) else value)
+        return row
+
+    @classmethod
+    def from_dict(cls, facts: dict) -> 'Evaluation':
+        """
+        :param facts: A dictionary from the names of facts (the attributes of the record) to their values
+        :return: The record
+        """
+        evaluation = cls(facts['address'])
+        for name in cls.__slots__:
+            if name in facts:
+                setattr(evaluation, name, facts[name])
+        return evaluation
+
@@ -0,0 +1,138 @@
+"""
+This module probes repositories for the use of GitHub features (Issues, Projects, Actions).
+Every probe costs one request, which asks for the first item of a list: one item is enough to tell
+that a feature is used. The issues list has the pull requests as well, so when its first item is a pull request
+the issues probe asks for one page of the list (a second request). When the page only has pull requests too,
+they are counted as issues rather than spending more requests or the quota of the search API.
+The probes of a repository run at the same time and their answers are kept in the run cache,
+where CI detection finds the Actions one
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from api import rest_get
+from ratelimit import get_scheduler
+from run_cache import get_run_cache
+
+# Items of the issues list asked for when its first item is a pull request (issues with a 'pull_request' key).
+# Usually there is an issue among them
+ISSUES_PAGE_SIZE = 100
+
+# The run cache resource of every probe and the list endpoint it asks for the first items of (one by default).
+# Workflow runs and Actions runs are the same list, so one probe answers for both
+PROBES = {
+    'uses_issues': ('issues', {'state': 'all'}),
+    'uses_projects': ('projects', {}),
+    'uses_actions': ('actions/runs', {}),
+}
+
+# Probes sent at the same time across all repositories. The threads are kept for the run,
+# so their sessions keep their connections alive between repositories
+PROBE_WORKERS = 8
+
+probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix='probe')
+
+
+def probe_parameters(feature: str) -> tuple[str, dict]:
+    """
+    :param feature: The name of the probe (a key of PROBES)
+    :return: Tuple of (endpoint, params) of the request of the probe, relative to the repository
+    """
+    endpoint, params = PROBES[feature]
+    return endpoint, {'per_page': 1, **params}
+
+
+def probe_answer(status: int, data: Any, more_pages: bool = False) -> Optional[bool]:
+    """
+    Reads the answer of a probe from its response
+
+    :param status: The status code of the response
+    :param data: The JSON body of the response
+    :param more_pages: If the list has more pages (a 'next' link)
+    :return: True if the list has an item, False if it's empty or the feature is disabled (404 or 410)
+        and None if the request failed or the answer isn't known from this page
+        (the issues list only has pull requests in it but has more pages)
+    """
+    if status in (404, 410):
+        return False
+    if status != 200:
+        return None
+    if isinstance(data, dict):  # Actions runs are wrapped in an object which counts them
+        return data.get('total_count', 0) > 0
+    # The issues list has the pull requests as well. Other lists don't have a 'pull_request' key
+    if any('pull_request' not in item for item in data):
+        return True
+    return None if more_pages else False
+
+
+def request_issues_page(repo_address: str) -> Optional[bool]:
+    """
+    Asks for a page of the issues list of a repository whose first item is a pull request.
+    If the list goes on after a page of pull requests, the pull requests are counted as issues
+
+    :param repo_address: repository address in format 'author/name'
+    :return: True if the page has an issue or the list goes on, False if the list only has pull requests
+        and None if the request failed
+    """
+    endpoint, params = PROBES['uses_issues']
+    response = rest_get(f'/repos/{repo_address}/{endpoint}', {**params, 'per_page': ISSUES_PAGE_SIZE})
+    if response.status_code != 200:
+        return None
+    answer = probe_answer(200, response.json(), 'next' in response.links)
+    return True if answer is None else answer
+
+
+def request_probe(repo_address: str, feature: str) -> bool:
+    """
+    Sends the request of a probe
+
+    :param repo_address: repository address in format 'author/name'
+    :param feature: The name of the probe (a key of PROBES)
+    :return: The answer of the probe. Failed requests count as not using the feature
+    """
+    endpoint, params = probe_parameters(feature)
+    response = rest_get(f'/repos/{repo_address}/{endpoint}', params)
+    status = response.status_code
+    answer = probe_answer(status, response.json() if status == 200 else None, 'next' in response.links)
+    if answer is None and status == 200:  # the first item of the issues is a pull request
+        answer = request_issues_page(repo_address)
+    return bool(answer)
+
+
+def probe(repo_address: str, feature: str) -> bool:
+    """
+    Returns the answer of a probe. Each probe is requested once per repository for the whole run
+
+    :param repo_address: repository address in format 'author/name'
+    :param feature: The name of the probe (a key of PROBES)
+    :return: True if the repository uses the feature, False if not
+    """
+    return get_run_cache().get((repo_address, feature), lambda: request_probe(repo_address, feature))
+
+
+def probe_features(repo_address: str) -> dict[str, bool]:
+    """
+    Runs every probe of a repository at the same time. Probes answered before (by CI detection or a prefetch)
+    aren't requested again
+
+    :param repo_address: repository address in format 'author/name'
+    :return: A dictionary from the name of each probe to its answer
+    """
+    # The phase of the scheduler belongs to the thread, so the probes enter the phase of the caller themselves.
+    # Otherwise their requests would be counted as 'other'
+    phase = get_scheduler().current_phase()
+    answers = [probe_executor.submit(probe_in_phase, phase, repo_address, feature) for feature in PROBES]
+    return {feature: answer.result() for feature, answer in zip(PROBES, answers)}
+
+
+def probe_in_phase(phase: str, repo_address: str, feature: str) -> bool:
+    """
+    Returns the answer of a probe, counting its request to a phase of the scheduler
+
+    :param phase: The name of the phase
+    :param repo_address: repository address in format 'author/name'
+    :param feature: The name of the probe (a key of PROBES)
+    :return: True if the repository uses the feature, False if not
+    """
+    with get_scheduler().phase(phase):
+        return probe(repo_address, feature)
@@ -0,0 +1,177 @@
+"""
+This module defines the feature store: a SQLite file with the raw facts the scraping found out about every repository
+(the record of evaluation.py) and about every one of its files (path, blob SHA, size and the stats of Java files).
+Every run adds its own rows, so runs can be compared without touching GitHub, for example
+
+    SELECT address FROM repositories WHERE run = 1 AND uses_ci
+    EXCEPT SELECT address FROM repositories WHERE run = 2 AND uses_ci
+
+lists the repositories which stopped using CI between runs 1 and 2.
+Grading, the results files and the CSV rows are made from the rows of the store, so scraping and grading can happen
+at different times or on different machines (regrade.py grades a stored run again)
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from evaluation import Evaluation
+from source import RepositoryFile
+
+DEFAULT_STORE_PATH = './repo_evaluate/features.sqlite'
+
+# The columns of the repositories table, one per fact of the record. Java file stats go to the files table
+REPOSITORY_COLUMNS = [name for name in Evaluation.__slots__ if name != 'java_files_stats']
+
+# Facts stored as 0 or 1
+BOOLEAN_COLUMNS = {'licence_exists', 'contributing_exists', 'build_file_ok', 'uses_github_features',
+                   'uses_checkstyle', 'uses_spotbugs', 'uses_ci'}
+
+# The column of every Java file stat of code_quality.get_java_file_stats
+JAVA_STATS_COLUMNS = {
+    'NUMBER_OF_METHODS': 'methods',
+    'NUMBER_OF_COMMENTS': 'comments',
+    'NUMBER_OF_LINES': 'lines',
+    'NUMBER_OF_CODE_LINES': 'code_lines',
+    'NUMBER_OF_BLANK_LINES': 'blank_lines',
+    'NUMBER_OF_COMMENT_BLOCKS': 'comment_blocks',
+}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS repositories (run INTEGER NOT NULL REFERENCES runs (id), address TEXT NOT NULL, "
+    "readme_size INTEGER, readme_raw_size INTEGER, licence_exists INTEGER NOT NULL, "
+    "contributing_exists INTEGER NOT NULL, build_tool TEXT, build_file_ok INTEGER NOT NULL, "
+    "test_count INTEGER NOT NULL, non_test_count INTEGER NOT NULL, uses_github_features INTEGER NOT NULL, "
+    "uses_checkstyle INTEGER NOT NULL, uses_spotbugs INTEGER NOT NULL, uses_ci INTEGER NOT NULL, "
+    "commit_count INTEGER NOT NULL, contributor_count INTEGER NOT NULL, branch_count INTEGER NOT NULL, "
+    "head_sha TEXT, PRIMARY KEY (run, address))",
+    "CREATE INDEX IF NOT EXISTS repositories_address ON repositories (address, run)",
+    "CREATE INDEX IF NOT EXISTS repositories_head_sha ON repositories (head_sha)",
+    # The stats columns are NULL for the files which aren't non test Java files
+    "CREATE TABLE IF NOT EXISTS files (run INTEGER NOT NULL, address TEXT NOT NULL, path TEXT NOT NULL, sha TEXT, "
+    "size INTEGER NOT NULL, methods INTEGER, comments INTEGER, lines INTEGER, code_lines INTEGER, "
+    "blank_lines INTEGER, comment_blocks INTEGER, PRIMARY KEY (run, address, path), "
+    "FOREIGN KEY (run, address) REFERENCES repositories (run, address))",
+    "CREATE INDEX IF NOT EXISTS files_sha ON files (sha)",
+]
+
+
+class FeatureStore:
+    """Thread safe store of the facts of every repository of every run"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        """
+        :param path: The path of the SQLite file. Its directory is created if it doesn't exist
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # Readers (dashboards, regrade.py) don't block the run which writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def start_run(self) -> int:
+        """
+        :return: The id of a new run
+        """
+        with self.lock, self.connection:
+            return self.connection.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+
+    def latest_run(self) -> Optional[int]:
+        """
+        :return: The id of the latest run or None if there are no runs
+        """
+        with self.lock:
+            return self.connection.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+
+    def save_evaluation(self, run: int, evaluation: Evaluation, files: list[RepositoryFile]) -> None:
+        """
+        Stores the facts of a repository, replacing what the run stored about it before
+
+        :param run: The id of the run
+        :param evaluation: The record of the repository
+        :param files: The files of the repository
+        """
+        repository_row = [run] + [getattr(evaluation, name) for name in REPOSITORY_COLUMNS]
+        file_rows = {file.path: [run, evaluation.address, file.path, file.sha, file.size]
+                     + [None] * len(JAVA_STATS_COLUMNS) for file in files}
+        for path, stats in evaluation.java_files_stats.items():
+            row = file_rows.setdefault(path, [run, evaluation.address, path, None, 0])
+            row[5:] = [stats.get(key) for key in JAVA_STATS_COLUMNS]
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM files WHERE run = ? AND address = ?", (run, evaluation.address))
+            self.connection.execute(f"INSERT OR REPLACE INTO repositories (run, {', '.join(REPOSITORY_COLUMNS)}) "
+                                    f"VALUES ({', '.join('?' * len(repository_row))})", repository_row)
+            self.connection.executemany(f"INSERT INTO files (run, address, path, sha, size, "
+                                        f"{', '.join(JAVA_STATS_COLUMNS.values())}) "
+                                        f"VALUES ({', '.join('?' * (5 + len(JAVA_STATS_COLUMNS)))})",
+                                        file_rows.values())
+
+    def load_evaluation(self, run: int, address: str) -> Optional[Evaluation]:
+        """
+        :param run: The id of the run
+        :param address: repository address in format 'author/name' (or a local path)
+        :return: The record of the repository in the run or None if the run didn't store it
+        """
+        evaluations = self.load_run(run, address)
+        return evaluations[0] if evaluations else None
+
+    def load_run(self, run: int, address: Optional[str] = None) -> list[Evaluation]:
+        """
+        Loads the records of every repository of a run
+
+        :param run: The id of the run
+        :param address: Load only the record of this repository
+        :return: The records, ordered by repository address
+        """
+        condition, parameters = ("run = ?", [run]) if address is None else ("run = ? AND address = ?", [run, address])
+        with self.lock:
+            repository_rows = self.connection.execute(
+                f"SELECT {', '.join(REPOSITORY_COLUMNS)} FROM repositories WHERE {condition} ORDER BY address",
+                parameters).fetchall()
+            file_rows = self.connection.execute(
+                f"SELECT address, path, {', '.join(JAVA_STATS_COLUMNS.values())} FROM files "
+                f"WHERE {condition} AND methods IS NOT NULL ORDER BY address, path", parameters).fetchall()
+        evaluations = {}
+        for row in repository_rows:
+            facts = {name: bool(value) if name in BOOLEAN_COLUMNS else value
+                     for name, value in zip(REPOSITORY_COLUMNS, row)}
+            evaluations[facts['address']] = Evaluation.from_dict(facts)
+        for file_address, path, *stats in file_rows:
+            evaluations[file_address].java_files_stats[path] = dict(zip(JAVA_STATS_COLUMNS, stats))
+        return list(evaluations.values())
+
+    def find_run(self, address: str, head_sha: str) -> Optional[int]:
+        """
+        Finds the latest run which stored a repository at a commit
+
+        :param address: repository address in format 'author/name' (or a local path)
+        :param head_sha: The SHA of the head commit of the default branch
+        :return: The id of the run or None if no run stored the repository at that commit
+        """
+        with self.lock:
+            return self.connection.execute("SELECT MAX(run) FROM repositories WHERE address = ? AND head_sha = ?",
+                                           (address, head_sha)).fetchone()[0]
+
+    def copy_evaluation(self, from_run: int, run: int, address: str) -> None:
+        """
+        Stores the facts of a repository in a run again, as another run stored them
+
+        :param from_run: The id of the run which stored the facts
+        :param run: The id of the run the facts are stored in
+        :param address: repository address in format 'author/name' (or a local path)
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM files WHERE run = ? AND address = ?", (run, address))
+            self.connection.execute(f"INSERT OR REPLACE INTO repositories (run, {', '.join(REPOSITORY_COLUMNS)}) "
+                                    f"SELECT ?, {', '.join(REPOSITORY_COLUMNS)} FROM repositories "
+                                    f"WHERE run = ? AND address = ?", (run, from_run, address))
+            self.connection.execute("INSERT INTO files SELECT ?, address, path, sha, size, "
+                                    f"{', '.join(JAVA_STATS_COLUMNS.values())} FROM files "
+                                    "WHERE run = ? AND address = ?", (run, from_run, address))
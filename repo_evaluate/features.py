@@ -3,16 +3,11 @@ This module defines all methods which look for usage of GitHub features.
 Such as Issues, Actions, Projects or Workflows.
 Also, it can also check if some requirements are met (amount of commits and contributors)
 """
-import os
-import continuous_integration
-
-from github import Github
+import feature_probes
 
 from constants import *
 
-from api import get_github_instance
-
-g = get_github_instance()
+from source import get_source, is_local_address
 
 
 
@@ -24,12 +19,7 @@ def repo_uses_issues(repo_address: str) -> bool:
     :return: True if it uses Issues, False if not
     :rtype: bool
     """
-    repo = g.get_repo(repo_address)
-    events = repo.get_events()
-    for event in events:
-        if event.type == "IssuesEvent" or event.type == "IssueCommentEvent":
-            return True
-    return False
+    return feature_probes.probe(repo_address, 'uses_issues')
 
 
 def repo_uses_projects(repo_address: str) -> bool:
@@ -40,43 +30,34 @@ def repo_uses_projects(repo_address: str) -> bool:
     :return: True if it uses Projects, False if not
     :rtype: bool
     """
-    repo = g.get_repo(repo_address)
-    return repo.get_projects().totalCount > 0
+    return feature_probes.probe(repo_address, 'uses_projects')
 
 
 def repo_uses_workflows(repo_address: str) -> bool:
     """
-    Returns weather or not a repository uses GitHub feature Workflows
+    Returns weather or not a repository uses GitHub feature Workflows.
+    Workflow runs are Actions runs, so this is the same probe as continuous_integration.repo_uses_actions
 
     :param repo_address: repository address in format 'author/name'
     :return: True if it uses Workflows, False if not
     :rtype: bool
     """
-    repo = g.get_repo(repo_address)
-    return repo.get_workflow_runs().totalCount > 0
+    return feature_probes.probe(repo_address, 'uses_actions')
 
 
 def repo_uses_github_features(repository_address: str) -> bool:
     """
     Checks if a repository has used a GitHub feature (actions, issues etc).
-    Issues checked first as they are the most common feature
-    Actions checked last as an HTTP request required
+    Every feature is probed at the same time with one request each, so this costs the same number of requests
+    for every repository (and none for the probes CI detection already answered)
 
      :param repository_address: repository address in format 'author/name'
      :return: True if it uses at least ONE feature, False if it uses NON
      :rtype: bool
      """
-    # if statement instead of multiple 'or' because it's cleaner and explains what is happening better!
-    if repo_uses_issues(repository_address):
-        return True
-    elif repo_uses_workflows(repository_address):
-        return True
-    elif repo_uses_projects(repository_address):
-        return True
-    elif continuous_integration.repo_uses_actions(repository_address):
-        return True
-    else:
+    if is_local_address(repository_address):  # features only exist on GitHub
         return False
+    return any(feature_probes.probe_features(repository_address).values())
 
 
 def commit_count_ok(repository_address: str) -> bool:
@@ -88,8 +69,7 @@ def commit_count_ok(repository_address: str) -> bool:
         , False otherwise
      :rtype: bool
      """
-    repo = g.get_repo(repository_address)
-    return repo.get_commits().totalCount > MINIMUM_AMOUNT_OF_COMMITS
+    return get_source(repository_address).commit_count() > MINIMUM_AMOUNT_OF_COMMITS
 
 
 def contributor_count_ok(repository_address) -> bool:
@@ -100,8 +80,7 @@ def contributor_count_ok(repository_address) -> bool:
      :return: True if it has had enough different contributors, False otherwise
      :rtype: bool
      """
-    repo = g.get_repo(repository_address)
-    return repo.get_contributors().totalCount > MINIMUM_AMOUNT_OF_CONTRIBUTORS
+    return get_source(repository_address).contributor_count() > MINIMUM_AMOUNT_OF_CONTRIBUTORS
 
 #   OR
 #   return repository_address.get_contributors().totalCount > MINIMUM_AMOUNT_OF_CONTRIBUTORS_FACTORS *
@@ -1,46 +1,119 @@
 """
 This module defines all methods which deal with grading the assignment
 """
+from code_quality import commenting_ok, modularity_ok
 from constants import *
-import features
+from evaluation import Evaluation
+from readme_scraper import readme_is_big, readme_uses_markdown
+from rubric import DEFAULT_RUBRIC, Rubric
+from source import results_directory_name
+from testing import find_test_ratio
 
+RESULTS_DIRECTORY = './repo_evaluate/results'
 
-def grade_update(current_grade_dict: dict[str, float], module: str, grade: float) -> dict[str, float]:
+
+def repository_results_directory(repo: str, results_directory: str = RESULTS_DIRECTORY) -> str:
     """
-    Function takes the grade dictionary and updates it with the new grade added to a module
-    :param current_grade_dict: The grade dictionairy which need to be updated
-    :param module: the grading module which is being updated
-    :param grade: the grade which was received in the module
-    :return: The updated grade dictionairy
+    :param repo: repository address in format 'author/name' (or a local path)
+    :param results_directory: The directory with the results directories of the repositories
+    :return: The results directory of the repository. It is always inside the results directory
     """
-    current_grade_dict[module] = grade
-    return current_grade_dict
-
+    return f"{results_directory}/{results_directory_name(repo)}"
 
 
-def initialise_grade_dictionary(github_repositories: list[str]) -> dict[str, dict[str, float]]:
+def initialise_grades() -> dict[str, float]:
     """
-    Function initialises the grade dictionary with all the module grades as 0
+    Function initialises the grade dictionary of a repository with all the module grades as 0
     As new gradings are added the modules will be updated
 
-    :param github_repositories: repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
-    :return: A dictionairy of dictionaries. The top level dictionairy connects repository address to grade dictionaries.
-        The bottom level dictionairy connects grading modules to grades
+    :return: A dictionairy which connects grading modules to grades
+    """
+    return dict.fromkeys(FINAL_MODULES, 0)
+
+
+def commenting_coverage(java_files_stats: dict[str, dict[str, int]], rubric: Rubric = DEFAULT_RUBRIC) -> (float, float):
     """
-    grade_dict = {}
-    for repository in github_repositories:
-        grade_dict[repository] = {}
-        for module in FINAL_MODULES:
-            grade_dict[repository] = grade_update(grade_dict[repository], module, 0)
+    Finds the share of java files which have the required comment coverage
+
+    :param java_files_stats: The stats of the non test java files of a repository
+    :param rubric: The rubric with the comment thresholds
+    :return: Tuple (method_coverage, line_coverage) of the shares of files which meet each criterion
+    """
+    method_coverage_count = 0
+    line_coverage_count = 0
+    for stats in java_files_stats.values():
+        (method_coverage_ok, line_coverage_ok) = commenting_ok(stats, rubric.METHODS_PER_COMMENT,
+                                                               rubric.LINES_PER_COMMENT)
+        method_coverage_count += method_coverage_ok
+        line_coverage_count += line_coverage_ok
+    return method_coverage_count / len(java_files_stats), line_coverage_count / len(java_files_stats)
 
-    return grade_dict
 
+def grade_evaluation(evaluation: Evaluation, rubric: Rubric = DEFAULT_RUBRIC) -> dict[str, float]:
+    """
+    Grades a repository from its evaluation record. Nothing is requested, everything comes from the record
 
-def finalise_grades(grade_module_dict: dict[str, float]) -> dict[str, float]:
+    :param evaluation: The evaluation record of the repository
+    :param rubric: The rubric to grade with
+    :return: The finalised grade dictionairy
+    """
+    grades = initialise_grades()
+
+    # Evaluate README and the extra credit of a big README which uses markdown
+    if evaluation.readme_exists:
+        grades['README'] = rubric.README
+        if readme_is_big(evaluation.readme_size, rubric.BIG_README_SIZE):
+            grades['BIG_README'] = rubric.BIG_README
+        if readme_uses_markdown(evaluation.readme_size, evaluation.readme_raw_size, rubric.FACTOR_README_MARKDOWN):
+            grades['README_USES_MARKDOWN'] = rubric.README_USES_MARKDOWN
+
+    if evaluation.licence_exists:
+        grades['LICENCE_FILE'] = rubric.LICENCE_FILE
+    if evaluation.contributing_exists:
+        grades['CONTRIBUTING_FILE'] = rubric.CONTRIBUTING_FILE
+
+    # Evaluate package
+    # We use the percent of the file existing (or being well-formed) times the points packaging gets
+    if evaluation.build_exists:
+        grades['BUILD_EXISTS'] = rubric.EXISTENCE_OF_BUILD_FILE * rubric.PACKAGING
+        if evaluation.build_file_ok:
+            grades['BUILD_FILE_OK'] = rubric.FILE_IS_WELL_FORMED * rubric.PACKAGING
+
+    # Evaluate test file existence and test ratio
+    if evaluation.test_files_exist:
+        grades['TESTING_EXISTENCE'] = rubric.TESTING_EXISTENCE * rubric.TESTING
+    if find_test_ratio(evaluation.test_count, evaluation.non_test_count) > rubric.MINIMUM_TEST_RATIO:
+        grades['TESTING_COVERAGE'] = rubric.TESTING_COVERAGE * rubric.TESTING
+
+    if evaluation.uses_github_features:
+        grades['GITHUB_FEATURES'] = rubric.GITHUB_FEATURES
+
+    # Evaluate Comments and Modularity
+    if evaluation.java_files_exist:
+        method_coverage, line_coverage = commenting_coverage(evaluation.java_files_stats, rubric)
+        grades['COMMENTING_METHOD_COVERAGE'] = (method_coverage * rubric.PERCENTAGE_METHOD_PER_COMMENT
+                                                * rubric.COMMENTING)
+        grades['COMMENTING_LINE_COVERAGE'] = line_coverage * rubric.PERCENTAGE_LINES_PER_COMMENT * rubric.COMMENTING
+        if modularity_ok(evaluation.line_count, evaluation.method_count, rubric.MODULARITY_AVG_METHOD_SIZE):
+            grades['MODULARITY'] = rubric.MODULARITY
+
+    if evaluation.uses_checkstyle:
+        grades['CHECKSTYLE'] = rubric.CHECKSTYLE
+    if evaluation.uses_spotbugs:
+        grades['SPOTBUGS'] = rubric.SPOTBUGS
+    if evaluation.uses_ci:
+        grades['CI'] = rubric.CI
+
+    # finalise grades (sum low level modules to high level modules)
+    return finalise_grades(grades, rubric)
+
+
+def finalise_grades(grade_module_dict: dict[str, float], rubric: Rubric = DEFAULT_RUBRIC) -> dict[str, float]:
     """
     Function calculates finalised grades
     Some grades are combined in to one major grade so this function dose the calculations
     :param grade_module_dict: The grade dictionairy which need to be finalised
+    :param rubric: The rubric with the top mark
     :return: The finalised grade dictionairy
     """
     # Create top modules which are partly graded
@@ -51,55 +124,68 @@ def finalise_grades(grade_module_dict: dict[str, float]) -> dict[str, float]:
 
     # factor grades in acordance to top mark
     for module in grade_module_dict:
-        grade_module_dict[module] *= TOP_MARK
+        grade_module_dict[module] *= rubric.TOP_MARK
     return grade_module_dict
 
 
-def create_grade_file(grade_dict: dict[str, float], repo: str, build: str) -> None:
+def grade_total(grades: dict[str, float], rubric: Rubric = DEFAULT_RUBRIC) -> float:
     """
-    Creates a grade file. File contains all grades and a total.
-    They are placed in a clean layout to make it clear how it was graded
-    :param grade_dict: The finalised grade dictionairy
-    :param repo: repository address in format 'author/name'
-    :param build: tool used to build. Used to add warning in case of Gradle build
-    :return: None
+    :param grades: The finalised grade dictionairy
+    :param rubric: The rubric with the top mark
+    :return: The total grade. Bonuses might make it go over the top mark, so it's capped
     """
     total = 0
     for module in FINAL_MODULES:
-        total += grade_dict[repo][module]
-    total = round(total, 3)
+        total += grades[module]
+    return min(round(total, 3), rubric.TOP_MARK)
 
-    # Bonuses might make the final grade over the top mark
-    if total > TOP_MARK:
-        total = TOP_MARK
 
-    with open(f"./repo_evaluate/results/{repo}/results.txt", 'w+') as fp:
+def create_grade_file(evaluation: Evaluation, grades: dict[str, float], rubric: Rubric = DEFAULT_RUBRIC,
+                      results_directory: str = RESULTS_DIRECTORY) -> None:
+    """
+    Creates a grade file. File contains all grades and a total.
+    They are placed in a clean layout to make it clear how it was graded
+    :param evaluation: The evaluation record of the repository. The build tool and the commit and contributor
+        counts add warnings to the file
+    :param grades: The finalised grade dictionairy
+    :param rubric: The rubric the grades were given with
+    :param results_directory: The directory with the results directories of the repositories
+    :return: None
+    """
+    repo = evaluation.address
+    build = evaluation.build_tool
+    total = grade_total(grades, rubric)
+    top_mark = rubric.TOP_MARK
+
+    with open(f"{repository_results_directory(repo, results_directory)}/results.txt", 'w+') as fp:
         fp.write(repo)
         fp.write("\nGrades:")
         for module in TOP_MODULES:
-            fp.write(f"\n{module}:{round(grade_dict[repo][module], 2)}/{str(globals()[module] * TOP_MARK)}")
+            fp.write(f"\n{module}:{round(grades[module], 2)}/{str(rubric.top_module_weights[module] * top_mark)}")
 
         fp.write(f"\n\nPACKAGING was evaluated from:\n"
-                 f" -BUILD_EXISTS:{grade_dict[repo]['BUILD_EXISTS']}/{str(EXISTENCE_OF_BUILD_FILE * PACKAGING * TOP_MARK)}\n"
-                 f" -BUILD_FILE_OK:{grade_dict[repo]['BUILD_FILE_OK']}/{str(FILE_IS_WELL_FORMED * PACKAGING * TOP_MARK)}")
+                 f" -BUILD_EXISTS:{grades['BUILD_EXISTS']}"
+                 f"/{str(rubric.EXISTENCE_OF_BUILD_FILE * rubric.PACKAGING * top_mark)}\n"
+                 f" -BUILD_FILE_OK:{grades['BUILD_FILE_OK']}"
+                 f"/{str(rubric.FILE_IS_WELL_FORMED * rubric.PACKAGING * top_mark)}")
 
         fp.write(f"\n\nTESTING was evaluated from:\n"
-                 f" -TESTING_COVERAGE:{round(grade_dict[repo]['TESTING_COVERAGE'], 2)}"
-                 f"/{str(round(TESTING_COVERAGE * TESTING * TOP_MARK, 2))}\n"
-                 f" -TESTING_EXISTENCE:{round(grade_dict[repo]['TESTING_EXISTENCE'], 2)}"
-                 f"/{str(round(TESTING_EXISTENCE * TESTING * TOP_MARK, 2))}")
+                 f" -TESTING_COVERAGE:{round(grades['TESTING_COVERAGE'], 2)}"
+                 f"/{str(round(rubric.TESTING_COVERAGE * rubric.TESTING * top_mark, 2))}\n"
+                 f" -TESTING_EXISTENCE:{round(grades['TESTING_EXISTENCE'], 2)}"
+                 f"/{str(round(rubric.TESTING_EXISTENCE * rubric.TESTING * top_mark, 2))}")
 
         fp.write(f"\n\nCOMMENTING was evaluated from:\n"
-                 f" -COMMENTING_METHOD_COVERAGE:{round(grade_dict[repo]['COMMENTING_METHOD_COVERAGE'], 2)}"
-                 f"/{str(round(PERCENTAGE_LINES_PER_COMMENT * COMMENTING * TOP_MARK, 2))}\n"
-                 f" -COMMENTING_LINE_COVERAGE:{round(grade_dict[repo]['COMMENTING_LINE_COVERAGE'], 2)}"
-                 f"/{str(round(PERCENTAGE_METHOD_PER_COMMENT * COMMENTING * TOP_MARK, 2))}\n")
+                 f" -COMMENTING_METHOD_COVERAGE:{round(grades['COMMENTING_METHOD_COVERAGE'], 2)}"
+                 f"/{str(round(rubric.PERCENTAGE_LINES_PER_COMMENT * rubric.COMMENTING * top_mark, 2))}\n"
+                 f" -COMMENTING_LINE_COVERAGE:{round(grades['COMMENTING_LINE_COVERAGE'], 2)}"
+                 f"/{str(round(rubric.PERCENTAGE_METHOD_PER_COMMENT * rubric.COMMENTING * top_mark, 2))}\n")
 
         fp.write("\n\nBonuses:")
         for module in BONUS_MODULES:
-            fp.write(f"\n{module}:{grade_dict[repo][module]}")
+            fp.write(f"\n{module}:{grades[module]}")
 
-        fp.write(f"\n\nTotal Grade:{str(total)}/{TOP_MARK}")
+        fp.write(f"\n\nTotal Grade:{str(total)}/{top_mark}")
 
         if build != "Maven" and build is not None:
             # Warning if build is Gradle as issues with validation may occur
@@ -112,13 +198,13 @@ def create_grade_file(grade_dict: dict[str, float], repo: str, build: str) -> No
             fp.write(f"\n\n[WARNING] NOTHING was used to build this project. \n"
                      "[WARNING] If you think this is wrong please inform me!")
 
-        if features.commit_count_ok(repo):
+        if evaluation.commit_count > rubric.MINIMUM_AMOUNT_OF_COMMITS:
             pass
         else:
             fp.write("\n\n[WARNING] This Repository doesn't have enough commits ! \n"
                      "[WARNING] Please evaluate why!")
 
-        if features.contributor_count_ok(repo):
+        if evaluation.contributor_count > rubric.MINIMUM_AMOUNT_OF_CONTRIBUTORS:
             pass
         else:
             fp.write("\n\n[WARNING] This Repository doesn't have enough contributors ! \n"
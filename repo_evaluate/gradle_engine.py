@@ -0,0 +1,100 @@
+"""
+This module defines the engine Gradle builds are validated with.
+Gradle is called directly (no PowerShell), so it works on Linux as well as on Windows.
+A bounded number of builds run at the same time, each in its own project directory,
+they all reuse the same warm Gradle daemons and a build which takes too long is killed
+"""
+import os
+import shutil
+import subprocess
+import threading
+from typing import NamedTuple, Optional
+
+DEFAULT_GRADLE_BUILDS = 2
+DEFAULT_GRADLE_TIMEOUT_SECONDS = 600
+
+
+class GradleResult(NamedTuple):
+    """The outcome of a Gradle task"""
+    succeeded: bool
+    error: str
+    timed_out: bool = False
+    ran: bool = True  # False when Gradle couldn't be found
+
+    @property
+    def depends_only_on_build(self) -> bool:
+        """
+        :return: If running the task again on the same build would give the same outcome
+        """
+        return self.ran and not self.timed_out
+
+
+class GradleEngine:
+    """
+    Thread safe runner of Gradle tasks. Up to max_builds tasks run at the same time,
+    the rest wait for their turn
+    """
+
+    def __init__(self, max_builds: int = DEFAULT_GRADLE_BUILDS, timeout: float = DEFAULT_GRADLE_TIMEOUT_SECONDS):
+        """
+        :param max_builds: The maximum number of tasks running at the same time
+        :param timeout: Seconds after which a task is killed and counts as failed
+        """
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max(1, max_builds))
+
+    @staticmethod
+    def gradle_command(gradle_project_path: str) -> Optional[list[str]]:
+        """
+        Finds how to call Gradle for a project. The wrapper of the project is preferred over the installed Gradle
+
+        :param gradle_project_path: the path to the gradle project
+        :return: The command or None if Gradle can't be found
+        """
+        wrapper = os.path.join(gradle_project_path, 'gradlew.bat' if os.name == 'nt' else 'gradlew')
+        if os.access(wrapper, os.X_OK):
+            return [os.path.abspath(wrapper)]
+        gradle = shutil.which('gradle')
+        return [gradle] if gradle is not None else None
+
+    def run(self, task: str, gradle_project_path: str) -> GradleResult:
+        """
+        Runs a gradle task in the specified path and waits for it to finish
+
+        :param task: A gradle task (Such as build)
+        :param gradle_project_path: the path to the gradle project
+        :return: The outcome of the task
+        """
+        command = self.gradle_command(gradle_project_path)
+        if command is None:
+            return GradleResult(False, "Gradle is not installed (no gradle on the PATH and no gradlew in the project)",
+                                ran=False)
+        # --daemon makes consecutive builds reuse warm daemons instead of starting a JVM every time
+        command += [task, '--daemon', '--console=plain', '-p', gradle_project_path]
+        with self.slots:
+            try:
+                result = subprocess.run(command, cwd=gradle_project_path, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                # The daemon cancels the build when its client is killed, so it is free for the next one
+                return GradleResult(False, f"The build was killed after {self.timeout} seconds", timed_out=True)
+        return GradleResult(result.returncode == 0, result.stderr.decode('utf-8', errors='replace'))
+
+
+gradle_engine = GradleEngine()
+
+
+def configure(max_builds: int = DEFAULT_GRADLE_BUILDS, timeout: float = DEFAULT_GRADLE_TIMEOUT_SECONDS) -> None:
+    """
+    Sets how many Gradle builds run at the same time and how long each may take
+
+    :param max_builds: The maximum number of builds running at the same time
+    :param timeout: Seconds after which a build is killed and counts as failed
+    """
+    global gradle_engine
+    gradle_engine = GradleEngine(max_builds, timeout)
+
+
+def get_gradle_engine() -> GradleEngine:
+    """Return the shared Gradle engine."""
+    return gradle_engine
@@ -0,0 +1,139 @@
+"""
+This module prefetches the answers of most existence checks and counts with batched GraphQL queries.
+One query asks about many repositories at once: their head commit, commit and branch counts
+and the contents of the files the scrapers look for (build files, CONTRIBUTING, README, licence).
+The answers are stored in the run cache, where the scrapers find them instead of making a REST request each
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from api import API_URL, get_session, REQUEST_TIMEOUT_SECONDS
+from run_cache import RunCache, get_run_cache
+
+DEFAULT_GRAPHQL_ENDPOINT = API_URL + '/graphql'
+
+# Repositories asked about in one query
+DEFAULT_BATCH_SIZE = 25
+
+# Files read through RepositorySource.read_file which are cached under (address, 'file', path).
+# GitHubSource only keeps these files in the run cache
+PROBED_FILES = ['pom.xml', 'build.gradle', 'build.gradle.kts', 'CONTRIBUTING.md']
+
+# Top level names of READMEs and licences in order of preference. Only found files are cached,
+# because GitHub also looks for them in other places (docs/, .github/)
+README_FILES = ['README.md', 'README', 'README.txt', 'README.rst', 'readme.md', 'Readme.md']
+LICENCE_FILES = ['LICENSE', 'LICENSE.md', 'LICENSE.txt', 'LICENCE', 'LICENCE.md', 'COPYING']
+
+BLOB_FIELDS = '... on Blob { text isBinary isTruncated }'
+
+
+def repository_query(index: int) -> str:
+    """
+    :param index: The index of the repository in the batch
+    :return: The part of the query which asks about one repository
+    """
+    files = PROBED_FILES + README_FILES + LICENCE_FILES
+    objects = '\n'.join(f'    f{number}: object(expression: "HEAD:{path}") {{ {BLOB_FIELDS} }}'
+                        for number, path in enumerate(files))
+    return f'''  r{index}: repository(owner: $owner{index}, name: $name{index}) {{
+    defaultBranchRef {{ target {{ oid ... on Commit {{ history {{ totalCount }} }} }} }}
+    refs(refPrefix: "refs/heads/") {{ totalCount }}
+{objects}
+  }}'''
+
+
+def batch_query(size: int) -> str:
+    """
+    :param size: The number of repositories in the batch
+    :return: The query of a batch of repositories
+    """
+    variables = ', '.join(f'$owner{index}: String!, $name{index}: String!' for index in range(size))
+    repositories = '\n'.join(repository_query(index) for index in range(size))
+    return f'query({variables}) {{\n{repositories}\n}}'
+
+
+def blob_text(blob: Optional[dict]) -> tuple[bool, Optional[str]]:
+    """
+    :param blob: The object of a file in the answer
+    :return: Tuple of (known, text). Binary and truncated files aren't known, the scrapers download them
+    """
+    if blob is None:  # the file doesn't exist
+        return True, None
+    if blob.get('isBinary') or blob.get('isTruncated') or blob.get('text') is None:
+        return False, None
+    return True, blob['text']
+
+
+def store_repository(address: str, data: dict, cache: RunCache) -> None:
+    """
+    Stores the answers about one repository in the run cache
+
+    :param address: repository address in format 'author/name'
+    :param data: The part of the answer about the repository
+    :param cache: The cache of the run
+    """
+    branch = data.get('defaultBranchRef')
+    if branch is None:  # the repository is empty
+        cache.put((address, 'head_sha'), None)
+        cache.put((address, 'commit_count'), 0)
+    else:
+        cache.put((address, 'head_sha'), branch['target']['oid'])
+        if 'history' in branch['target']:
+            cache.put((address, 'commit_count'), branch['target']['history']['totalCount'])
+    cache.put((address, 'branch_count'), data['refs']['totalCount'])
+    files = PROBED_FILES + README_FILES + LICENCE_FILES
+    blobs = {path: blob_text(data.get(f'f{number}')) for number, path in enumerate(files)}
+    for path in PROBED_FILES:
+        known, text = blobs[path]
+        if known:
+            cache.put((address, 'file', path), text)
+    for resource, names in (('readme', README_FILES), ('licence', LICENCE_FILES)):
+        text = next((blobs[name][1] for name in names if blobs[name][1] is not None), None)
+        if text is not None:
+            cache.put((address, resource), text)
+
+
+def prefetch_batch(addresses: list[str], endpoint: str, cache: RunCache) -> None:
+    """
+    Asks about a batch of repositories with one GraphQL query. Anything that fails is left out of the cache,
+    so the scrapers request it again and handle the error as usual
+
+    :param addresses: repository addresses in format 'author/name'
+    :param endpoint: The URL of the GraphQL endpoint
+    :param cache: The cache of the run
+    """
+    variables = {}
+    for index, address in enumerate(addresses):
+        variables[f'owner{index}'], variables[f'name{index}'] = address.split('/', 1)
+    try:
+        response = get_session().post(endpoint, json={'query': batch_query(len(addresses)), 'variables': variables},
+                                      timeout=REQUEST_TIMEOUT_SECONDS)
+        data = response.json().get('data') if response.status_code == 200 else None
+    except Exception as e:
+        print(f"[WARNING] GraphQL prefetch of {len(addresses)} repositories failed: {e!r}")
+        return
+    if data is None:
+        print(f"[WARNING] GraphQL prefetch of {len(addresses)} repositories failed with status {response.status_code}")
+        return
+    for index, address in enumerate(addresses):
+        repository = data.get(f'r{index}')
+        if repository is not None:  # None for repositories which don't exist or aren't accessible
+            store_repository(address, repository, cache)
+
+
+def prefetch_repositories(repo_addresses: list[str], endpoint: str = DEFAULT_GRAPHQL_ENDPOINT,
+                          batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1) -> None:
+    """
+    Prefetches the existence checks and counts of multiple repositories to the run cache with batched GraphQL queries
+
+    :param repo_addresses: Repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
+    :param endpoint: The URL of the GraphQL endpoint
+    :param batch_size: The number of repositories asked about in one query
+    :param workers: The number of queries sent at the same time
+    :return: None
+    """
+    cache = get_run_cache()
+    batch_size = max(1, batch_size)
+    batches = [repo_addresses[start:start + batch_size] for start in range(0, len(repo_addresses), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(lambda batch: prefetch_batch(batch, endpoint, cache), batches))
@@ -0,0 +1,99 @@
+"""
+This module defines the on-disk cache of GitHub responses.
+Cached responses are revalidated with conditional requests (If-None-Match / If-Modified-Since).
+GitHub answers 304 when nothing changed and those answers don't count against the rate limit,
+so re-running on unchanged repositories costs almost nothing
+"""
+import hashlib
+import json
+import os
+from typing import NamedTuple, Optional
+
+from disk_cache import DiskCache
+
+CACHE_FILE_NAME = 'responses.sqlite'
+DEFAULT_CACHE_SIZE_MB = 512
+
+# Headers which describe how the body was sent. The cached body is already decoded, so they don't apply to it
+TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class CachedResponse(NamedTuple):
+    """A cached GitHub response"""
+    headers: dict[str, str]
+    body: bytes
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        :return: The headers which turn a request for this response to a conditional request
+        """
+        headers = {}
+        for name, value in self.headers.items():
+            if name.lower() == 'etag':
+                headers['If-None-Match'] = value
+            elif name.lower() == 'last-modified':
+                headers['If-Modified-Since'] = value
+        return headers
+
+
+class ResponseCache:
+    """Cache of GitHub responses which have an ETag or a Last-Modified header"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.store = DiskCache(os.path.join(cache_dir, CACHE_FILE_NAME), max_bytes)
+
+    @staticmethod
+    def key(url: str, request_headers) -> str:
+        """
+        Creates the key of a request. Responses depend on the token (private repositories)
+        and the Accept header as well as the URL
+
+        :param url: The full URL of the request (including the query)
+        :param request_headers: The headers of the request (a case-insensitive mapping)
+        :return: The key
+        """
+        identity = '\n'.join([request_headers.get('Authorization', ''), request_headers.get('Accept', ''), url])
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        """
+        :param key: The key of the request
+        :return: The cached response or None if there isn't one
+        """
+        value = self.store.get(key)
+        if value is None:
+            return None
+        headers, body = value.split(b'\0', 1)
+        return CachedResponse(json.loads(headers), body)
+
+    def save(self, key: str, response_headers, body: bytes) -> None:
+        """
+        Caches a response. Responses which can't be revalidated (no ETag or Last-Modified) are not cached
+
+        :param key: The key of the request
+        :param response_headers: The headers of the response
+        :param body: The decoded body of the response
+        """
+        headers = {name: value for name, value in response_headers.items() if name.lower() not in TRANSFER_HEADERS}
+        if not CachedResponse(headers, body).conditional_headers():
+            return
+        self.store.put(key, json.dumps(headers).encode() + b'\0' + body)
+
+
+response_cache = None
+
+
+def configure(cache_dir: str, max_megabytes: int = DEFAULT_CACHE_SIZE_MB) -> None:
+    """
+    Enables the response cache for the rest of the run
+
+    :param cache_dir: The directory the cache is stored in
+    :param max_megabytes: The size cap of the cache in megabytes
+    """
+    global response_cache
+    response_cache = ResponseCache(cache_dir, max_megabytes * 1024 * 1024)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the response cache, or None if it isn't enabled."""
+    return response_cache
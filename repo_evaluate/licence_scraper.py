@@ -3,12 +3,18 @@ This module defines all methods which deal with the licence file
 """
 import os
 
-from github import Github
-from github.GithubException import UnknownObjectException, GithubException
+from source import get_source
 
-from api import get_github_instance
 
-g = get_github_instance()
+def get_licence_file(repo_address: str) -> str:
+    """Method gets the licence file of a repository from git and decodes it in utf-8 form.
+
+    :param repo_address: repository address in format 'author/name'
+    :type repo_address: str
+    :return: The licence file or None if the repository doesn't have one
+    :rtype str
+    """
+    return get_source(repo_address).get_licence()  # decoded to utf-8
 
 
 # Method gets licence file from git and decodes it
@@ -23,10 +29,5 @@ def get_licence_files(repo_addresses: list[str]) -> dict[str, str]:
     """
     licence_files = {}
     for address in repo_addresses:
-        repo = g.get_repo(address)
-        try:
-            licence_contents = repo.get_license().decoded_content.decode('utf-8')  # decode to utf-8
-        except (UnknownObjectException, GithubException):
-            licence_contents = None
-        licence_files[address] = licence_contents
+        licence_files[address] = get_licence_file(address)
     return licence_files
@@ -1,19 +1,34 @@
+import argparse
 import os
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from github import Github, enable_console_debug_logging
 
 import continuous_integration
-import csvcreator
+import features
 import search
 import testing
 import contributing_scraper
 import licence_scraper
 import readme_scraper
+import async_api
+import graphql_prefetch
 import build
+import analysis_cache
+import feature_store
 import code_quality
+import gradle_engine
+import http_cache
+import previous_results
+import result_sink
+from checkpoint import Checkpoint
+from evaluation import Evaluation
 from grades import *
+from ratelimit import get_scheduler
+from rubric import load_rubric
+from source import get_source, is_local_address
 
 from api import get_github_instance
 
@@ -23,13 +38,14 @@ g = get_github_instance()
 def get_repo_addresses(file_location: str) -> list[str]:
     """
     Gets GitHub repository addresses from a file. Returns them as a list of strings
+    Local repositories (paths or 'file://' URLs) are kept as they are
 
     :param file_location: txt file which contains the GitHub repositories
     :return: Repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
     """
     with open(file_location) as fp:
         lines = fp.readlines()
-    return [line.replace('.git', '').strip() for line in lines]
+    return [line.strip() if is_local_address(line.strip()) else line.replace('.git', '').strip() for line in lines]
 
 
 def copy_results_to_destination(destination_folder, source_folder="./repo_evaluate/results/"):
@@ -81,233 +97,301 @@ def delete_result_folder_contents():
         print(f"An error occurred: {e}")
 
 
-if __name__ == '__main__':
-    # enable_console_debug_logging() 
-    delete_result_folder_contents()
-    repos = get_repo_addresses(sys.argv[1])
-    print("[INFO] Scraping GitHub. This might take some time!")
-    print("[INFO]   Progress: 0%")
-    grades = initialise_grade_dictionary(repos)
-    print("[INFO]   Progress: 10%")
-    READMES = readme_scraper.get_decoded_readmes(repos)
-    print("[INFO]   Progress: 20%")
-    RAW_READMES = readme_scraper.get_raw_readmes(repos)
-    print("[INFO]   Progress: 30%")
-    LICENCE_FILES = licence_scraper.get_licence_files(repos)
-    print("[INFO]   Progress: 40%")
-    CONTRIBUTING_FILES = contributing_scraper.get_contributing_files(repos)
-    print("[INFO]   Progress: 50%")
-    BUILD_FILES, BUILD_TOOLS = build.get_build_files(repos)
-    print("[INFO]   Progress: 70%")
-    JAVA_NON_TEST_COUNT, JAVA_TEST_COUNT = testing.get_java_file_count(repos)
-    print("[INFO]   Progress: 90%")
-    CONTINUOUS_INTEGRATION = continuous_integration.repos_use_ci(repos)
-    print("[INFO]   Progress: 100%")
-
-    csvcreator.initialise(CSV_HEADERS)
-    csv_list = []
-    # This loop will determine all the Repos in GitHub Repositories.txt grades
-    for repo in repos:
-        java_files_exist = True
-        csv_list.clear()
-        csv_list.append(repo)
-
-        print(f"[INFO] Now evaluating: {repo}")
-        # Evaluate README
-        if READMES[repo] is not None:
-            grades[repo] = grade_update(grades[repo], 'README', README)
-            csv_list.append(1)
-
-            # Evaluate big README extra credit
-            if len(READMES[repo]) > BIG_README_SIZE:
-                grades[repo] = grade_update(grades[repo], 'BIG_README', BIG_README)
-                csv_list.append(1)
-            else:
-                csv_list.append(0)
-
-            # Evaluate README markdown usage for extra credit
-            if len(READMES[repo]) > FACTOR_README_MARKDOWN * len(RAW_READMES[repo]):
-                grades[repo] = grade_update(grades[repo], 'README_USES_MARKDOWN', README_USES_MARKDOWN)
-                csv_list.append(1)
-            else:
-                csv_list.append(0)
-        else:
-            csv_list.append(0)
-            csv_list.append(0)
-            csv_list.append(0)
-
-        # Evaluate LICENCE file
-        if LICENCE_FILES[repo] is not None:
-            grades[repo] = grade_update(grades[repo], 'LICENCE_FILE', LICENCE_FILE)
-            csv_list.append(1)
-        else:
-            csv_list.append(0)
-
-        # Evaluate CONTRIBUTING file
-        if CONTRIBUTING_FILES[repo] is not None:
-            grades[repo] = grade_update(grades[repo], 'CONTRIBUTING_FILE', CONTRIBUTING_FILE)
-            csv_list.append(1)
-        else:
-            csv_list.append(0)
-
-        # Evaluate package
-        if BUILD_TOOLS[repo] is not None:  # does a build file exist?
-            # We use the percent of the file existing times the points packaging gets
-            grades[repo] = grade_update(grades[repo], 'BUILD_EXISTS', EXISTENCE_OF_BUILD_FILE * PACKAGING)
-            csv_list.append(1)
-
-            match BUILD_TOOLS[repo]:
-                case "Maven":
-                    if build.validate_maven_pom(str(BUILD_FILES[repo]), "repo_evaluate/resources/maven-4.0.0.xsd"):
-                        # We use the percent of the file being well-formed times the points packaging gets
-                        grades[repo] = grade_update(grades[repo], 'BUILD_FILE_OK', FILE_IS_WELL_FORMED * PACKAGING)
-                        csv_list.append(1)
-                    else:
-                        csv_list.append(0)
-
-                case "Gradle - Groovy":
-                    if build.validate_groovy_build(BUILD_FILES[repo], repo):
-                        # We use the percent of the file being well-formed times the points packaging gets
-                        grades[repo] = grade_update(grades[repo], 'BUILD_FILE_OK', FILE_IS_WELL_FORMED * PACKAGING)
-                        csv_list.append(1)
-                    else:
-                        csv_list.append(0)
-
-                case "Gradle - Kotlin":
-                    if build.validate_kotlin_build(BUILD_FILES[repo], repo):
-                        # We use the percent of the file being well-formed times the points packaging gets
-                        grades[repo] = grade_update(grades[repo], 'BUILD_FILE_OK', FILE_IS_WELL_FORMED * PACKAGING)
-                        csv_list.append(1)
-                    else:
-                        csv_list.append(0)
-        else:
-            csv_list.append(0)  # NO BUILD FILE
-            csv_list.append(0)  # obviously if it doesn't exist it's not correct...
-
-        # evaluate testing
-        # evaluate test file existence
-        if JAVA_TEST_COUNT[repo] > 0:
-            grades[repo] = grade_update(grades[repo], 'TESTING_EXISTENCE', TESTING_EXISTENCE * TESTING)
-            csv_list.append(1)
-        else:
-            csv_list.append(0)
-
-        # find test ratio
-        testing_ratio = testing.find_test_ratio(JAVA_TEST_COUNT[repo], JAVA_NON_TEST_COUNT[repo])
-        csv_list.append(JAVA_TEST_COUNT[repo])
-        csv_list.append(JAVA_NON_TEST_COUNT[repo])
-        if testing_ratio == -1:
-            print(f"[WARNING] {repo} has no java files! That's an issue!")
-            java_files_exist = False
-        # evaluate test raio
-        if testing_ratio > 0.25:
-            grades[repo] = grade_update(grades[repo], 'TESTING_COVERAGE', TESTING_COVERAGE * TESTING)
-        else:
-            grades[repo] = grade_update(grades[repo], 'TESTING_COVERAGE', 0)
+def build_file_ok(repo: str, build_file: str, build_tool: str) -> bool:
+    """
+    Validates the build file of a repository with its build tool
 
-        # Evaluate use of GitHub features
-        result = features.repo_uses_github_features(repo)
-        if result:
-            grades[repo] = grade_update(grades[repo], 'GITHUB_FEATURES', GITHUB_FEATURES)
-            csv_list.append(1)
-        else:
-            grades[repo] = grade_update(grades[repo], 'GITHUB_FEATURES', 0)
-            csv_list.append(0)
+    :param repo: repository address in format 'author/name' (or a local path)
+    :param build_file: The build file
+    :param build_tool: The build tool used by the repository
+    :return: True if the build file is well-formed, False if not
+    """
+    match build_tool:
+        case "Maven":
+            pom_errors = build.maven_pom_errors(str(build_file), build.MAVEN_XSD_PATH)
+            if pom_errors:
+                build.maven_validation_failure(repo, pom_errors)
+            return not pom_errors
+        case "Gradle - Groovy":
+            return build.validate_groovy_build(build_file, repo)
+        case "Gradle - Kotlin":
+            return build.validate_kotlin_build(build_file, repo)
+    return False
+
+
+def evaluate_repository(repo: str) -> Evaluation:
+    """
+    Scrapes one repository into its evaluation record. Every repository is evaluated independently of the others,
+    so this can run in parallel for multiple repositories
 
-        if java_files_exist:
-            # Evaluate Comments and Code quality (CheckStyle)
-            # Get java file stats
+    :param repo: repository address in format 'author/name' (or a local path)
+    :return: The evaluation record of the repository
+    """
+    print(f"[INFO] Now evaluating: {repo}")
+    scheduler = get_scheduler()
+    evaluation = Evaluation(repo)
+    with scheduler.phase('METADATA'):
+        # Resolved first, because the files are read at this commit. The next run can tell if the repository changed
+        evaluation.head_sha = get_source(repo).head_sha()
+    with scheduler.phase('README'):
+        readme = readme_scraper.get_readme_analysis(repo)
+    if readme is not None:
+        evaluation.readme_size, evaluation.readme_raw_size = readme.size, readme.raw_size
+    with scheduler.phase('LICENCE'):
+        evaluation.licence_exists = licence_scraper.get_licence_file(repo) is not None
+    with scheduler.phase('CONTRIBUTING'):
+        evaluation.contributing_exists = contributing_scraper.get_contributing_file(repo) is not None
+    with scheduler.phase('BUILD'):
+        build_file, evaluation.build_tool = build.get_a_build_file(repo)
+    with scheduler.phase('TESTING'):
+        evaluation.non_test_count, evaluation.test_count = testing.get_repo_java_file_count(repo)
+    with scheduler.phase('CI'):
+        evaluation.uses_ci = continuous_integration.repo_uses_ci(repo)
+
+    if evaluation.build_exists:
+        evaluation.build_file_ok = build_file_ok(repo, build_file, evaluation.build_tool)
+
+    with scheduler.phase('GITHUB FEATURES'):
+        evaluation.uses_github_features = features.repo_uses_github_features(repo)
+
+    if evaluation.java_files_exist:
+        # Get java file stats
+        with scheduler.phase('CODE QUALITY'):
             repo_non_test_java_files = search.search_name_contains_return_file('.java', "Test", repo)
-            java_files_stats = code_quality.get_repository_java_files_stats(repo_non_test_java_files)
-            method_number = 0
-            method_coverage_avg = 0
-            line_number = 0
-            line_coverage_avg = 0
-            comment_number = 0
-
-            for java_file in java_files_stats:
-                method_number += java_files_stats[java_file]['NUMBER_OF_METHODS']
-                line_number += java_files_stats[java_file]['NUMBER_OF_LINES']
-                comment_number += java_files_stats[java_file]['NUMBER_OF_COMMENTS']
-
-                # Evaluate Comments
-                (method_coverage_ok, line_coverage_ok) = code_quality.commenting_ok(java_files_stats[java_file])
-                # Method Coverage
-                if method_coverage_ok:
-                    method_coverage_avg += 1
-                else:
-                    pass
-
-                # Line Coverage
-                if line_coverage_ok:
-                    line_coverage_avg += 1
-                else:
-                    pass
-
-            csv_list.append(comment_number)
-            method_coverage_avg = method_coverage_avg / len(java_files_stats)
-            grades[repo] = grade_update(grades[repo], 'COMMENTING_METHOD_COVERAGE',
-                                        method_coverage_avg * PERCENTAGE_METHOD_PER_COMMENT * COMMENTING)
-
-            csv_list.append(line_number)
-            line_coverage_avg = line_coverage_avg / len(java_files_stats)
-            grades[repo] = grade_update(grades[repo], 'COMMENTING_LINE_COVERAGE',
-                                        line_coverage_avg * PERCENTAGE_LINES_PER_COMMENT * COMMENTING)
-
-            csv_list.append(method_number)
-            modularity = line_number / method_number
-            if modularity < MODULARITY_AVG_METHOD_SIZE:
-                grades[repo] = grade_update(grades[repo], 'MODULARITY', MODULARITY)
-            else:
-                grades[repo] = grade_update(grades[repo], 'MODULARITY', 0)
+        evaluation.java_files_stats = code_quality.get_repository_java_files_stats(repo_non_test_java_files)
+    else:
+        print(f"[WARNING] {repo} has no java files! That's an issue!")
 
+    evaluation.uses_checkstyle = build.checkstyle_exists(str(build_file))
+    evaluation.uses_spotbugs = build.spotbugs_exists(str(build_file))
 
+    with scheduler.phase('METADATA'):
+        repo_source = get_source(repo)
+        evaluation.commit_count = repo_source.commit_count()
+        evaluation.contributor_count = repo_source.contributor_count()
+        evaluation.branch_count = repo_source.branch_count()
+    return evaluation
 
-        else:
-            grades[repo] = grade_update(grades[repo], 'COMMENTING_METHOD_COVERAGE', 0)
-            csv_list.append(0)  # comments
-            grades[repo] = grade_update(grades[repo], 'COMMENTING_LINE_COVERAGE', 0)
-            csv_list.append(0)  # lines
-            csv_list.append(0)  # methods
-
-        if build.checkstyle_exists(str(BUILD_FILES[repo])):
-            grades[repo] = grade_update(grades[repo], 'CHECKSTYLE', CHECKSTYLE)
-            csv_list.append(1)
-        else:
-            grades[repo] = grade_update(grades[repo], 'CHECKSTYLE', 0)
-            csv_list.append(0)
 
-        if build.spotbugs_exists(str(BUILD_FILES[repo])):
-            grades[repo] = grade_update(grades[repo], 'SPOTBUGS', SPOTBUGS)
-            csv_list.append(1)
-        else:
-            grades[repo] = grade_update(grades[repo], 'SPOTBUGS', 0)
-            csv_list.append(0)
+def write_result_file(evaluation: Evaluation) -> None:
+    """
+    Grades a repository from its evaluation record and creates its results file.
+    The head SHA of the repository is stored next to it
+
+    :param evaluation: The evaluation record of the repository
+    :return: None
+    """
+    repo = evaluation.address
+    print(f"[INFO] Now creating result file for: {repo}")
+    path = repository_results_directory(repo)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    create_grade_file(evaluation, grade_evaluation(evaluation, RUBRIC), RUBRIC)
+    previous_results.write_head_sha(path, evaluation.head_sha)
+
+
+def find_unchanged_repository(repo: str):
+    """
+    Checks if the head of a repository is the same as in the previous run
 
-        # Evaluate CI usage
-        if CONTINUOUS_INTEGRATION[repo]:
-            grades[repo] = grade_update(grades[repo], 'CI', CI)
-            csv_list.append(1)
+    :param repo: repository address in format 'author/name' (or a local path)
+    :return: The previous result of the repository if it's unchanged, otherwise None
+    """
+    previous_result = PREVIOUS_RESULTS.get(repo)
+    if previous_result is None:
+        return None
+    try:
+        with get_scheduler().phase('HEAD CHECK'):
+            head_sha = get_source(repo).head_sha()
+    except Exception as e:
+        print(f"[WARNING] Could not check if {repo} changed: {e!r}")
+        return None
+    return previous_result if head_sha == previous_result.head_sha else None
+
+
+def reuse_unchanged_repository(repo: str, previous_result: previous_results.PreviousResult) -> list:
+    """
+    Reuses the results of a repository which hasn't changed since the previous run. Its previous results files are
+    copied and, when the feature store has its facts, they are stored with the rest of the run and graded again,
+    so the results file and the CSV row follow the current rubric
+
+    :param repo: repository address in format 'author/name' (or a local path)
+    :param previous_result: The previous result of the repository
+    :return: The CSV row of the repository
+    """
+    csv_row = previous_results.reuse_previous_result(previous_result, repository_results_directory(repo))
+    previous_run = STORE.find_run(repo, previous_result.head_sha)
+    if previous_run is None:  # only the previous results files are left
+        return csv_row
+    if previous_run != RUN:
+        STORE.copy_evaluation(previous_run, RUN, repo)
+    evaluation = STORE.load_evaluation(RUN, repo)
+    write_result_file(evaluation)
+    return evaluation.csv_row()
+
+
+def evaluate_and_write(repo: str):
+    """
+    Evaluates a repository, stores its facts in the feature store, creates its results file from them
+    and records it in the checkpoint.
+    Repositories completed before a resumed run and repositories which haven't changed since the previous run
+    reuse their results. Errors are contained to the repository, so one broken repository doesn't stop the rest
+
+    :param repo: repository address in format 'author/name' (or a local path)
+    :return: The CSV row of the repository or None if the evaluation failed
+    """
+    if repo in COMPLETED_REPOSITORIES:
+        print(f"[INFO] {repo} was completed before the run was resumed")
+        return COMPLETED_REPOSITORIES[repo]
+    try:
+        if repo in UNCHANGED_REPOSITORIES:
+            print(f"[INFO] {repo} hasn't changed. Reusing its previous results")
+            csv_row = reuse_unchanged_repository(repo, UNCHANGED_REPOSITORIES[repo])
         else:
-            grades[repo] = grade_update(grades[repo], 'CI', 0)
-            csv_list.append(0)
-
-        # finalise grades (sum low level modules to high level modules)
-        grades[repo] = finalise_grades(grades[repo])
-
-        # finalise CSV by adding row and some metadata
-        tmprepo = g.get_repo(repo)
-        csv_list.append(tmprepo.get_commits().totalCount)  # Commits total number
-        csv_list.append(tmprepo.get_contributors().totalCount)  # Contributors total number
-        csv_list.append(len(list(tmprepo.get_branches())))  # Branches total number
-        csvcreator.add(csv_list)
-
-    for repo in repos:
-        print(f"[INFO] Now creating result file for: {repo}")
-        path = f"./repo_evaluate/results/{repo}"
-        if not os.path.exists(path):
-            os.makedirs(path)
-        create_grade_file(grades, repo, BUILD_TOOLS[repo])
+            evaluation = evaluate_repository(repo)
+            STORE.save_evaluation(RUN, evaluation, get_source(repo).list_files())
+            # Grading and the CSV row only use what was stored
+            evaluation = STORE.load_evaluation(RUN, repo)
+            write_result_file(evaluation)
+            csv_row = evaluation.csv_row()
+    except Exception as e:
+        print(f"[ERROR] {repo} could not be evaluated: {e!r}")
+        return None
+    CHECKPOINT.record(repo, csv_row)
+    return csv_row
+
+
+def parse_arguments():
+    """
+    Parses the command line arguments
+
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Evaluates the quality of work done in the given repositories")
+    parser.add_argument('repositories', help="txt file which contains the repositories, each on a new line")
+    parser.add_argument('destination', help="directory where the results are stored")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of repositories evaluated at the same time (default: 1)")
+    parser.add_argument('--async-prefetch', type=int, default=0, metavar='N',
+                        help="prefetch the GitHub data of all repositories with asyncio, "
+                             "keeping up to N requests in flight (needs aiohttp)")
+    parser.add_argument('--graphql-prefetch', action='store_true',
+                        help="prefetch the head commit, the commit and branch counts and the build, README, licence "
+                             "and CONTRIBUTING files of all repositories with batched GraphQL queries")
+    parser.add_argument('--graphql-batch-size', type=int, default=graphql_prefetch.DEFAULT_BATCH_SIZE, metavar='N',
+                        help=f"repositories asked about in one GraphQL query "
+                             f"(default: {graphql_prefetch.DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--graphql-endpoint', default=graphql_prefetch.DEFAULT_GRAPHQL_ENDPOINT, metavar='URL',
+                        help=f"GraphQL endpoint (default: {graphql_prefetch.DEFAULT_GRAPHQL_ENDPOINT})")
+    parser.add_argument('--cache-dir', help="directory of the on-disk caches of GitHub responses and analysis "
+                                            "results. Responses are revalidated, so unchanged data costs no rate "
+                                            "limit, and files with the same contents are analysed once")
+    parser.add_argument('--cache-size', type=int, default=http_cache.DEFAULT_CACHE_SIZE_MB, metavar='MB',
+                        help=f"size cap of the response cache (default: {http_cache.DEFAULT_CACHE_SIZE_MB} MB)")
+    parser.add_argument('--analysis-cache-size', type=int, default=analysis_cache.DEFAULT_CACHE_SIZE_MB, metavar='MB',
+                        help=f"size cap of the analysis cache (default: {analysis_cache.DEFAULT_CACHE_SIZE_MB} MB)")
+    parser.add_argument('--previous', metavar='DIRECTORY',
+                        help="destination directory of a previous run. Repositories whose default branch "
+                             "hasn't moved since then reuse their previous results without being scraped")
+    parser.add_argument('--gradle-builds', type=int, default=gradle_engine.DEFAULT_GRADLE_BUILDS, metavar='N',
+                        help=f"number of Gradle builds run at the same time "
+                             f"(default: {gradle_engine.DEFAULT_GRADLE_BUILDS})")
+    parser.add_argument('--gradle-timeout', type=float, default=gradle_engine.DEFAULT_GRADLE_TIMEOUT_SECONDS,
+                        metavar='SECONDS', help=f"Gradle builds taking longer than this are killed and count as failed "
+                                                f"(default: {gradle_engine.DEFAULT_GRADLE_TIMEOUT_SECONDS})")
+    parser.add_argument('--parsing-processes', type=int, metavar='N',
+                        help="number of processes parsing Java files (default: the number of cores)")
+    parser.add_argument('--serial-parsing', action='store_true',
+                        help="parse Java files in the main process, one at a time (for debugging)")
+    parser.add_argument('--fast-methods', action='store_true',
+                        help="count methods from the tokens of the Java files instead of parsing them "
+                             "(much faster, nearly always the same counts)")
+    parser.add_argument('--format', action='append', choices=list(result_sink.FORMATS), dest='formats',
+                        help=f"format the results are written in, repeat it for more than one "
+                             f"({', '.join(result_sink.FORMATS)}, default: csv). The columnar formats (parquet, arrow) "
+                             f"need pyarrow")
+    parser.add_argument('--store', default=feature_store.DEFAULT_STORE_PATH, metavar='FILE',
+                        help=f"SQLite file the facts of every repository and file are stored in. Every run adds its "
+                             f"own rows, so runs can be compared and graded again later "
+                             f"(default: {feature_store.DEFAULT_STORE_PATH})")
+    parser.add_argument('--rubric', metavar='FILE',
+                        help="JSON file which changes the weights and thresholds of constants.py for this run. "
+                             "regrade.py grades the stored results of a run again with another one")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run. The results of the repositories it completed are kept "
+                             "and only the rest are evaluated")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    # enable_console_debug_logging() 
+    arguments = parse_arguments()
+    RUBRIC = load_rubric(arguments.rubric)
+    CHECKPOINT = Checkpoint()
+    COMPLETED_REPOSITORIES = {}
+    if arguments.resume:
+        # The results of the interrupted run are kept
+        COMPLETED_REPOSITORIES = CHECKPOINT.load(len(CSV_HEADERS))
+        print(f"[INFO] Resuming. {len(COMPLETED_REPOSITORIES)} repositories were already completed")
+    else:
+        delete_result_folder_contents()
+        CHECKPOINT.clear()
+    STORE = feature_store.FeatureStore(arguments.store)
+    # A resumed run keeps adding to the run it interrupted
+    RUN = STORE.latest_run() if arguments.resume else None
+    if RUN is None:
+        RUN = STORE.start_run()
+    print(f"[INFO] The facts of the repositories are stored as run {RUN} in {arguments.store}")
+    if arguments.cache_dir:
+        http_cache.configure(arguments.cache_dir, arguments.cache_size)
+        analysis_cache.configure(arguments.cache_dir, arguments.analysis_cache_size)
+    gradle_engine.configure(arguments.gradle_builds, arguments.gradle_timeout)
+    code_quality.configure(arguments.parsing_processes, arguments.serial_parsing, arguments.fast_methods)
+    repos = get_repo_addresses(arguments.repositories)
+    remaining_repos = [repo for repo in repos if repo not in COMPLETED_REPOSITORIES]
+
+    PREVIOUS_RESULTS = {}
+    UNCHANGED_REPOSITORIES = {}
+    if arguments.previous:
+        PREVIOUS_RESULTS = previous_results.load_previous_results(arguments.previous, CSV_HEADERS)
+    executor = ThreadPoolExecutor(max_workers=max(1, arguments.jobs))
+    if PREVIOUS_RESULTS:
+        print("[INFO] Checking which repositories changed since the previous run")
+        for repo, previous_result in zip(remaining_repos, executor.map(find_unchanged_repository, remaining_repos)):
+            if previous_result is not None:
+                UNCHANGED_REPOSITORIES[repo] = previous_result
+        print(f"[INFO] {len(UNCHANGED_REPOSITORIES)} of {len(remaining_repos)} repositories haven't changed")
+
+    github_repos = [repo for repo in remaining_repos if not is_local_address(repo)
+                    and repo not in UNCHANGED_REPOSITORIES]
+    if arguments.graphql_prefetch and github_repos:
+        print("[INFO] Prefetching GitHub data with GraphQL")
+        with get_scheduler().phase('GRAPHQL PREFETCH'):
+            graphql_prefetch.prefetch_repositories(github_repos, arguments.graphql_endpoint,
+                                                   arguments.graphql_batch_size, arguments.jobs)
+    if arguments.async_prefetch > 0:
+        print("[INFO] Prefetching GitHub data")
+        with get_scheduler().phase('PREFETCH'):
+            async_api.prefetch_repositories(github_repos, arguments.async_prefetch)
+    print("[INFO] Evaluating repositories. This might take some time!")
+
+    # map() returns the rows in the order of the repository file, no matter which repository finishes first
+    with result_sink.ResultSink(CSV_HEADERS, arguments.formats) as sink, CHECKPOINT:
+        try:
+            for done, csv_row in enumerate(executor.map(evaluate_and_write, repos), start=1):
+                if csv_row is not None:
+                    sink.write(csv_row)
+                print(f"[INFO]   Progress: {round(100 * done / len(repos))}%")
+        except KeyboardInterrupt:
+            # Repositories which are being evaluated right now still finish and make it to the checkpoint
+            print("[WARNING] Interrupted! Waiting for the repositories in progress to finish...")
+            executor.shutdown(cancel_futures=True)
+            print("[WARNING] Run the same command with --resume to continue where this run stopped")
+            sys.exit(1)
+    executor.shutdown()
+
+    for line in get_scheduler().report():
+        print(f"[INFO] GitHub API usage of {line}")
 
     print("[INFO] Finalizing Results")
-    copy_results_to_destination(sys.argv[2])
+    copy_results_to_destination(arguments.destination)
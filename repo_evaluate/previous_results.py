@@ -0,0 +1,84 @@
+"""
+This module deals with the results of a previous run.
+A repository whose default branch head hasn't moved since then reuses its previous results instead of being scraped
+"""
+import csv
+import os
+import shutil
+from typing import NamedTuple, Optional
+
+from evaluation import parse_csv_row
+from source import results_directory_name
+
+HEAD_SHA_FILE_NAME = 'head_sha.txt'
+
+
+class PreviousResult(NamedTuple):
+    """The results of a repository from a previous run"""
+    head_sha: str
+    csv_row: list
+    directory: str
+
+
+def load_previous_results(results_directory: str, csv_headers: list[str]) -> dict[str, PreviousResult]:
+    """
+    Loads the results of a previous run. Only repositories with a recorded head SHA are loaded
+
+    :param results_directory: The destination directory of the previous run
+    :param csv_headers: The headers of the CSV file. If the previous CSV had different ones nothing is loaded
+    :return: A dictionary from repository address to its previous result
+    """
+    previous_results = {}
+    csv_path = os.path.join(results_directory, 'result.csv')
+    if not os.path.exists(csv_path):
+        print(f"[WARNING] {csv_path} doesn't exist. Every repository will be evaluated")
+        return previous_results
+    with open(csv_path, newline='') as fp:
+        rows = list(csv.reader(fp))
+    if not rows or rows[0] != csv_headers:
+        print("[WARNING] The previous results have different columns. Every repository will be evaluated")
+        return previous_results
+    for row in rows[1:]:
+        repo = row[0]
+        directory = f"{results_directory}/{results_directory_name(repo)}"
+        head_sha = read_head_sha(directory)
+        if head_sha is not None:
+            previous_results[repo] = PreviousResult(head_sha, parse_csv_row(row), directory)
+    return previous_results
+
+
+def read_head_sha(directory: str) -> Optional[str]:
+    """
+    :param directory: The results directory of a repository
+    :return: The head SHA stored in it or None if there isn't one
+    """
+    path = os.path.join(directory, HEAD_SHA_FILE_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fp:
+        return fp.read().strip() or None
+
+
+def write_head_sha(directory: str, head_sha: Optional[str]) -> None:
+    """
+    Stores the head SHA of a repository next to its results file
+
+    :param directory: The results directory of the repository
+    :param head_sha: The SHA of the head commit of the default branch (nothing is stored if it's None)
+    """
+    if head_sha is None:
+        return
+    with open(os.path.join(directory, HEAD_SHA_FILE_NAME), 'w') as fp:
+        fp.write(head_sha)
+
+
+def reuse_previous_result(previous_result: PreviousResult, directory: str) -> list[str]:
+    """
+    Copies the previous results files of a repository to its new results directory
+
+    :param previous_result: The previous result of the repository
+    :param directory: The new results directory of the repository
+    :return: The previous CSV row of the repository
+    """
+    shutil.copytree(previous_result.directory, directory, dirs_exist_ok=True)
+    return previous_result.csv_row
@@ -0,0 +1,163 @@
+"""
+This module defines the scheduler all GitHub requests go through.
+It keeps track of the remaining rate limit budget from the X-RateLimit headers, paces the requests so the budget
+lasts until it resets, decides when (and after how long) a failed request is retried,
+and counts how much of the budget each phase of the evaluation used
+"""
+import contextlib
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# While more than this fraction of the budget remains requests are sent as fast as possible
+UNPACED_BUDGET_FRACTION = 0.1
+
+# Retries of requests which failed because of rate limits or server errors
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_CAP_SECONDS = 60
+
+# Server errors which are worth retrying (403 and 429 are retried when they are caused by a rate limit)
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+
+
+class Budget:
+    """The rate limit budget of one GitHub resource (core, search, graphql...)"""
+
+    def __init__(self, limit: int, remaining: int, reset: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+
+class RateLimitScheduler:
+    """
+    Thread safe scheduler of GitHub requests. Each request asks for a delay before it is sent
+    and reports its response afterwards
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.budgets = {}
+        self.next_slot = 0.0
+        self.thread_data = threading.local()
+        self.requests_per_phase = {}
+        self.budget_per_phase = {}
+
+    def current_phase(self) -> str:
+        """
+        :return: The phase the current thread is in
+        """
+        return getattr(self.thread_data, 'phase', 'other')
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Context manager which attributes the requests the current thread makes to a phase
+
+        :param name: The name of the phase (for example 'README')
+        """
+        previous = self.current_phase()
+        self.thread_data.phase = name
+        try:
+            yield
+        finally:
+            self.thread_data.phase = previous
+
+    def reserve(self, resource: str = 'core') -> float:
+        """
+        Reserves the budget for one request
+
+        :param resource: The rate limit resource the request counts against
+        :return: How many seconds to wait before sending the request
+        """
+        with self.lock:
+            now = time.time()
+            budget = self.budgets.get(resource)
+            if budget is None or budget.reset <= now:  # nothing known yet or the window has been reset
+                return 0.0
+            if budget.remaining <= 0:  # budget exhausted, we wait for the reset
+                return budget.reset - now + 1
+            budget.remaining -= 1  # the headers of the response will correct this
+            if budget.remaining > budget.limit * UNPACED_BUDGET_FRACTION:
+                return 0.0
+            # spread the rest of the budget evenly across the rest of the window
+            spacing = (budget.reset - now) / (budget.remaining + 1)
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + spacing
+            return slot - now
+
+    def update(self, status: int, headers) -> None:
+        """
+        Updates the budget from the headers of a response and counts it to the current phase
+
+        :param status: The HTTP status of the response
+        :param headers: The headers of the response (a case-insensitive mapping)
+        """
+        phase = self.current_phase()
+        with self.lock:
+            self.requests_per_phase[phase] = self.requests_per_phase.get(phase, 0) + 1
+            if status != 304:  # conditional requests answered with 304 are free
+                self.budget_per_phase[phase] = self.budget_per_phase.get(phase, 0) + 1
+            if headers.get('X-RateLimit-Remaining') is None:
+                return
+            resource = headers.get('X-RateLimit-Resource', 'core')
+            self.budgets[resource] = Budget(int(headers.get('X-RateLimit-Limit', 0)),
+                                            int(headers['X-RateLimit-Remaining']),
+                                            float(headers.get('X-RateLimit-Reset', 0)))
+
+    def retry_delay(self, status: int, headers, read_body: Callable[[], str], attempt: int) -> Optional[float]:
+        """
+        Decides if a response should be retried
+
+        :param status: The HTTP status of the response
+        :param headers: The headers of the response (a case-insensitive mapping)
+        :param read_body: Returns the body of the response (GitHub explains 403 responses there).
+            It's only called for 403 responses whose headers don't say if a rate limit was hit
+        :param attempt: How many times the request has been retried so far
+        :return: Seconds to wait before retrying or None if the response should not be retried
+        """
+        if attempt >= MAX_RETRIES:
+            return None
+        if status in (403, 429):
+            if headers.get('Retry-After') is not None:  # secondary rate limits tell us how long to wait
+                return float(headers['Retry-After'])
+            if headers.get('X-RateLimit-Remaining') == '0':  # primary rate limit, we wait for the reset
+                return max(float(headers.get('X-RateLimit-Reset', 0)) - time.time(), 0) + 1
+            if status == 403 and 'rate limit' not in read_body().lower():
+                return None  # a permission error, retrying won't help
+        elif status not in SERVER_ERROR_STATUSES:
+            return None
+        # exponential backoff with full jitter, so retries of parallel requests don't line up
+        return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def report(self) -> list[str]:
+        """
+        :return: One line per phase with the requests it made and how much of the budget they used
+        """
+        with self.lock:
+            return [f"{phase}: {self.budget_per_phase.get(phase, 0)} of the rate limit budget "
+                    f"({requests} requests)" for phase, requests in self.requests_per_phase.items()]
+
+
+scheduler = RateLimitScheduler()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Return the shared request scheduler."""
+    return scheduler
+
+
+def resource_of(url: str) -> str:
+    """
+    Finds the rate limit resource a request counts against
+
+    :param url: The URL of the request
+    :return: 'graphql', 'search' or 'core'
+    """
+    if '/graphql' in url:
+        return 'graphql'
+    if '/search/' in url:
+        return 'search'
+    return 'core'
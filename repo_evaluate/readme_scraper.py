@@ -3,13 +3,95 @@ This module defines all methods which deal with READMES
 """
 import os
 import re
+from typing import NamedTuple, Optional
 
-from github import Github
-from github.GithubException import UnknownObjectException, GithubException
+from constants import BIG_README_SIZE, FACTOR_README_MARKDOWN
+from source import get_source
 
-from api import get_github_instance
+# Markdown images, links and the characters of emphasis, headings and code, removed in one pass.
+# Images come first, so their '!' goes with them
+MARKDOWN_PATTERN = re.compile(r'!\[.*\]\(.*\)|\[.*\]\(.*\)|[#*_`]')
 
-g = get_github_instance()
+
+class ReadmeAnalysis(NamedTuple):
+    """What the scraper found out about the README of a repository"""
+    size: int  # length of the README
+    raw_size: int  # length of the README without Markdown elements
+
+
+def readme_is_big(size, big_readme_size: int = BIG_README_SIZE):
+    """
+    Checks if a README is big enough for extra credit. The sizes can be the ints of one README or NumPy arrays
+    with the sizes of many (regrade.py), the check is the same for both
+
+    :param size: The length of the README
+    :param big_readme_size: The length a README must be over
+    :return: True where the README is big
+    """
+    return size > big_readme_size
+
+
+def readme_uses_markdown(size, raw_size, factor: float = FACTOR_README_MARKDOWN):
+    """
+    Checks if enough of a README is Markdown for it to not be plain text. The sizes can be the ints of one README
+    or NumPy arrays with the sizes of many (regrade.py), the check is the same for both
+
+    :param size: The length of the README
+    :param raw_size: The length of the README without Markdown elements
+    :param factor: How many times longer than its raw size the README must be
+    :return: True where the README uses Markdown
+    """
+    return size > factor * raw_size
+
+
+def strip_markdown(readme_contents: str) -> str:
+    """
+    :param readme_contents: A README
+    :return: The README without Markdown elements
+    """
+    return MARKDOWN_PATTERN.sub('', readme_contents)
+
+
+def analyse_readme(readme_contents: str) -> ReadmeAnalysis:
+    """
+    :param readme_contents: A README
+    :return: ReadmeAnalysis of the README
+    """
+    return ReadmeAnalysis(len(readme_contents), len(strip_markdown(readme_contents)))
+
+
+def get_readme_analysis(repo_address: str) -> Optional[ReadmeAnalysis]:
+    """
+    Fetches the README of a repository once and analyses it
+
+    :param repo_address: Repository address in format 'author/name'
+    :return: ReadmeAnalysis or None if the repository doesn't have a README
+    """
+    readme_contents = get_decoded_readme(repo_address)
+    return None if readme_contents is None else analyse_readme(readme_contents)
+
+
+def get_decoded_readme(repo_address: str) -> str:
+    """
+    Returns the README of a repository. Data is decoded to utf-8!
+
+    :param repo_address: Repository address in format 'author/name'
+    :return: The README or None if the repository doesn't have one
+    """
+    return get_source(repo_address).get_readme()  # decoded to utf-8
+
+
+def get_raw_readme(repo_address: str) -> str:
+    """
+    Returns the README of a repository without Markdown elements. Data is plain-text!
+
+    :param repo_address: Repository address in format 'author/name'
+    :return: The README or None if the repository doesn't have one
+    """
+    readme_contents = get_source(repo_address).get_readme()  # decoded to utf-8
+    if readme_contents is not None:
+        readme_contents = strip_markdown(readme_contents)
+    return readme_contents
 
 
 def get_decoded_readmes(repo_addresses: list[str]) -> dict[str, str]:
@@ -21,12 +103,7 @@ def get_decoded_readmes(repo_addresses: list[str]) -> dict[str, str]:
     """
     readmes = {}
     for address in repo_addresses:
-        repo = g.get_repo(address)
-        try:
-            readme_contents = repo.get_readme().decoded_content.decode('utf-8')  # decode to uts-8
-        except (UnknownObjectException, GithubException):
-            readme_contents = None
-        readmes[address] = readme_contents
+        readmes[address] = get_decoded_readme(address)
     return readmes
 
 
@@ -39,18 +116,5 @@ def get_raw_readmes(repo_addresses):
     """
     readmes = {}
     for address in repo_addresses:
-        repo = g.get_repo(address)
-        try:
-            readme_contents = repo.get_readme().decoded_content.decode()  # decode
-            # remove Markdown elements using regular expressions
-            readme_contents = re.sub(r'[#*_`]', '', readme_contents)
-            # remove Markdown links
-            readme_contents = re.sub(r'\[.*\]\(.*\)', '', readme_contents)
-            # remove Markdown images
-            readme_contents = re.sub(r'!\[.*\]\(.*\)', '', readme_contents)
-            # remove Markdown headings
-            readme_contents = re.sub(r'^#.*', '', readme_contents, flags=re.MULTILINE)
-        except (UnknownObjectException, GithubException):
-            readme_contents = None
-        readmes[address] = readme_contents
+        readmes[address] = get_raw_readme(address)
     return readmes
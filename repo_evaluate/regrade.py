@@ -0,0 +1,250 @@
+"""
+This module grades the stored results of a run again under another rubric, without scraping anything.
+The evaluation records of all repositories of a run are loaded from the feature store into a table of arrays
+and every module grade, the finalised grades and the totals are computed for all repositories at once with NumPy.
+The results file of every repository is written again and the grades of all of them are written to grades.csv.
+numpy is needed for this module (poetry install -E regrade)
+
+Usage: python repo_evaluate/regrade.py <results directory> [--store FILE] [--run N] [--rubric FILE]
+"""
+import argparse
+import csv
+import os
+import time
+from typing import Optional
+
+import numpy
+
+from code_quality import modularity_ok
+from constants import BONUS_MODULES, FINAL_MODULES, TOP_MODULES
+from evaluation import Evaluation
+from feature_store import DEFAULT_STORE_PATH, FeatureStore
+from grades import create_grade_file, repository_results_directory
+from readme_scraper import readme_is_big, readme_uses_markdown
+from rubric import Rubric, load_rubric
+
+GRADES_FILE_NAME = 'grades.csv'
+
+
+def round_like_python(values: numpy.ndarray, digits: int) -> numpy.ndarray:
+    """
+    Rounds like round() does, which the grades of a single repository are rounded with.
+    numpy.round scales the values and rounds halves to even, so values such as 0.085 end up rounded the other way
+
+    :param values: The values to round
+    :param digits: The number of decimal digits to keep
+    :return: The rounded values
+    """
+    return numpy.fromiter((round(value, digits) for value in values.tolist()), numpy.float64, count=len(values))
+
+
+class FeatureTable:
+    """
+    The facts of many repositories in arrays. Element i of the repository arrays is about repository i.
+    The file arrays have an element per non test java file and file_repository is the repository of each file
+    """
+
+    def __init__(self, evaluations: list[Evaluation]):
+        """
+        :param evaluations: The evaluation records of the repositories
+        """
+        def column(fact, dtype=numpy.int64) -> numpy.ndarray:
+            return numpy.fromiter((fact(evaluation) for evaluation in evaluations), dtype, count=len(evaluations))
+
+        self.addresses = [evaluation.address for evaluation in evaluations]
+        self.readme_exists = column(lambda evaluation: evaluation.readme_exists, bool)
+        self.readme_size = column(lambda evaluation: evaluation.readme_size or 0)
+        self.readme_raw_size = column(lambda evaluation: evaluation.readme_raw_size or 0)
+        self.licence_exists = column(lambda evaluation: evaluation.licence_exists, bool)
+        self.contributing_exists = column(lambda evaluation: evaluation.contributing_exists, bool)
+        self.build_exists = column(lambda evaluation: evaluation.build_exists, bool)
+        self.build_file_ok = column(lambda evaluation: evaluation.build_file_ok, bool)
+        self.test_count = column(lambda evaluation: evaluation.test_count)
+        self.non_test_count = column(lambda evaluation: evaluation.non_test_count)
+        self.uses_github_features = column(lambda evaluation: evaluation.uses_github_features, bool)
+        self.uses_checkstyle = column(lambda evaluation: evaluation.uses_checkstyle, bool)
+        self.uses_spotbugs = column(lambda evaluation: evaluation.uses_spotbugs, bool)
+        self.uses_ci = column(lambda evaluation: evaluation.uses_ci, bool)
+
+        files = [(index, stats) for index, evaluation in enumerate(evaluations)
+                 for stats in evaluation.java_files_stats.values()]
+        self.file_repository = numpy.fromiter((index for index, _ in files), numpy.int64, count=len(files))
+        self.file_comments, self.file_lines, self.file_methods = (
+            numpy.fromiter((stats[key] for _, stats in files), numpy.int64, count=len(files))
+            for key in ('NUMBER_OF_COMMENTS', 'NUMBER_OF_LINES', 'NUMBER_OF_METHODS'))
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def per_repository(self, file_values: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param file_values: A value for every file
+        :return: The sum of the values of the files of every repository
+        """
+        return numpy.bincount(self.file_repository, weights=file_values, minlength=len(self))
+
+
+def grade_table(table: FeatureTable, rubric: Rubric) -> tuple[dict[str, numpy.ndarray], dict[str, numpy.ndarray]]:
+    """
+    Grades every repository of a table, the same way grades.grade_evaluation grades one
+
+    :param table: The facts of the repositories
+    :param rubric: The rubric to grade with
+    :return: Tuple of (grades, given). Both connect the modules of FINAL_MODULES to an array with an element
+        per repository. grades holds the grades (not finalised) and given tells which repositories were graded
+        in the module at all (the rest got 0)
+    """
+    java_files_exist = table.non_test_count > 0
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # Files without methods (or lines) meet the criteria, as in code_quality.commenting_ok
+        method_ok = numpy.where(table.file_methods == 0, True,
+                                table.file_comments / table.file_methods > 1 / rubric.METHODS_PER_COMMENT)
+        line_ok = numpy.where(table.file_lines == 0, True,
+                              table.file_comments / table.file_lines > 1 / rubric.LINES_PER_COMMENT)
+        file_count = table.per_repository(None)
+        method_coverage = table.per_repository(method_ok) / file_count
+        line_coverage = table.per_repository(line_ok) / file_count
+        test_ratio = round_like_python(table.test_count / table.non_test_count, 2)
+
+    given = {
+        'README': table.readme_exists,
+        'BIG_README': table.readme_exists & readme_is_big(table.readme_size, rubric.BIG_README_SIZE),
+        'README_USES_MARKDOWN': table.readme_exists & readme_uses_markdown(table.readme_size, table.readme_raw_size,
+                                                                           rubric.FACTOR_README_MARKDOWN),
+        'BUILD_EXISTS': table.build_exists,
+        'BUILD_FILE_OK': table.build_exists & table.build_file_ok,
+        'LICENCE_FILE': table.licence_exists,
+        'CONTRIBUTING_FILE': table.contributing_exists,
+        'TESTING_EXISTENCE': table.test_count > 0,
+        'TESTING_COVERAGE': java_files_exist & (test_ratio > rubric.MINIMUM_TEST_RATIO),
+        'GITHUB_FEATURES': table.uses_github_features,
+        'COMMENTING_METHOD_COVERAGE': java_files_exist,
+        'COMMENTING_LINE_COVERAGE': java_files_exist,
+        'CHECKSTYLE': table.uses_checkstyle,
+        'SPOTBUGS': table.uses_spotbugs,
+        'CI': table.uses_ci,
+        'MODULARITY': java_files_exist & modularity_ok(table.per_repository(table.file_lines),
+                                                       table.per_repository(table.file_methods),
+                                                       rubric.MODULARITY_AVG_METHOD_SIZE),
+    }
+    weights = {
+        'README': rubric.README,
+        'BIG_README': rubric.BIG_README,
+        'README_USES_MARKDOWN': rubric.README_USES_MARKDOWN,
+        'BUILD_EXISTS': rubric.EXISTENCE_OF_BUILD_FILE * rubric.PACKAGING,
+        'BUILD_FILE_OK': rubric.FILE_IS_WELL_FORMED * rubric.PACKAGING,
+        'LICENCE_FILE': rubric.LICENCE_FILE,
+        'CONTRIBUTING_FILE': rubric.CONTRIBUTING_FILE,
+        'TESTING_EXISTENCE': rubric.TESTING_EXISTENCE * rubric.TESTING,
+        'TESTING_COVERAGE': rubric.TESTING_COVERAGE * rubric.TESTING,
+        'GITHUB_FEATURES': rubric.GITHUB_FEATURES,
+        'COMMENTING_METHOD_COVERAGE': method_coverage * rubric.PERCENTAGE_METHOD_PER_COMMENT * rubric.COMMENTING,
+        'COMMENTING_LINE_COVERAGE': line_coverage * rubric.PERCENTAGE_LINES_PER_COMMENT * rubric.COMMENTING,
+        'CHECKSTYLE': rubric.CHECKSTYLE,
+        'SPOTBUGS': rubric.SPOTBUGS,
+        'CI': rubric.CI,
+        'MODULARITY': rubric.MODULARITY,
+    }
+    grades = {module: numpy.where(given[module], weights[module], 0.0) for module in FINAL_MODULES}
+    return grades, given
+
+
+def finalise_grade_table(grades: dict[str, numpy.ndarray], given: dict[str, numpy.ndarray],
+                         rubric: Rubric) -> None:
+    """
+    Finalises the grades of every repository in place, the same way grades.finalise_grades does for one
+
+    :param grades: The grades given by grade_table
+    :param given: Which repositories were graded in each module, as given by grade_table
+    :param rubric: The rubric with the top mark
+    """
+    for top_module, (first, second) in (('PACKAGING', ('BUILD_EXISTS', 'BUILD_FILE_OK')),
+                                        ('TESTING', ('TESTING_EXISTENCE', 'TESTING_COVERAGE')),
+                                        ('COMMENTING', ('COMMENTING_METHOD_COVERAGE', 'COMMENTING_LINE_COVERAGE'))):
+        grades[top_module] = grades[first] + grades[second]
+        given[top_module] = given[first] | given[second]
+    grades['COMMENTING'] = round_like_python(grades['COMMENTING'], 2)
+
+    # factor grades in acordance to top mark
+    for module in grades:
+        grades[module] *= rubric.TOP_MARK
+
+
+def grade_totals(grades: dict[str, numpy.ndarray], rubric: Rubric) -> numpy.ndarray:
+    """
+    :param grades: The finalised grades
+    :param rubric: The rubric with the top mark
+    :return: The total grade of every repository, capped at the top mark as in grades.grade_total
+    """
+    total = numpy.zeros(len(grades[FINAL_MODULES[0]]))
+    for module in FINAL_MODULES:  # in the same order as grades.grade_total, so the sums are the same
+        total += grades[module]
+    return numpy.minimum(round_like_python(total, 3), rubric.TOP_MARK)
+
+
+def grade_dictionary(grades: dict[str, numpy.ndarray], given: dict[str, numpy.ndarray], index: int,
+                     rubric: Rubric) -> dict[str, float]:
+    """
+    :return: The finalised grade dictionairy of one repository of the table, as grades.grade_evaluation gives it
+    """
+    return {module: float(grades[module][index]) if given[module][index] else 0 * rubric.TOP_MARK
+            for module in grades}
+
+
+def regrade(results_directory: str, store: FeatureStore, run: Optional[int], rubric: Rubric) -> None:
+    """
+    Grades a stored run again. The results files are written again and the grades of every
+    repository are written to grades.csv in the results directory
+
+    :param results_directory: The directory the results are written to (usually the destination directory of the run)
+    :param store: The feature store the run is stored in
+    :param run: The id of the run (default: the latest run)
+    :param rubric: The rubric to grade with
+    """
+    if run is None:
+        run = store.latest_run()
+    evaluations = store.load_run(run) if run is not None else []
+    if not evaluations:
+        print(f"[WARNING] Run {run} doesn't have any stored repositories. Nothing was graded")
+        return
+    started = time.perf_counter()
+    table = FeatureTable(evaluations)
+    grades, given = grade_table(table, rubric)
+    finalise_grade_table(grades, given, rubric)
+    totals = grade_totals(grades, rubric)
+    print(f"[INFO] Graded {len(table)} repositories in {round(time.perf_counter() - started, 3)} seconds")
+
+    os.makedirs(results_directory, exist_ok=True)
+    with open(os.path.join(results_directory, GRADES_FILE_NAME), 'w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(['REPOSITORY ADDRESS'] + TOP_MODULES + BONUS_MODULES + ['TOTAL'])
+        for index, evaluation in enumerate(evaluations):
+            writer.writerow([evaluation.address] + [round(float(grades[module][index]), 3)
+                                                    for module in TOP_MODULES + BONUS_MODULES]
+                            + [float(totals[index])])
+            # The store may come from another machine, which means the results directory doesn't exist yet
+            os.makedirs(repository_results_directory(evaluation.address, results_directory), exist_ok=True)
+            create_grade_file(evaluation, grade_dictionary(grades, given, index, rubric), rubric, results_directory)
+
+
+def parse_arguments():
+    """
+    Parses the command line arguments
+
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Grades the stored results of a run again without scraping")
+    parser.add_argument('results', help="directory the results are written to, usually the destination "
+                                        "directory of the run")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, metavar='FILE',
+                        help=f"feature store the run is stored in (default: {DEFAULT_STORE_PATH})")
+    parser.add_argument('--run', type=int, metavar='N', help="id of the run (default: the latest run)")
+    parser.add_argument('--rubric', metavar='FILE',
+                        help="JSON file which changes the weights and thresholds of constants.py "
+                             "(default: the values of constants.py)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    regrade(arguments.results, FeatureStore(arguments.store), arguments.run, load_rubric(arguments.rubric))
@@ -0,0 +1,160 @@
+"""
+This module deals with writing the results of the evaluated repositories.
+The results file of every format is opened once for the whole run and every row is written as soon as its
+repository is done. Besides the raw CSV the rows can be written as JSON lines and as columnar Parquet or Arrow files,
+which analytics can load without parsing text (Arrow files can even be memory-mapped).
+pyarrow is needed for the columnar formats (poetry install -E arrow)
+"""
+import csv
+import json
+from typing import Optional
+
+from evaluation import TEXT_COLUMNS
+
+RESULTS_DIRECTORY = './repo_evaluate/results'
+
+# Output formats and the name of their results file
+FORMATS = {
+    'csv': 'result.csv',
+    'jsonl': 'result.jsonl',
+    'parquet': 'result.parquet',
+    'arrow': 'result.arrow',
+}
+
+DEFAULT_FORMATS = ['csv']
+
+# Rows buffered before they are written to a columnar file as one batch (a row group of Parquet)
+COLUMNAR_BATCH_ROWS = 1024
+
+
+def column_name(header: str) -> str:
+    """
+    :param header: A CSV header
+    :return: The name of its column in the JSON lines and columnar files
+    """
+    return header.strip()
+
+
+class CsvWriter:
+    """Writes the rows to a CSV file, flushing after every row"""
+
+    def __init__(self, path: str, headers: list[str]):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write(self, row: list) -> None:
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class JsonLinesWriter:
+    """Writes every row as a JSON object on its own line, flushing after every row"""
+
+    def __init__(self, path: str, headers: list[str]):
+        self.file = open(path, 'w')
+        self.names = [column_name(header) for header in headers]
+
+    def write(self, row: list) -> None:
+        self.file.write(json.dumps(dict(zip(self.names, row))) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ColumnarWriter:
+    """
+    Writes the rows to a Parquet file or an Arrow IPC file in batches of COLUMNAR_BATCH_ROWS.
+    Text columns are strings and the rest are 64-bit integers. Both formats end with a footer,
+    so the file can only be read once it's closed
+    """
+
+    def __init__(self, path: str, headers: list[str], file_format: str):
+        # Imports happen here in order to not require pyarrow if no columnar file is written!
+        import pyarrow
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(column_name(header), pyarrow.string() if header in TEXT_COLUMNS
+                                       else pyarrow.int64()) for header in headers])
+        if file_format == 'parquet':
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+        self.rows = []
+
+    def write(self, row: list) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= COLUMNAR_BATCH_ROWS:
+            self.write_batch()
+
+    def write_batch(self) -> None:
+        """
+        Writes the buffered rows as one batch
+        """
+        if not self.rows:
+            return
+        columns = [self.pyarrow.array(column, type=field.type) for column, field in zip(zip(*self.rows), self.schema)]
+        self.writer.write_batch(self.pyarrow.record_batch(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self) -> None:
+        self.write_batch()
+        self.writer.close()
+
+
+class ResultSink:
+    """
+    Writes the same rows to the results file of every requested format.
+    The writers are opened when the sink is created and closed with it
+    """
+
+    def __init__(self, headers: list[str], formats: Optional[list[str]] = None,
+                 directory: str = RESULTS_DIRECTORY):
+        """
+        :param headers: The headers of the rows
+        :param formats: The output formats (keys of FORMATS). By default only the CSV file is written
+        :param directory: The directory the results files are created in
+        """
+        self.writers = []
+        try:
+            for file_format in dict.fromkeys(formats or DEFAULT_FORMATS):
+                path = f"{directory}/{FORMATS[file_format]}"
+                match file_format:
+                    case 'csv':
+                        self.writers.append(CsvWriter(path, headers))
+                    case 'jsonl':
+                        self.writers.append(JsonLinesWriter(path, headers))
+                    case 'parquet' | 'arrow':
+                        self.writers.append(ColumnarWriter(path, headers, file_format))
+        except BaseException:
+            self.close()
+            raise
+
+    def write(self, row: list) -> None:
+        """
+        Writes the row of a repository to every results file
+
+        :param row: The values of the headers for the repository
+        """
+        for writer in self.writers:
+            writer.write(row)
+
+    def close(self) -> None:
+        """
+        Writes what is left and closes every results file
+        """
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
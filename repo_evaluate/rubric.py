@@ -0,0 +1,78 @@
+"""
+This module defines the rubric repositories are graded with: the weights, thresholds and bonuses of constants.py.
+A rubric file changes any of them without touching the code. It's a JSON object from constant names to values,
+for example {"TESTING": 0.2, "MODULARITY_AVG_METHOD_SIZE": 25}.
+The constants which are computed from others in constants.py (COMMENTING, FILE_IS_WELL_FORMED,
+PERCENTAGE_METHOD_PER_COMMENT, TESTING_COVERAGE) are computed the same way, unless the file sets them
+"""
+import json
+from typing import Callable, Optional
+
+import constants
+
+# The constants a rubric is made of
+RUBRIC_CONSTANTS = [
+    'TOP_MARK',
+    'CHECKSTYLE', 'SPOTBUGS', 'CI', 'TESTING', 'PACKAGING', 'README', 'MODULARITY', 'COMMENTING',
+    'EXISTENCE_OF_BUILD_FILE', 'FILE_IS_WELL_FORMED',
+    'PERCENTAGE_LINES_PER_COMMENT', 'PERCENTAGE_METHOD_PER_COMMENT',
+    'TESTING_EXISTENCE', 'TESTING_COVERAGE',
+    'LINES_PER_COMMENT', 'METHODS_PER_COMMENT', 'MINIMUM_TEST_RATIO', 'MODULARITY_AVG_METHOD_SIZE',
+    'LICENCE_FILE', 'CONTRIBUTING_FILE', 'BIG_README', 'README_USES_MARKDOWN', 'GITHUB_FEATURES',
+    'BIG_README_SIZE', 'FACTOR_README_MARKDOWN',
+    'MINIMUM_AMOUNT_OF_COMMITS', 'MINIMUM_AMOUNT_OF_CONTRIBUTORS',
+]
+
+# The constants computed from others, with the formulas of constants.py
+DERIVED_CONSTANTS: dict[str, Callable[['Rubric'], float]] = {
+    'COMMENTING': lambda rubric: round(1 - (rubric.CHECKSTYLE + rubric.SPOTBUGS + rubric.CI + rubric.TESTING
+                                            + rubric.PACKAGING + rubric.README + rubric.MODULARITY), 2),
+    'FILE_IS_WELL_FORMED': lambda rubric: 1 - rubric.EXISTENCE_OF_BUILD_FILE,
+    'PERCENTAGE_METHOD_PER_COMMENT': lambda rubric: round(1 - rubric.PERCENTAGE_LINES_PER_COMMENT, 2),
+    'TESTING_COVERAGE': lambda rubric: round(1 - rubric.TESTING_EXISTENCE, 2),
+}
+
+
+class Rubric:
+    """The values of the rubric constants. Constants which aren't given keep their value in constants.py"""
+    __slots__ = tuple(RUBRIC_CONSTANTS)
+
+    def __init__(self, values: Optional[dict[str, float]] = None):
+        """
+        :param values: A dictionary from constant names to the values which replace the ones in constants.py
+        :raises ValueError: if a name isn't a rubric constant
+        """
+        values = values or {}
+        unknown = [name for name in values if name not in RUBRIC_CONSTANTS]
+        if unknown:
+            raise ValueError(f"Not rubric constants: {', '.join(unknown)}")
+        for name in RUBRIC_CONSTANTS:
+            if name not in DERIVED_CONSTANTS:
+                setattr(self, name, values.get(name, getattr(constants, name)))
+        for name, derive in DERIVED_CONSTANTS.items():
+            setattr(self, name, values[name] if name in values else derive(self))
+
+    @property
+    def top_module_weights(self) -> dict[str, float]:
+        """
+        :return: The weight of each high level module (the modules of TOP_MODULES)
+        """
+        return {'README': self.README, 'PACKAGING': self.PACKAGING, 'TESTING': self.TESTING,
+                'COMMENTING': self.COMMENTING, 'CHECKSTYLE': self.CHECKSTYLE, 'SPOTBUGS': self.SPOTBUGS,
+                'CI': self.CI, 'MODULARITY': self.MODULARITY}
+
+
+DEFAULT_RUBRIC = Rubric()
+
+
+def load_rubric(path: Optional[str]) -> Rubric:
+    """
+    Reads a rubric file
+
+    :param path: The path of the rubric file. Without one the rubric of constants.py is used
+    :return: The rubric
+    """
+    if path is None:
+        return DEFAULT_RUBRIC
+    with open(path) as fp:
+        return Rubric(json.load(fp))
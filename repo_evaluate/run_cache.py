@@ -0,0 +1,115 @@
+"""
+This module defines the cache of everything fetched during one run (repository handles, READMEs, licences, counts).
+All modules share it, so every resource of a repository is only requested once.
+When multiple threads ask for the same resource at the same time only one of them fetches it and the rest wait for it
+"""
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from api import get_github_instance
+
+g = get_github_instance()
+
+
+class RunCache:
+    """
+    A thread safe cache with single-flight semantics.
+    Failed fetches are not cached, so the next request for the same key tries again
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value of a key. If there is none it is fetched, unless another thread is already fetching
+        it in which case we wait for that thread instead
+
+        :param key: The key of the resource. For example ('author/name', 'readme')
+        :param fetch: A function without arguments which fetches the resource
+        :return: The value of the resource
+        """
+        with self.lock:
+            if key in self.values:
+                return self.values[key]
+            future = self.in_flight.get(key)
+            fetching = future is None
+            if fetching:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not fetching:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as exception:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(exception)
+            raise
+        with self.lock:
+            self.values[key] = value
+            del self.in_flight[key]
+        future.set_result(value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores a value which was fetched elsewhere (for example by a prefetching stage)
+
+        :param key: The key of the resource
+        :param value: The value of the resource
+        """
+        with self.lock:
+            self.values[key] = value
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        :param key: The key of the resource
+        :return: True if the value of the key is cached, False otherwise
+        """
+        with self.lock:
+            return key in self.values
+
+    def clear(self) -> None:
+        """Forgets every cached value"""
+        with self.lock:
+            self.values.clear()
+
+
+run_cache = RunCache()
+
+
+def get_run_cache() -> RunCache:
+    """Return the cache of the current run."""
+    return run_cache
+
+
+def get_repo(address: str):
+    """
+    Returns the PyGithub Repository of an address. It is only requested once per run
+
+    :param address: repository address in format 'author/name'
+    :return: The Repository object
+    """
+    return run_cache.get((address, 'repo'), lambda: g.get_repo(address))
+
+
+def cached(resource: str):
+    """
+    Decorator which caches a method of a repository source for the whole run.
+    The key of the cache is the address of the source, the name of the resource and the arguments of the method
+
+    :param resource: The name of the resource (for example 'readme')
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *arguments):
+            return run_cache.get((self.address, resource, *arguments), lambda: method(self, *arguments))
+        return wrapper
+    return decorator
@@ -1,100 +1,62 @@
 """
 This module defines all methods which deal with finding files
 """
-import os
+from typing import Optional
 
-from github import Github
+from source import RepositorySource, get_source
 
-from api import get_github_instance
 
-g = get_github_instance()
-
-
-
-def search_name_contains_return_size(name_contains: str, repo) -> dict[str, int]:
+def search_name_contains_return_size(name_contains: str, source: RepositorySource) -> dict[str, int]:
     """
     Looks for names containing a specific element. For example '.java'
-    Returns file names and sizes in a dictionairy
+    Returns file paths and sizes in a dictionairy. No file contents are downloaded
 
     :param name_contains: What the name shall contain
-    :param repo: The repository
-    :type repo: Repository
-    :return: A dictionairy from file name to size of file
+    :param source: The source of the repository
+    :type source: RepositorySource
+    :return: A dictionairy from file path to size of file
     """
-
-    # recursively searching all the directories
-    def search_directory(directory):
-        contents = repo.get_contents(directory)
-        file_sizes = {}
-        for content in contents:
-            if content.type == "dir":
-                file_sizes.update(search_directory(content.path))
-            elif name_contains in content.name:
-                # get the name and size of the file
-                file_sizes[content.name] = content.size
-        return file_sizes
-
-    return search_directory('')
+    file_sizes = {}
+    for file in source.list_files():
+        if name_contains in file.name:
+            # get the path and size of the file
+            file_sizes[file.path] = file.size
+    return file_sizes
 
 
 def search_name_contains_return_file(name_contains: str, name_doesnt_contain: str, repo_address: str):
     """
     Looks for names containing a specific element. For example '.java'
-    Returns file names and contents in a dictionairy
+    Returns file paths and contents in a dictionairy. Only the matching files are downloaded
 
-    :return: A dictionairy from file name to size of file
     :param name_contains: What the name shall contain
     :param name_doesnt_contain: What the name shall NOT contain
     :param repo_address: The repository address
-    :return: A dictionairy from file name to decoded contents of the file
+    :return: A dictionairy from file path to decoded contents of the file
     """
-    # recursively searching all the directories
-    repo = g.get_repo(repo_address)
+    source = get_source(repo_address)
+    files = {}
+    for file in source.list_files():
+        if name_contains in file.name and name_doesnt_contain not in file.name:
+            # get the path and contents
+            files[file.path] = source.read_file(file.path) or ''
+    return files
 
-    def search_directory(directory):
-        contents = repo.get_contents(directory)
-        files = {}
-        for content in contents:
-            if content.type == "dir":
-                files.update(search_directory(content.path))
-            elif name_contains in content.name and name_doesnt_contain not in content.name:
-                # get the name and contents
-                try:
-                    files[content.name] = content.decoded_content.decode('utf-8')
-                except AssertionError:
-                    files[content.name] = ''
-        return files
 
-    return search_directory('')
-
-
-def search_name_matches(file_name: str, repo) -> str:
+def search_name_matches(file_name: str, source: RepositorySource) -> Optional[str]:
     """
     Looks for a  file everywhere in a repository
     Returns file contents
 
     :param file_name: The exact name of the file
-    :param repo: The repository
-    :type repo: Repository
-    :return: file_contents
+    :param source: The source of the repository
+    :type source: RepositorySource
+    :return: file_contents or None if no file matches
     """
 
     # build files were found to not bee in the top DIR...
-
-    # recursively searching all the directories
-    def search_directory(directory):
-        """
-        Sub method of search_name_matches()
-        """
-        contents = repo.get_contents(directory)
-        for content in contents:
-            if content.type == "dir":
-                file_content = search_directory(content.path)
-                if file_content is not None:
-                    return file_content
-            elif content.name == file_name:
-                # get the contents of the file
-                file_content = repo.get_contents(content.path)
-                return file_content
-
-    return search_directory('')
+    for file in source.list_files():
+        if file.name == file_name:
+            # get the contents of the file
+            return source.read_file(file.path)
+    return None
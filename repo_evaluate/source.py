@@ -0,0 +1,409 @@
+"""
+This module defines the sources repositories are read from.
+A source is either a repository hosted on GitHub or a local checkout (or mirror) on disk.
+All checks that need files go through a source, so they do not care where the files live
+"""
+import base64
+import os
+import subprocess
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+from urllib.parse import unquote, urlparse
+
+from github.GithubException import UnknownObjectException, GithubException
+
+from api import count_items
+from graphql_prefetch import PROBED_FILES
+from run_cache import cached, get_repo, get_run_cache
+
+# File names GitHub recognises as a README or a licence (compared in lower case)
+README_PREFIXES = ('readme',)
+LICENCE_PREFIXES = ('license', 'licence', 'copying')
+
+# What GitHub answers for the branch and the tree of an empty repository:
+# 404 (the default branch doesn't exist yet) or 409 ('Git Repository is empty')
+EMPTY_REPOSITORY_STATUSES = (404, 409)
+
+
+class RepositoryFile(NamedTuple):
+    """
+    A file of a repository. The path is relative to the root of the repository.
+    The sha is the git blob SHA of the file (None when it isn't known, for example in a plain directory)
+    """
+    path: str
+    size: int
+    sha: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """The name of the file without its directories"""
+        return self.path.rsplit('/', 1)[-1]
+
+
+class RepositorySource(ABC):
+    """
+    Base class of all sources. A source gives access to the files and history of one repository.
+    Subclasses implement the abstract methods, the path index is built on top of fetch_files
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+
+    @abstractmethod
+    def fetch_files(self) -> list[RepositoryFile]:
+        """
+        Fetches the listing of every file of the repository (directories are not listed).
+        This is only called once per source, everything else uses the path index
+
+        :return: A list of RepositoryFile
+        """
+
+    def index(self) -> dict[str, RepositoryFile]:
+        """
+        Returns the path index of the repository. The listing is fetched once per run
+
+        :return: A dictionary from the path of every file to its RepositoryFile
+        """
+        return get_run_cache().get((self.address, 'index'),
+                                   lambda: {file.path: file for file in self.fetch_files()})
+
+    def list_files(self) -> list[RepositoryFile]:
+        """
+        Lists every file of the repository (directories are not listed)
+
+        :return: A list of RepositoryFile
+        """
+        return list(self.index().values())
+
+    @abstractmethod
+    def read_file(self, path: str) -> Optional[str]:
+        """
+        Reads a file of the repository
+
+        :param path: The path of the file relative to the root of the repository
+        :return: The utf-8 decoded contents of the file or None if the file does not exist
+        """
+
+    def file_exists(self, path: str) -> bool:
+        """
+        Checks if a file exists in the repository
+
+        :param path: The path of the file relative to the root of the repository
+        :return: True if it exists, False otherwise
+        """
+        return path in self.index()
+
+    @abstractmethod
+    def get_readme(self) -> Optional[str]:
+        """
+        :return: The utf-8 decoded README of the repository or None if there isn't one
+        """
+
+    @abstractmethod
+    def get_licence(self) -> Optional[str]:
+        """
+        :return: The utf-8 decoded licence file of the repository or None if there isn't one
+        """
+
+    @abstractmethod
+    def commit_count(self) -> int:
+        """
+        :return: The number of commits of the default branch
+        """
+
+    @abstractmethod
+    def contributor_count(self) -> int:
+        """
+        :return: The number of different contributors
+        """
+
+    @abstractmethod
+    def branch_count(self) -> int:
+        """
+        :return: The number of branches
+        """
+
+    @abstractmethod
+    def head_sha(self) -> Optional[str]:
+        """
+        :return: The SHA of the head commit of the default branch or None if it isn't known
+        """
+
+
+class GitHubSource(RepositorySource):
+    """
+    A repository hosted on GitHub. The file listing comes from a single recursive Git Trees request
+    and only the contents of the files a check actually reads are downloaded.
+    Everything is read at the head commit, so pushes during the run don't mix two versions of the repository
+    """
+
+    def __init__(self, address: str):
+        super().__init__(address)
+        self.repo = get_repo(address)
+
+    def fetch_files(self) -> list[RepositoryFile]:
+        head_sha = self.head_sha()
+        if head_sha is None:  # the repository is empty
+            return []
+        try:
+            tree = self.repo.get_git_tree(head_sha, recursive=True)
+        except GithubException as e:
+            if e.status not in EMPTY_REPOSITORY_STATUSES:
+                raise
+            return []
+        if tree.raw_data.get('truncated'):
+            # GitHub truncates huge trees, so we have to walk the directories one by one
+            return self.walk_directories('')
+        return [RepositoryFile(element.path, element.size or 0, element.sha)
+                for element in tree.tree if element.type == 'blob']
+
+    def walk_directories(self, directory: str) -> list[RepositoryFile]:
+        """
+        Lists the files of a directory by recursively requesting the contents of all the directories
+
+        :param directory: The path of the directory ('' for the top directory)
+        :return: A list of RepositoryFile
+        """
+        files = []
+        for content in self.repo.get_contents(directory, ref=self.head_sha()):
+            if content.type == "dir":
+                files.extend(self.walk_directories(content.path))
+            else:
+                files.append(RepositoryFile(content.path, content.size, content.sha))
+        return files
+
+    def read_file(self, path: str) -> Optional[str]:
+        # Only the files the GraphQL prefetch asks about are kept in the run cache (where the prefetched contents
+        # are found). Every other file, such as the java files, is downloaded when read and not kept for the run
+        if path in PROBED_FILES:
+            return get_run_cache().get((self.address, 'file', path), lambda: self.download_file(path))
+        return self.download_file(path)
+
+    def download_file(self, path: str) -> Optional[str]:
+        """
+        Downloads the contents of a file
+
+        :param path: The path of the file
+        :return: The contents of the file or None if it doesn't exist
+        """
+        file = self.index().get(path)
+        if file is None:  # no request is needed for files that don't exist
+            return None
+        blob = self.repo.get_git_blob(file.sha)
+        return base64.b64decode(blob.content).decode('utf-8', errors='replace')
+
+    @cached('readme')
+    def get_readme(self) -> Optional[str]:
+        head_sha = self.head_sha()
+        if head_sha is None:  # the repository is empty
+            return None
+        try:
+            return self.repo.get_readme(ref=head_sha).decoded_content.decode('utf-8')
+        except UnknownObjectException:  # there is no README. Any other error fails the evaluation
+            return None
+
+    @cached('licence')
+    def get_licence(self) -> Optional[str]:
+        if self.head_sha() is None:  # the repository is empty
+            return None
+        try:
+            return self.repo.get_license().decoded_content.decode('utf-8')
+        except UnknownObjectException:  # there is no licence. Any other error fails the evaluation
+            return None
+
+    # The counts cost one request each, however many commits, contributors or branches there are
+
+    @cached('commit_count')
+    def commit_count(self) -> int:
+        head_sha = self.head_sha()
+        return count_items(f'/repos/{self.address}/commits', {'sha': head_sha} if head_sha else None)
+
+    @cached('contributor_count')
+    def contributor_count(self) -> int:
+        return count_items(f'/repos/{self.address}/contributors')
+
+    @cached('branch_count')
+    def branch_count(self) -> int:
+        return count_items(f'/repos/{self.address}/branches')
+
+    @cached('head_sha')
+    def head_sha(self) -> Optional[str]:
+        try:
+            return self.repo.get_branch(self.repo.default_branch).commit.sha
+        except GithubException as e:
+            if e.status not in EMPTY_REPOSITORY_STATUSES:
+                raise
+            return None
+
+
+class LocalSource(RepositorySource):
+    """
+    A repository on disk. This is either a working tree (a plain directory or a git checkout)
+    or a bare git repository such as the ones created by 'git clone --mirror'
+    """
+
+    def __init__(self, address: str):
+        super().__init__(address)
+        self.root = local_path(address)
+        self.bare = not os.path.isdir(os.path.join(self.root, '.git')) and \
+            os.path.isfile(os.path.join(self.root, 'HEAD')) and os.path.isdir(os.path.join(self.root, 'objects'))
+
+    def git(self, *arguments: str) -> Optional[str]:
+        """
+        Runs a git command in the repository
+
+        :param arguments: The git arguments (for example 'rev-list', '--count', 'HEAD')
+        :return: Standard output of the command or None if it failed (for example it isn't a git repository)
+        """
+        try:
+            result = subprocess.run(['git', '-C', self.root, *arguments], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+        except OSError:  # git is not installed
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def fetch_files(self) -> list[RepositoryFile]:
+        if self.bare:
+            listing = self.git('ls-tree', '-r', '-l', '-z', 'HEAD') or ''
+            files = []
+            for entry in listing.split('\0'):
+                if not entry:
+                    continue
+                info, path = entry.split('\t', 1)
+                _, object_type, sha, size = info.split()
+                if object_type == 'blob':
+                    files.append(RepositoryFile(path, int(size), sha))
+            return files
+
+        if os.path.exists(os.path.join(self.root, '.git')):  # a directory, or a file in linked worktrees
+            # Only the files git tracks, as on GitHub and in the same order. Untracked and ignored files (target/,
+            # build/, generated sources...) are left out. The blob SHAs of the index might not match edited files,
+            # so they aren't kept
+            listing = self.git('ls-files', '-z')
+            if listing is not None:
+                files = []
+                for path in filter(None, listing.split('\0')):
+                    full_path = os.path.join(self.root, path)
+                    if os.path.isfile(full_path):  # deleted files and submodules aren't files of the working tree
+                        files.append(RepositoryFile(path, os.path.getsize(full_path)))
+                return files
+
+        files = []
+        for directory, sub_directories, file_names in os.walk(self.root):
+            # we only want the working tree, not the git internals
+            sub_directories[:] = sorted(d for d in sub_directories if d != '.git')
+            for file_name in sorted(file_names):
+                full_path = os.path.join(directory, file_name)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                files.append(RepositoryFile(path, os.path.getsize(full_path)))
+        return files
+
+    def read_file(self, path: str) -> Optional[str]:
+        if self.bare:
+            file = self.index().get(path)
+            return None if file is None else self.git('cat-file', 'blob', file.sha)
+        full_path = os.path.join(self.root, path)
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, encoding='utf-8', errors='replace') as fp:
+            return fp.read()
+
+    def find_top_level_file(self, prefixes: tuple[str, ...]) -> Optional[str]:
+        """
+        Finds a file in the top directory whose name starts with one of the prefixes (case-insensitive)
+
+        :param prefixes: lower case prefixes of the name
+        :return: The contents of the file or None if no such file exists
+        """
+        names = sorted(file.path for file in self.list_files() if '/' not in file.path)
+        for name in names:
+            if name.lower().startswith(prefixes):
+                return self.read_file(name)
+        return None
+
+    @cached('readme')
+    def get_readme(self) -> Optional[str]:
+        return self.find_top_level_file(README_PREFIXES)
+
+    @cached('licence')
+    def get_licence(self) -> Optional[str]:
+        return self.find_top_level_file(LICENCE_PREFIXES)
+
+    @cached('commit_count')
+    def commit_count(self) -> int:
+        output = self.git('rev-list', '--count', 'HEAD')
+        return int(output) if output else 0
+
+    @cached('contributor_count')
+    def contributor_count(self) -> int:
+        output = self.git('shortlog', '-s', '-e', 'HEAD')
+        return len(output.splitlines()) if output else 0
+
+    @cached('branch_count')
+    def branch_count(self) -> int:
+        output = self.git('for-each-ref', '--format=%(refname)', 'refs/heads/')
+        return len(output.splitlines()) if output else 0
+
+    @cached('head_sha')
+    def head_sha(self) -> Optional[str]:
+        # The files of a working tree are only the ones of its head commit when nothing tracked was changed.
+        # Plain directories and changed working trees have no head SHA, so they are never taken as unchanged
+        if not self.bare:
+            if not os.path.exists(os.path.join(self.root, '.git')):
+                return None
+            if self.git('status', '--porcelain', '--untracked-files=no') != '':
+                return None
+        output = self.git('rev-parse', 'HEAD')
+        return output.strip() if output else None
+
+
+def is_local_address(address: str) -> bool:
+    """
+    Checks if a repository address points to the disk instead of GitHub
+
+    :param address: A repository address. Either 'author/name', a path or a 'file://' URL
+    :return: True if the repository is on disk, False if it is on GitHub
+    """
+    return address.startswith('file://') or os.path.isdir(os.path.expanduser(address))
+
+
+def local_path(address: str) -> str:
+    """
+    Turns a local repository address ('file://' URL or path) to a path on disk
+
+    :param address: A local repository address
+    :return: The path of the repository
+    """
+    if address.startswith('file://'):
+        address = unquote(urlparse(address).path)
+    return os.path.abspath(os.path.expanduser(address))
+
+
+def results_directory_name(address: str) -> str:
+    """
+    Returns the name of the results directory of a repository, relative to the directory with the results of the run.
+    GitHub repositories use their address. Local repositories use their absolute path without its root, drive
+    colons and '~', '.' or '..' parts, so addresses like '../project', '~/project' or 'file:///project'
+    stay inside the results directory
+
+    :param address: A repository address. Either 'author/name', a path or a 'file://' URL
+    :return: The relative name of the results directory of the repository
+    """
+    if not is_local_address(address):
+        return address
+    parts = (part.replace(':', '') for part in local_path(address).replace('\\', '/').split('/'))
+    return '/'.join(part for part in parts if part not in ('', '.', '..', '~'))
+
+
+def get_source(address: str) -> RepositorySource:
+    """
+    Returns the source of a repository depending on its address.
+    Sources are kept in the run cache, so the same source object is returned every time for the same address
+
+    :param address: A repository address. Either 'author/name', a path or a 'file://' URL
+    :return: A LocalSource for repositories on disk, a GitHubSource otherwise
+    """
+    return get_run_cache().get((address, 'source'),
+                               lambda: LocalSource(address) if is_local_address(address) else GitHubSource(address))
@@ -6,11 +6,7 @@ from typing import List, Dict
 import copy
 import search
 
-from github import Github
-
-from api import get_github_instance
-
-g = get_github_instance()
+from source import get_source
 
 
 def get_java_file_names_from_repo(repo_addresses: list[str]) -> dict[str, dict[str, int]]:
@@ -19,13 +15,12 @@ def get_java_file_names_from_repo(repo_addresses: list[str]) -> dict[str, dict[s
 
     :param repo_addresses: Repository addresses in a list formatted as ['author1/name1', 'author2/name2'...]
     :return: A dictionairy of dictionary. The high level dictionary point from repository addresses to the java file
-        dictionairy. The low level dictionairy points from java file name to java file size
+        dictionairy. The low level dictionairy points from java file path to java file size
     """
     global_java_file_names = {}
     for address in repo_addresses:
-        repo = g.get_repo(address)
-        files = search.search_name_contains_return_size(".java", repo)
-        for file_name in files:
+        files = search.search_name_contains_return_size(".java", get_source(address))
+        for file_name in list(files):
             # pops empty files
             if files[file_name] == 0:
                 files.pop(file_name)
@@ -33,37 +28,60 @@ def get_java_file_names_from_repo(repo_addresses: list[str]) -> dict[str, dict[s
     return global_java_file_names
 
 
+def is_test_file(file_path: str) -> bool:
+    """
+    Checks if a java file is a test file judging by its name
+
+    :param file_path: The path of the file in the repository
+    :return: True if the name of the file mentions test, False otherwise
+    """
+    file_name = file_path.rsplit('/', 1)[-1]
+    return ("test" in file_name) or ("Test" in file_name)
+
+
 #
 def return_non_test_java_files(java_file_name_dict: Dict[str, int]) -> Dict[str, int]:
     """
-    Removes test files from java file dictionairy
+    Removes test files from java file dictionairy. Only the file name (not its directories) is checked
 
-    :param java_file_name_dict: The dictionairy of files from file name to size
+    :param java_file_name_dict: The dictionairy of files from file path to size
     :return: the dictionary without test files
     """
     java_file_names = list(java_file_name_dict.keys())
     for file in java_file_names:
-        if ("test" in file) or ("Test" in file):
+        if is_test_file(file):
             java_file_name_dict.pop(file)
     return java_file_name_dict
 
 
 def return_test_java_files(java_file_name_dict: Dict[str, int]) -> Dict[str, int]:
     """
-    Keeps only test files from a java file dictionairy
+    Keeps only test files from a java file dictionairy. Only the file name (not its directories) is checked
 
-    :param java_file_name_dict: The dictionairy of files from file name (string) to size (int)
+    :param java_file_name_dict: The dictionairy of files from file path (string) to size (int)
     :return: the dictionary without test files
     """
     java_file_names = list(java_file_name_dict.keys())
     for file in java_file_names:
-        if ("test" in file) or ("Test" in file):
+        if is_test_file(file):
             pass
         else:
             java_file_name_dict.pop(file)
     return java_file_name_dict
 
 
+def get_repo_java_file_count(repo_address: str) -> tuple[int, int]:
+    """
+    Returns a two element tuple with the count of .java files of a repository
+    (first tuple element non-test files, second tuple element test files)
+
+    :param repo_address: Repository address in format 'author/name'
+    :return: A tuple (non_test_count, test_count)
+    """
+    all_files = get_java_file_names_from_repo([repo_address])[repo_address]
+    return len(return_non_test_java_files(copy.deepcopy(all_files))), len(return_test_java_files(all_files))
+
+
 def get_java_file_count(repo_addresses: List[str]) -> tuple[dict[str, int], dict[str, int]]:
     """
     Returns a two element tuple with a dictionairy of the repository addresses as keys
@@ -74,13 +92,10 @@ def get_java_file_count(repo_addresses: List[str]) -> tuple[dict[str, int], dict
         only with test java file count. Both connect repository addresses to the respective counts
     """
 
-    java_file_names = get_java_file_names_from_repo(repo_addresses)
     non_test_files_count = {}
     test_files_count = {}
     for repo in repo_addresses:
-        all_files = java_file_names[repo]
-        non_test_files_count[repo] = len(return_non_test_java_files(copy.deepcopy(all_files)))
-        test_files_count[repo] = len(return_test_java_files(copy.deepcopy(all_files)))
+        non_test_files_count[repo], test_files_count[repo] = get_repo_java_file_count(repo)
     return non_test_files_count, test_files_count
 
 
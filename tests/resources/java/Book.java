@@ -0,0 +1,60 @@
+package library;
+
+import java.util.Objects;
+
+public final class Book implements Comparable<Book> {
+    private final String title;
+    private final String author;
+    private boolean borrowed;
+
+    public Book(String title, String author) {
+        this.title = Objects.requireNonNull(title);
+        this.author = Objects.requireNonNull(author);
+    }
+
+    public String title() {
+        return title;
+    }
+
+    public String author() {
+        return author;
+    }
+
+    public boolean isBorrowed() {
+        return borrowed;
+    }
+
+    public synchronized void borrow() throws IllegalStateException {
+        if (borrowed) {
+            throw new IllegalStateException("Already borrowed: " + title + " {" + author + "}");
+        }
+        borrowed = true;
+    }
+
+    // public void giveBack() { borrowed = false; }
+
+    @Override
+    public int compareTo(Book other) {
+        int byAuthor = author.compareTo(other.author);
+        return byAuthor != 0 ? byAuthor : title.compareTo(other.title);
+    }
+
+    @Override
+    public boolean equals(Object other) {
+        if (!(other instanceof Book)) {
+            return false;
+        }
+        Book book = (Book) other;
+        return title.equals(book.title) && author.equals(book.author);
+    }
+
+    @Override
+    public int hashCode() {
+        return Objects.hash(title, author);
+    }
+
+    @Override
+    public String toString() {
+        return String.format("%s (%s)", title, author);
+    }
+}
@@ -0,0 +1,47 @@
+package library;
+
+import java.lang.annotation.ElementType;
+import java.lang.annotation.Retention;
+import java.lang.annotation.RetentionPolicy;
+import java.lang.annotation.Target;
+import java.util.List;
+
+public interface Catalogue<K, V extends Comparable<V>> {
+
+    @Retention(RetentionPolicy.RUNTIME)
+    @Target(ElementType.METHOD)
+    @interface Indexed {
+        String value() default "";
+
+        int[] priorities() default {1, 2};
+    }
+
+    int SIZE_LIMIT = 10;
+
+    @Indexed("key")
+    V get(K key);
+
+    List<V> all();
+
+    default boolean contains(K key) {
+        return get(key) != null;
+    }
+
+    static <K, V extends Comparable<V>> Catalogue<K, V> empty() {
+        return new Catalogue<K, V>() {
+            @Override
+            public V get(K key) {
+                return null;
+            }
+
+            @Override
+            public List<V> all() {
+                return List.of();
+            }
+        };
+    }
+
+    interface Listener {
+        void changed(Object key);
+    }
+}
@@ -0,0 +1,40 @@
+package library;
+
+public enum Genre {
+    NOVEL("Novel") {
+        @Override
+        boolean isFiction() {
+            return true;
+        }
+    },
+    POETRY("Poetry") {
+        @Override
+        boolean isFiction() {
+            return true;
+        }
+    },
+    HISTORY("History");
+
+    private final String label;
+
+    Genre(String label) {
+        this.label = label;
+    }
+
+    boolean isFiction() {
+        return false;
+    }
+
+    public String label() {
+        return label;
+    }
+
+    public static Genre of(String label) {
+        for (Genre genre : values()) {
+            if (genre.label.equalsIgnoreCase(label)) {
+                return genre;
+            }
+        }
+        throw new IllegalArgumentException(label);
+    }
+}
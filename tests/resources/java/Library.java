@@ -0,0 +1,107 @@
+package library;
+
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+import java.util.TreeMap;
+import java.util.function.Predicate;
+
+/**
+ * A library of books, grouped by author.
+ */
+public class Library implements Iterable<Book> {
+    private static final int MAX_BOOKS = 1_000;
+    private final Map<String, List<Book>> booksByAuthor = new TreeMap<>();
+    private final Predicate<Book> available = book -> !book.isBorrowed();
+    private int count = countBooks(booksByAuthor);
+
+    static {
+        System.setProperty("library.loaded", "true");
+    }
+
+    public Library() {
+        this(Collections.emptyList());
+    }
+
+    public Library(List<Book> books) {
+        books.forEach(this::add);
+    }
+
+    /**
+     * Adds a book to the library
+     *
+     * @param book the book
+     * @return if there was room for it
+     */
+    public boolean add(Book book) {
+        if (count >= MAX_BOOKS) {
+            return false;
+        }
+        booksByAuthor.computeIfAbsent(book.author(), author -> new ArrayList<>()).add(book);
+        count++;
+        return true;
+    }
+
+    public Optional<Book> find(String title) {
+        return booksByAuthor.values().stream()
+                .flatMap(List::stream)
+                .filter(book -> book.title().equals(title))
+                .findFirst();
+    }
+
+    public List<Book> available() {
+        List<Book> result = new ArrayList<>();
+        for (List<Book> books : booksByAuthor.values()) {
+            for (Book book : books) {
+                if (available.test(book)) {
+                    result.add(book);
+                }
+            }
+        }
+        return result;
+    }
+
+    @Override
+    public java.util.Iterator<Book> iterator() {
+        return new java.util.Iterator<Book>() {
+            private final java.util.Iterator<Book> books = available().iterator();
+
+            @Override
+            public boolean hasNext() {
+                return books.hasNext();
+            }
+
+            @Override
+            public Book next() {
+                return books.next();
+            }
+        };
+    }
+
+    private static int countBooks(Map<String, List<Book>> books) {
+        int total = 0;
+        for (List<Book> list : books.values()) {
+            total += list.size();
+        }
+        return total;
+    }
+
+    public <T extends Comparable<? super T>> List<T> sorted(List<T> values) {
+        List<T> copy = new ArrayList<>(values);
+        Collections.sort(copy);
+        return copy;
+    }
+
+    static class Shelf {
+        private final String[] labels = {"A", "B"};
+
+        Shelf() {
+        }
+
+        String[] labels() {
+            return labels.clone();
+        }
+    }
+}
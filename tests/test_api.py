@@ -0,0 +1,116 @@
+"""
+Tests the transport every GitHub request goes through
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import api
+import http_cache
+
+
+def test_pygithub_does_not_pace_or_retry_requests():
+    # The rate limit scheduler is the only pacer, PyGithub would otherwise wait 0.25 seconds between requests
+    requester = api.get_github_instance()._Github__requester
+    assert requester._Requester__seconds_between_requests is None
+    assert requester._Requester__seconds_between_writes is None
+    assert requester._Requester__retry is None
+
+
+def test_pygithub_connections_use_the_session_of_their_thread():
+    connection = api.ThreadSafeConnection('api.github.com', None, retry=None, timeout=15, pool_size=10)
+    assert connection.session is api.get_session()
+    assert (connection.host, connection.port, connection.protocol) == ('api.github.com', 443, 'https')
+    assert connection.timeout == 15 and connection.verify is True
+    assert not hasattr(connection, 'adapter')  # no session or connection pool of its own
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(api.ThreadSafeConnection('api.github.com').session))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not connection.session
+
+
+class HeaderStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.authorization.append(self.headers.get('Authorization'))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, *arguments):
+        pass
+
+
+def test_netrc_does_not_replace_the_token(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), HeaderStub)
+    server.authorization = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    netrc = tmp_path / 'netrc'
+    netrc.write_text('machine 127.0.0.1 login someone password secret\n')
+    monkeypatch.setenv('NETRC', str(netrc))
+    monkeypatch.setattr(api, 'API_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    try:
+        api.rest_get('/repos/a/b/branches')
+    finally:
+        server.shutdown()
+        server.server_close()
+    expected = 'Bearer ' + api.token if api.token else None
+    assert server.authorization == [expected]
+
+
+def test_body_is_only_read_for_ambiguous_forbidden_responses():
+    scheduler = api.get_scheduler()
+    read = []
+
+    def read_body():
+        read.append(True)
+        return '{"message": "API rate limit exceeded"}'
+
+    assert scheduler.retry_delay(200, {}, read_body, 0) is None
+    assert scheduler.retry_delay(404, {}, read_body, 0) is None
+    assert scheduler.retry_delay(502, {}, read_body, 0) is not None
+    assert scheduler.retry_delay(429, {'Retry-After': '3'}, read_body, 0) == 3
+    assert not read
+    assert scheduler.retry_delay(403, {}, read_body, 0) is not None
+    assert read == [True]
+
+
+class CachedStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            # The headers of a 304 needn't repeat the charset of the cached response
+            self.send_response(304)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        content = json.dumps({'name': 'Zoë'}, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *arguments):
+        pass
+
+
+def test_revalidated_response_keeps_the_cached_encoding(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, 'response_cache', http_cache.ResponseCache(str(tmp_path), 1024 * 1024))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CachedStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    session.mount('http://', api.SchedulingAdapter())
+    url = f'http://127.0.0.1:{server.server_address[1]}/repos/a/b'
+    try:
+        first, second = session.get(url), session.get(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert first.status_code == second.status_code == 200
+    assert second.encoding == 'utf-8'
+    assert second.json() == first.json() == {'name': 'Zoë'}
@@ -0,0 +1,41 @@
+"""
+Tests the validation of POMs against the Maven XSD
+"""
+import analysis_cache
+import build
+
+VALID_POM = '''<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <modelVersion>4.0.0</modelVersion>
+  <groupId>a</groupId>
+  <artifactId>b</artifactId>
+  <version>1</version>
+</project>'''
+
+INVALID_POM = '''<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <modelVersion>4.0.0</modelVersion>
+  <colour>blue</colour>
+</project>'''
+
+
+def test_valid_pom():
+    assert build.maven_pom_errors(VALID_POM) == []
+
+
+def test_schema_errors_have_their_line():
+    errors = build.maven_pom_errors(INVALID_POM)
+    assert errors and all(isinstance(error, build.PomError) for error in errors)
+    assert errors[0].line == 3 and 'colour' in errors[0].message
+    assert str(errors[0]) == f"line 3: {errors[0].message}"
+
+
+def test_syntax_errors():
+    (error,) = build.maven_pom_errors('<project>\n<modelVersion>')
+    assert error.line == 2
+
+
+def test_cached_errors_are_pom_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, 'analysis_cache', None)  # configure() replaces it, the fixture restores it
+    analysis_cache.configure(str(tmp_path))
+    first = build.maven_pom_errors(INVALID_POM)
+    cached = build.maven_pom_errors(INVALID_POM)
+    assert cached == first and isinstance(cached[0], build.PomError)
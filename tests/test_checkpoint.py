@@ -0,0 +1,72 @@
+"""
+Tests the checkpoint a run is resumed from
+"""
+import os
+
+from checkpoint import CHECKPOINT_FILE, Checkpoint
+from grades import RESULTS_DIRECTORY
+
+
+def test_records_are_on_disk_before_closing(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record('a/one', ['a/one', 1, 0])
+        checkpoint.record('a/two', ['a/two', 0, 1])
+        # A resumed run reads what a crashed run left behind, without it being closed
+        assert Checkpoint(path).load() == {'a/one': ['a/one', 1, 0], 'a/two': ['a/two', 0, 1]}
+        handle = checkpoint.file
+    assert handle.closed and checkpoint.file is None
+
+
+def test_cut_short_and_outdated_rows_are_ignored(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    with Checkpoint(str(path)) as checkpoint:
+        checkpoint.record('a/one', ['a/one', 1, 0])
+        checkpoint.record('a/old', ['a/old', 1])
+    with open(path, 'a') as fp:
+        fp.write('{"repository": "a/cut", "ro')
+    assert Checkpoint(str(path)).load(row_length=3) == {'a/one': ['a/one', 1, 0]}
+
+
+def test_recording_after_closing_appends(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path)
+    checkpoint.record('a/one', ['a/one'])
+    checkpoint.close()
+    checkpoint.record('a/two', ['a/two'])
+    checkpoint.close()
+    assert list(Checkpoint(path).load()) == ['a/one', 'a/two']
+
+
+def test_line_cut_short_is_removed_before_appending(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    with Checkpoint(str(path)) as checkpoint:
+        checkpoint.record('a/one', ['a/one'])
+    with open(path, 'a') as fp:
+        fp.write('{"repository": "a/cut", "ro')
+    with Checkpoint(str(path)) as checkpoint:
+        checkpoint.record('a/two', ['a/two'])
+    assert path.read_text().splitlines() == ['{"repository": "a/one", "row": ["a/one"]}',
+                                             '{"repository": "a/two", "row": ["a/two"]}']
+
+
+def test_file_without_complete_lines_is_emptied(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    path.write_text('{"repository": "a/cut"')
+    with Checkpoint(str(path)) as checkpoint:
+        checkpoint.record('a/one', ['a/one'])
+    assert list(Checkpoint(str(path)).load()) == ['a/one']
+
+
+def test_clear(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    checkpoint = Checkpoint(str(path))
+    checkpoint.record('a/one', ['a/one'])
+    checkpoint.clear()
+    assert not path.exists() and checkpoint.load() == {}
+
+
+def test_checkpoint_is_not_in_the_results_directory():
+    # Everything in the results directory is copied to the destination
+    assert os.path.commonpath([os.path.abspath(CHECKPOINT_FILE), os.path.abspath(RESULTS_DIRECTORY)]) != \
+        os.path.abspath(RESULTS_DIRECTORY)
@@ -0,0 +1,76 @@
+"""
+Tests that count_methods_fast counts the methods javalang finds, on a small corpus and on the edge cases of Java syntax
+"""
+import glob
+import os
+
+import javalang
+import pytest
+
+from code_quality import count_methods, count_methods_fast
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'resources', 'java', '*.java')))
+
+# Each case is (source, methods). Constructors, initialisers, lambdas and the elements of annotation types
+# aren't methods, the methods of anonymous, local and nested classes are
+EDGE_CASES = {
+    'constructors': ('class A { @Deprecated A(int x) { this(); } public A() {} <T> A(T t) {} }', 0),
+    'annotations': ('@Entity class A { @Override public String toString() { return ""; } '
+                    '@SuppressWarnings({"a", "b"}) @Deprecated(since = "1") void f() {} }', 2),
+    'annotation type': ('@interface Ann { String value() default "x"; int[] n(); }', 0),
+    'generics': ('class A<T extends Comparable<T>> { public <K, V> Map<K, List<V>> m(Map<K, V> x) { return null; } '
+                 'java.util.List<String> q() { return null; } <T> A(T t) {} List<? extends T>[] r() { return null; } }',
+                 3),
+    'lambdas': ('class A { Runnable r = () -> { go(); }; Function<Integer, Integer> f = x -> { return g(x); }; '
+                'void h() { list.forEach(item -> { process(item); }); Runnable s = () -> run(); } }', 1),
+    'anonymous classes': ('class A { void f() { Runnable r = new Runnable() { public void run() {} }; '
+                          'foo(new X() { int g() { return 1; } }); } '
+                          'Comparator<A> c = new Comparator<A>() { public int compare(A a, A b) { return 0; } }; }', 4),
+    'interface': ('interface I { void a(); default int b() { return 1; } '
+                  'static <T> List<T> c(T[] x) { return null; } }', 3),
+    'enum': ('enum E { A(1) { void x() {} }, B { void y() {} }, C; E(int i) {} E() {} '
+             'int z() throws java.io.IOException, Exception { return 0; } }', 3),
+    'fields and initialisers': ('class A { int x = foo(1); boolean b = a > b(c); int[] arr = {f(1)}; '
+                                'static { init(); } { inst(); } int y() { if (x) { z(); } return 0; } }', 1),
+    'local classes': ('class A { void f() { class L { void g() {} } L l = new L(); } '
+                      'String[] h()[] { return null; } }', 3),
+    'nested types': ('class A { static class B { void b() {} } interface C { void c(); } '
+                     'enum D { X; void d() {} } }', 3),
+    'strings and comments': ('class A { String s = "void f() {"; char c = \'{\'; /* void g() {} */ '
+                             '// int h() {\n void i() { String t = "}"; } }', 1),
+    'class literals': ('class A { Class<?> c = A.class; void f() { Object o = A.class; } void g() {} }', 2),
+    'throws': ('class A { void f() throws E { } void g() throws E, F { } }', 2),
+    'contextual keywords as names': ('class A { void record(int x) {} int var() { return 0; } Object sealed; '
+                                     'int permits; void yield(int y) {} String non() { return null; } }', 4),
+    'record as a variable': ('class A { Object record; { record = new Object(); } int f() { return 0; } '
+                             'void g() { int record = 1; { h(record); } } Runnable r = () -> { record(); }; '
+                             'List<String> record() { return null; } }', 3),
+}
+
+
+def javalang_method_count(contents: str) -> int:
+    return sum(isinstance(node, javalang.tree.MethodDeclaration) for _, node in javalang.parse.parse(contents))
+
+
+def test_corpus_exists():
+    assert len(CORPUS) >= 4
+
+
+@pytest.mark.parametrize('path', CORPUS, ids=os.path.basename)
+def test_corpus_matches_javalang(path):
+    with open(path) as fp:
+        contents = fp.read()
+    assert count_methods_fast(contents) == javalang_method_count(contents)
+
+
+@pytest.mark.parametrize('source, methods', EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_edge_cases(source, methods):
+    assert javalang_method_count(source) == methods
+    assert count_methods_fast(source) == methods
+
+
+def test_unparsable_files_are_counted_fast():
+    source = 'record Point(int x, int y) { Point { check(x); } int sum() { return x + y; } }'
+    assert count_methods(source) == count_methods_fast(source) == 1
+    source = 'class A { record Pair<K, V>(K k, V v) { Pair { check(k); } } void f() { record L(int x) {} } }'
+    assert count_methods(source) == count_methods_fast(source) == 1
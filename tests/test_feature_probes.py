@@ -0,0 +1,115 @@
+"""
+Tests the GitHub feature probes against a local stub of the REST API
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import api
+import feature_probes
+from ratelimit import get_scheduler
+from run_cache import get_run_cache
+
+ISSUE = {'number': 1}
+PULL_REQUEST = {'number': 2, 'pull_request': {'url': '...'}}
+
+# The issues list of every repository, newest first
+ISSUES = {
+    'a/issues': [ISSUE, PULL_REQUEST],
+    'a/none': [],
+    'a/pull-requests': [PULL_REQUEST] * 3,  # no issues
+    'a/older-issues': [PULL_REQUEST] * 3 + [ISSUE],  # a pull request first, an issue on the same page
+    'a/busy': [PULL_REQUEST] * 150 + [ISSUE],  # more than a page of pull requests
+}
+
+
+class RestStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append(url.path + '?per_page=' + query.get('per_page', ['30'])[0])
+        headers = {}
+        if url.path.endswith('/issues'):
+            assert query['state'] == ['all']
+            repository = url.path.removeprefix('/repos/').removesuffix('/issues')
+            per_page = int(query['per_page'][0])
+            status, body = 200, ISSUES[repository][:per_page]
+            if len(ISSUES[repository]) > per_page:
+                headers['Link'] = f'<http://127.0.0.1/repos/{repository}/issues?page=2>; rel="next"'
+        elif url.path.endswith('/projects'):
+            status, body = 410, {'message': 'Projects are disabled for this repository'}
+        elif url.path.endswith('/actions/runs'):
+            status, body = 200, {'total_count': 0, 'workflow_runs': []}
+        else:
+            status, body = 404, {}
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *arguments):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RestStub)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(api, 'API_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    get_run_cache().clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_run_cache().clear()
+
+
+# Each case is (repository, uses_issues, requests). A page of the list is only asked for when the first item
+# is a pull request. Pull requests are only counted as issues when the list goes on after that page
+@pytest.mark.parametrize('repository, uses_issues, requests', [
+    ('a/issues', True, 1), ('a/none', False, 1), ('a/pull-requests', False, 2), ('a/older-issues', True, 2),
+    ('a/busy', True, 2)])
+def test_issues_probe_leaves_pull_requests_out(server, repository, uses_issues, requests):
+    assert feature_probes.probe(repository, 'uses_issues') is uses_issues
+    page_sizes = ['1', str(feature_probes.ISSUES_PAGE_SIZE)][:requests]
+    assert server.requests == [f'/repos/{repository}/issues?per_page={size}' for size in page_sizes]
+
+
+def test_probe_features(server):
+    assert feature_probes.probe_features('a/issues') == {'uses_issues': True, 'uses_projects': False,
+                                                         'uses_actions': False}
+    assert feature_probes.probe_features('a/issues') == {'uses_issues': True, 'uses_projects': False,
+                                                         'uses_actions': False}
+    assert len(server.requests) == 3  # answered from the run cache the second time
+
+
+def test_probe_answer():
+    assert feature_probes.probe_answer(200, [ISSUE]) is True
+    assert feature_probes.probe_answer(200, [PULL_REQUEST]) is False
+    assert feature_probes.probe_answer(200, [PULL_REQUEST], more_pages=True) is None
+    assert feature_probes.probe_answer(200, {'total_count': 3}) is True
+    assert feature_probes.probe_answer(410, None) is False
+    assert feature_probes.probe_answer(500, None) is None
+
+
+def test_probes_count_to_the_phase_of_the_caller(monkeypatch):
+    phases = {}
+
+    def request_probe(repo_address, feature):
+        phases[feature] = get_scheduler().current_phase()
+        return False
+
+    monkeypatch.setattr(feature_probes, 'request_probe', request_probe)
+    get_run_cache().clear()
+    try:
+        with get_scheduler().phase('GITHUB FEATURES'):
+            feature_probes.probe_features('a/phases')
+    finally:
+        get_run_cache().clear()
+    assert phases == dict.fromkeys(feature_probes.PROBES, 'GITHUB FEATURES')
@@ -0,0 +1,98 @@
+"""
+Tests which GitHub errors GitHubSource takes as an empty repository or a missing file, against a local stub of the API.
+Every other error has to reach the evaluation of the repository, so it fails instead of being graded as empty
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+from github import Github
+from github.GithubException import GithubException
+
+from run_cache import get_run_cache
+from source import GitHubSource
+
+HEAD_SHA = 'a' * 40
+
+# The answers of the stub by path. Anything else is 404
+RESPONSES = {
+    '/repos/a/project/branches/main': (200, {'name': 'main', 'commit': {'sha': HEAD_SHA}}),
+    f'/repos/a/project/git/trees/{HEAD_SHA}': (200, {'sha': 'b' * 40, 'truncated': False, 'tree': [
+        {'path': 'pom.xml', 'type': 'blob', 'sha': 'c' * 40, 'size': 10},
+        {'path': 'src', 'type': 'tree', 'sha': 'd' * 40}]}),
+    '/repos/a/project/license': (404, {'message': 'Not Found'}),
+    '/repos/a/empty/branches/main': (404, {'message': 'Branch not found'}),
+    '/repos/a/broken/branches/main': (200, {'name': 'main', 'commit': {'sha': HEAD_SHA}}),
+    f'/repos/a/broken/git/trees/{HEAD_SHA}': (502, {'message': 'Server Error'}),
+    '/repos/a/broken/readme': (403, {'message': 'Resource not accessible by integration'}),
+    '/repos/a/broken/license': (500, {'message': 'Server Error'}),
+    '/repos/a/forbidden/branches/main': (403, {'message': 'Resource not accessible by integration'}),
+}
+
+
+class RestStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.requests.append(path)
+        if path.count('/') == 3:  # /repos/author/name
+            status, body = 200, {'full_name': path.removeprefix('/repos/'), 'default_branch': 'main',
+                                 'url': self.server.url + path}
+        else:
+            status, body = RESPONSES.get(path, (404, {'message': 'Not Found'}))
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *arguments):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RestStub)
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    get_run_cache().clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_run_cache().clear()
+
+
+def source(server, address):
+    github = Github(base_url=server.url, retry=None, seconds_between_requests=None)
+    get_run_cache().put((address, 'repo'), github.get_repo(address))
+    return GitHubSource(address)
+
+
+def test_repository(server):
+    project = source(server, 'a/project')
+    assert project.head_sha() == HEAD_SHA
+    assert [file.path for file in project.list_files()] == ['pom.xml']
+    assert project.get_readme() is None
+    assert project.get_licence() is None
+
+
+def test_empty_repository(server):
+    empty = source(server, 'a/empty')
+    assert empty.head_sha() is None
+    assert empty.list_files() == []
+    assert empty.get_readme() is None
+    assert empty.get_licence() is None
+    assert server.requests == ['/repos/a/empty', '/repos/a/empty/branches/main']
+
+
+def test_other_errors_are_raised(server):
+    broken = source(server, 'a/broken')
+    for method in (broken.list_files, broken.get_readme, broken.get_licence):
+        with pytest.raises(GithubException):
+            method()
+    with pytest.raises(GithubException) as error:
+        source(server, 'a/forbidden').head_sha()
+    assert error.value.status == 403
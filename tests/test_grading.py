@@ -0,0 +1,96 @@
+"""
+Tests that regrade.py grades a table of repositories the same way grades.grade_evaluation grades each one
+"""
+import random
+
+import pytest
+
+from evaluation import Evaluation
+from grades import grade_evaluation, grade_total
+from rubric import Rubric
+
+regrade = pytest.importorskip('regrade')
+
+RUBRICS = [
+    Rubric(),
+    Rubric({'TESTING': 0.2, 'MODULARITY': 0.1, 'LINES_PER_COMMENT': 10, 'METHODS_PER_COMMENT': 2,
+            'MINIMUM_TEST_RATIO': 0.3, 'BIG_README_SIZE': 1000, 'TOP_MARK': 20, 'EXISTENCE_OF_BUILD_FILE': 0.3,
+            'MODULARITY_AVG_METHOD_SIZE': 12.5}),
+]
+
+
+def java_file_stats(comments: int, lines: int, methods: int) -> dict[str, int]:
+    return {'NUMBER_OF_COMMENTS': comments, 'NUMBER_OF_LINES': lines, 'NUMBER_OF_METHODS': methods}
+
+
+def random_evaluation(generator: random.Random, index: int) -> Evaluation:
+    evaluation = Evaluation(f"author{index}/repository")
+    if generator.random() < 0.8:
+        evaluation.readme_size = generator.randint(0, 4000)
+        evaluation.readme_raw_size = int(evaluation.readme_size * generator.uniform(0.9, 1.0))
+    evaluation.licence_exists = generator.random() < 0.5
+    evaluation.contributing_exists = generator.random() < 0.3
+    evaluation.build_tool = generator.choice([None, 'Maven', 'Gradle - Groovy'])
+    evaluation.build_file_ok = generator.random() < 0.6
+    evaluation.test_count = generator.randint(0, 30)
+    evaluation.non_test_count = generator.choice([0, generator.randint(1, 40)])
+    evaluation.uses_github_features = generator.random() < 0.5
+    evaluation.uses_checkstyle = generator.random() < 0.5
+    evaluation.uses_spotbugs = generator.random() < 0.5
+    evaluation.uses_ci = generator.random() < 0.5
+    evaluation.commit_count = generator.randint(0, 200)
+    evaluation.contributor_count = generator.randint(1, 6)
+    # A quarter of the repositories with java files declare no methods at all
+    max_methods = 0 if generator.random() < 0.25 else 15
+    evaluation.java_files_stats = {
+        f"File{number}.java": java_file_stats(generator.randint(0, 40), generator.randint(0, 300),
+                                              generator.randint(0, max_methods))
+        for number in range(evaluation.non_test_count)}
+    return evaluation
+
+
+def edge_evaluations() -> list[Evaluation]:
+    """
+    :return: Repositories at the edges of the modularity criterion
+    """
+    evaluations = []
+    for index, files in enumerate([
+        {'Empty.java': java_file_stats(0, 0, 0)},
+        {'X.java': java_file_stats(0, 1, 0)},
+        {'A.java': java_file_stats(3, 40, 0), 'B.java': java_file_stats(1, 10, 0)},
+        {'A.java': java_file_stats(0, 40, 2)},  # exactly at the threshold
+        {'A.java': java_file_stats(0, 39, 2)},
+        {'A.java': java_file_stats(2, 0, 3)},
+    ]):
+        evaluation = Evaluation(f"edge/{index}")
+        evaluation.non_test_count = len(files)
+        evaluation.java_files_stats = files
+        evaluations.append(evaluation)
+    return evaluations
+
+
+def grade_both_ways(evaluations: list[Evaluation], rubric: Rubric) -> None:
+    table = regrade.FeatureTable(evaluations)
+    grades, given = regrade.grade_table(table, rubric)
+    regrade.finalise_grade_table(grades, given, rubric)
+    totals = regrade.grade_totals(grades, rubric)
+    for index, evaluation in enumerate(evaluations):
+        expected = grade_evaluation(evaluation, rubric)
+        assert regrade.grade_dictionary(grades, given, index, rubric) == expected, evaluation.address
+        assert totals[index] == grade_total(expected, rubric), evaluation.address
+
+
+@pytest.mark.parametrize('rubric', RUBRICS)
+def test_table_grades_match_single_repository_grades(rubric):
+    generator = random.Random(25)
+    grade_both_ways([random_evaluation(generator, index) for index in range(2000)], rubric)
+
+
+@pytest.mark.parametrize('rubric', RUBRICS)
+def test_repositories_without_methods(rubric):
+    grade_both_ways(edge_evaluations(), rubric)
+
+
+def test_no_methods_means_no_modularity_grade():
+    evaluation = edge_evaluations()[1]
+    assert grade_evaluation(evaluation)['MODULARITY'] == 0
@@ -0,0 +1,159 @@
+"""
+Tests the GraphQL prefetch against a local stub of the GraphQL endpoint, and that GitHubSource reads the
+prefetched files from the run cache
+"""
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import graphql_prefetch
+from run_cache import get_run_cache
+from source import GitHubSource, RepositoryFile
+
+POM = '<project><modelVersion>4.0.0</modelVersion></project>'
+README = '# Title\n\nSome text'
+
+# The answers of the stub, by 'owner/name'. Repositories which aren't here don't exist (null in the answer)
+REPOSITORIES = {
+    'alice/project': {
+        'defaultBranchRef': {'target': {'oid': 'a' * 40, 'history': {'totalCount': 12}}},
+        'refs': {'totalCount': 3},
+        'files': {'pom.xml': {'text': POM, 'isBinary': False, 'isTruncated': False},
+                  'build.gradle': {'text': None, 'isBinary': False, 'isTruncated': True},
+                  'README.md': {'text': README, 'isBinary': False, 'isTruncated': False}},
+    },
+    'bob/empty': {
+        'defaultBranchRef': None,
+        'refs': {'totalCount': 0},
+        'files': {},
+    },
+}
+
+ALL_FILES = graphql_prefetch.PROBED_FILES + graphql_prefetch.README_FILES + graphql_prefetch.LICENCE_FILES
+
+
+class GraphQLStub(BaseHTTPRequestHandler):
+    """Answers batch queries from REPOSITORIES, after checking they ask for what the answer holds"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        query, variables = body['query'], body['variables']
+        data = {}
+        for index in range(len(variables) // 2):
+            assert f'$owner{index}: String!' in query and f'r{index}: repository(' in query
+            address = f"{variables[f'owner{index}']}/{variables[f'name{index}']}"
+            self.server.addresses.append(address)
+            repository = REPOSITORIES.get(address)
+            if repository is None:
+                data[f'r{index}'] = None
+                continue
+            answer = {'defaultBranchRef': repository['defaultBranchRef'], 'refs': repository['refs']}
+            for number, path in enumerate(ALL_FILES):
+                assert re.search(rf'f{number}: object\(expression: "HEAD:{re.escape(path)}"\)', query)
+                answer[f'f{number}'] = repository['files'].get(path)
+            data[f'r{index}'] = answer
+        self.answer(self.server.status, {'data': data})
+
+    def answer(self, status: int, body: dict):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *arguments):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GraphQLStub)
+    server.addresses = []
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    get_run_cache().clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_run_cache().clear()
+
+
+def url(server) -> str:
+    return f'http://127.0.0.1:{server.server_address[1]}/graphql'
+
+
+def test_existing_repository(endpoint):
+    graphql_prefetch.prefetch_repositories(['alice/project'], url(endpoint))
+    cache = get_run_cache()
+    assert cache.get(('alice/project', 'head_sha'), None) == 'a' * 40
+    assert cache.get(('alice/project', 'commit_count'), None) == 12
+    assert cache.get(('alice/project', 'branch_count'), None) == 3
+    assert cache.get(('alice/project', 'file', 'pom.xml'), None) == POM
+    assert cache.get(('alice/project', 'file', 'CONTRIBUTING.md'), None) is None  # known to be missing
+    assert not cache.contains(('alice/project', 'file', 'build.gradle'))  # truncated, so it is downloaded
+    assert cache.get(('alice/project', 'readme'), None) == README
+    assert not cache.contains(('alice/project', 'licence'))  # GitHub may find a licence somewhere else
+    assert not cache.contains(('alice/project', 'contributor_count'))
+
+
+def test_empty_and_missing_repositories(endpoint):
+    graphql_prefetch.prefetch_repositories(['bob/empty', 'carol/missing'], url(endpoint))
+    cache = get_run_cache()
+    assert cache.get(('bob/empty', 'head_sha'), None) is None and cache.contains(('bob/empty', 'head_sha'))
+    assert cache.get(('bob/empty', 'commit_count'), None) == 0
+    assert cache.get(('bob/empty', 'branch_count'), None) == 0
+    assert not any(cache.contains(('carol/missing', resource)) for resource in ('head_sha', 'commit_count'))
+
+
+def test_batches(endpoint):
+    addresses = ['alice/project', 'bob/empty', 'carol/missing']
+    graphql_prefetch.prefetch_repositories(addresses, url(endpoint), batch_size=2, workers=2)
+    assert sorted(endpoint.addresses) == sorted(addresses)
+    assert get_run_cache().contains(('alice/project', 'head_sha'))
+    assert get_run_cache().contains(('bob/empty', 'head_sha'))
+
+
+def test_failed_batch_leaves_the_cache_alone(endpoint):
+    endpoint.status = 502
+    graphql_prefetch.prefetch_repositories(['alice/project'], url(endpoint))
+    assert not get_run_cache().contains(('alice/project', 'head_sha'))
+
+
+class BlobRepository:
+    """The calls of GitHubSource.download_file to a PyGithub Repository, counting the downloads"""
+
+    def __init__(self, contents: dict[str, str]):
+        self.contents = contents
+        self.downloads = []
+
+    def get_git_blob(self, sha: str):
+        self.downloads.append(sha)
+        blob = type('Blob', (), {})()
+        blob.content = base64.b64encode(self.contents[sha].encode()).decode()
+        return blob
+
+
+def test_source_keeps_only_probed_files(endpoint):
+    graphql_prefetch.prefetch_repositories(['alice/project'], url(endpoint))
+    repository = BlobRepository({'1': 'class Main {}', '2': 'apply plugin: "java"'})
+    cache = get_run_cache()
+    cache.put(('alice/project', 'repo'), repository)
+    cache.put(('alice/project', 'index'), {file.path: file for file in [
+        RepositoryFile('pom.xml', len(POM), '0'), RepositoryFile('src/Main.java', 13, '1'),
+        RepositoryFile('build.gradle', 20, '2')]})
+    source = GitHubSource('alice/project')
+
+    assert source.read_file('pom.xml') == POM  # prefetched
+    assert source.read_file('src/Main.java') == 'class Main {}'
+    assert source.read_file('src/Main.java') == 'class Main {}'
+    assert source.read_file('build.gradle') == 'apply plugin: "java"'
+    assert source.read_file('build.gradle') == 'apply plugin: "java"'
+    # The java file is downloaded every time it is read and isn't kept, the probed build file is kept
+    assert repository.downloads == ['1', '1', '2']
+    assert not cache.contains(('alice/project', 'file', 'src/Main.java'))
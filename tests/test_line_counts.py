@@ -0,0 +1,45 @@
+"""
+Tests the comment, code and blank line counts of Java files. Comment markers inside strings and text blocks
+aren't comments, a comment after code counts as both and the last line of a file doesn't need a newline
+"""
+import pytest
+
+from code_quality import LineCounts, count_line_kinds, get_java_file_stats
+
+# Each case is (source, LineCounts(lines, comments, comment_lines, code_lines, blank_lines))
+CASES = {
+    'markers in strings': ('class A {\n'
+                           '    String url = "http://example.com"; // a comment\n'
+                           '    String s = "/* not a comment */";\n'
+                           '}\n', LineCounts(4, 1, 1, 4, 0)),
+    'markers in text blocks': ('class A {\n'
+                               '    String t = """\n'
+                               '        // not a comment\n'
+                               '        /* nor this */\n'
+                               '        """;\n'
+                               '}\n', LineCounts(6, 0, 0, 6, 0)),
+    'escaped quotes': ('class A {\n'
+                       '    char c = \'"\'; // comment\n'
+                       '    String s = "\\" // still a string";\n'
+                       '}\n', LineCounts(4, 1, 1, 4, 0)),
+    'block comments': ('/*\n'
+                       ' * Header\n'
+                       ' */\n'
+                       '\n'
+                       'class A { /* inline */ }\n', LineCounts(5, 2, 4, 1, 1)),
+    'trailing block comment': ('class A {}\n/* trailing */', LineCounts(2, 1, 1, 1, 0)),
+    'trailing line comment': ('class A {}\n// trailing', LineCounts(2, 1, 1, 1, 0)),
+    'unterminated block comment': ('class A {}\n/* never closed\n', LineCounts(2, 1, 1, 1, 0)),
+}
+
+
+@pytest.mark.parametrize('source, counts', CASES.values(), ids=CASES.keys())
+def test_count_line_kinds(source, counts):
+    assert count_line_kinds(source) == counts
+
+
+def test_java_file_stats():
+    source, _ = CASES['markers in strings']
+    stats = get_java_file_stats(source, 'A', fast_methods=True)
+    assert stats == {'NUMBER_OF_METHODS': 0, 'NUMBER_OF_COMMENTS': 1, 'NUMBER_OF_LINES': 3, 'NUMBER_OF_CODE_LINES': 4,
+                     'NUMBER_OF_BLANK_LINES': 0, 'NUMBER_OF_COMMENT_BLOCKS': 1}
@@ -0,0 +1,37 @@
+"""
+Tests that parsing Java files across the process pool gives the same stats as parsing them in the main process
+"""
+import glob
+import os
+
+import pytest
+
+from code_quality import MIN_FILES_FOR_PROCESS_POOL, ParsingPool
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'resources', 'java', '*.java')))
+
+
+@pytest.fixture(scope='module')
+def files():
+    files = {}
+    for path in CORPUS:
+        with open(path) as fp:
+            files[os.path.basename(path)] = fp.read()
+    # Variations of the corpus, so there are enough files for the pool to be used
+    for name, contents in list(files.items()):
+        files['Commented' + name] = '// Copy\n' + contents.replace('    ', '\t')
+        files['Trailing' + name] = contents + '\n/* trailing */'
+    assert len(files) >= MIN_FILES_FOR_PROCESS_POOL
+    return files
+
+
+@pytest.mark.parametrize('fast_methods', [False, True])
+def test_pool_matches_serial_parsing(files, fast_methods):
+    serial = ParsingPool(serial=True, fast_methods=fast_methods).map_stats(files)
+    pool = ParsingPool(processes=2, fast_methods=fast_methods)
+    try:
+        parallel = pool.map_stats(files)
+        assert pool.executor is not None  # the files were parsed in the pool
+    finally:
+        pool.shutdown()
+    assert parallel == serial
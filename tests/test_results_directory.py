@@ -0,0 +1,46 @@
+"""
+Tests that the results directory of every repository is inside the results directory of the run
+"""
+import os
+
+import pytest
+
+from grades import repository_results_directory
+from source import results_directory_name
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    home = tmp_path / 'home'
+    (home / 'project').mkdir(parents=True)
+    (tmp_path / 'work' / 'here').mkdir(parents=True)
+    (tmp_path / 'work' / 'proj').mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.chdir(tmp_path / 'work' / 'here')
+    return home
+
+
+def assert_inside(results, name):
+    directory = os.path.abspath(os.path.join(results, name))
+    assert os.path.commonpath([directory, os.path.abspath(results)]) == os.path.abspath(results)
+    assert not any(part in ('..', '~', '') or ':' in part for part in name.split('/'))
+
+
+def test_github_addresses_are_kept():
+    assert results_directory_name('author/name') == 'author/name'
+    assert repository_results_directory('author/name', 'results') == 'results/author/name'
+
+
+@pytest.mark.parametrize('address', ['../proj', '~/project', 'file://{tmp}/work/proj', '{tmp}/work/proj',
+                                     '{tmp}/work/here/../proj/.'])
+def test_local_addresses_stay_inside(home, tmp_path, address):
+    address = address.format(tmp=tmp_path)
+    name = results_directory_name(address)
+    assert_inside(str(tmp_path / 'results'), name)
+    assert name.endswith('/proj') or name.endswith('/home/project')
+
+
+def test_same_repository_same_directory(home, tmp_path):
+    names = {results_directory_name(address)
+             for address in ['../proj', f'file://{tmp_path}/work/proj', f'{tmp_path}/work/proj/']}
+    assert len(names) == 1
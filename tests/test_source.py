@@ -0,0 +1,122 @@
+"""
+Tests the listing of local repositories: working trees, plain directories and bare repositories
+"""
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from run_cache import get_run_cache
+from source import GitHubSource, LocalSource, RepositorySource
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git isn't installed")
+
+
+def git(directory, *arguments):
+    subprocess.run(['git', '-C', str(directory), '-c', 'user.name=Test', '-c', 'user.email=test@example.com',
+                    *arguments], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def write(root, path, contents):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as fp:
+        fp.write(contents)
+
+
+@pytest.fixture
+def working_tree(tmp_path):
+    root = tmp_path / 'project'
+    root.mkdir()
+    git(root, 'init', '-q')
+    write(root, '.gitignore', 'target/\n')
+    write(root, 'pom.xml', '<project/>')
+    write(root, 'src/main/java/a/Main.java', 'class Main {}')
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', 'First')
+    # Build output, generated and untracked files, which GitHub doesn't have
+    write(root, 'target/classes/a/Generated.java', 'class Generated {}')
+    write(root, 'src/main/java/a/Scratch.java', 'class Scratch {}')
+    get_run_cache().clear()
+    yield root
+    get_run_cache().clear()
+
+
+def paths(source):
+    return sorted(file.path for file in source.list_files())
+
+
+def test_working_tree_lists_tracked_files(working_tree):
+    source = LocalSource(str(working_tree))
+    assert paths(source) == ['.gitignore', 'pom.xml', 'src/main/java/a/Main.java']
+    assert source.index()['pom.xml'].size == len('<project/>')
+
+
+def test_staged_and_deleted_files(working_tree):
+    git(working_tree, 'add', 'src/main/java/a/Scratch.java')
+    os.remove(working_tree / 'pom.xml')
+    assert paths(LocalSource(str(working_tree))) == ['.gitignore', 'src/main/java/a/Main.java',
+                                                      'src/main/java/a/Scratch.java']
+
+
+def test_plain_directory_lists_everything(working_tree):
+    shutil.rmtree(working_tree / '.git')
+    assert paths(LocalSource(str(working_tree))) == [
+        '.gitignore', 'pom.xml', 'src/main/java/a/Main.java', 'src/main/java/a/Scratch.java',
+        'target/classes/a/Generated.java']
+
+
+def test_bare_repository_lists_head(working_tree, tmp_path):
+    subprocess.run(['git', 'clone', '-q', '--mirror', str(working_tree), str(tmp_path / 'mirror.git')], check=True)
+    source = LocalSource(str(tmp_path / 'mirror.git'))
+    assert paths(source) == ['.gitignore', 'pom.xml', 'src/main/java/a/Main.java']
+    assert source.read_file('pom.xml') == '<project/>'
+
+
+def head_commit(directory):
+    return subprocess.run(['git', '-C', str(directory), 'rev-parse', 'HEAD'], check=True,
+                          stdout=subprocess.PIPE).stdout.decode().strip()
+
+
+def test_clean_working_tree_has_head_sha(working_tree):
+    # Untracked files aren't listed, so they don't change what is evaluated
+    assert LocalSource(str(working_tree)).head_sha() == head_commit(working_tree)
+
+
+@pytest.mark.parametrize('change', ['edit', 'stage', 'delete'])
+def test_changed_working_tree_has_no_head_sha(working_tree, change):
+    if change == 'edit':
+        write(working_tree, 'pom.xml', '<project><modelVersion/></project>')
+    elif change == 'stage':
+        git(working_tree, 'add', 'src/main/java/a/Scratch.java')
+    else:
+        os.remove(working_tree / 'pom.xml')
+    assert LocalSource(str(working_tree)).head_sha() is None
+
+
+def test_plain_directory_has_no_head_sha(working_tree):
+    # Even inside another git repository, whose head says nothing about the directory
+    shutil.rmtree(working_tree / '.git')
+    git(working_tree.parent, 'init', '-q')
+    git(working_tree.parent, 'add', '-A')
+    git(working_tree.parent, 'commit', '-q', '-m', 'Outer')
+    assert LocalSource(str(working_tree)).head_sha() is None
+
+
+def test_bare_repository_has_head_sha(working_tree, tmp_path):
+    subprocess.run(['git', 'clone', '-q', '--mirror', str(working_tree), str(tmp_path / 'mirror.git')], check=True)
+    assert LocalSource(str(tmp_path / 'mirror.git')).head_sha() == head_commit(working_tree)
+
+
+def test_sources_implement_every_abstract_method():
+    with pytest.raises(TypeError):
+        RepositorySource('a/b')
+
+    class Partial(RepositorySource):
+        def fetch_files(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial('a/b')
+    assert not GitHubSource.__abstractmethods__ and not LocalSource.__abstractmethods__